@@ -6,6 +6,7 @@
 use App\Models\NewsSource;
 use Carbon\Carbon;
 use Illuminate\Support\Collection;
+use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Log;
 use Illuminate\Support\Str;
@@ -282,6 +283,43 @@ private function extractKeywords(string $text): array
     
     public function groupIntoStoryClusters(Collection $articles): Collection
     {
-        return $articles;
+        // Cluster assignments come from tools/cluster_stories.py; articles without one are their own story
+        $clusterIds = collect();
+
+        try {
+            foreach ($articles->pluck('url')->chunk(500) as $urls) {
+                $clusterIds = $clusterIds->merge(
+                    DB::connection('ingest')->table('article_clusters')
+                        ->whereIn('url', $urls->all())
+                        ->pluck('cluster_id', 'url')
+                );
+            }
+        } catch (\Exception $e) {
+            Log::warning("Story clusters unavailable: " . $e->getMessage());
+        }
+
+        return $articles
+            ->groupBy(fn ($article) => $clusterIds->get($article->url, $article->url))
+            ->values();
+    }
+
+    public function getStoryCoverage(array $clusterIds): Collection
+    {
+        // Rows precomputed by tools/story_coverage.py, keyed by cluster ID
+        try {
+            return DB::connection('ingest')->table('story_coverage')
+                ->whereIn('cluster_id', $clusterIds)
+                ->get()
+                ->map(function ($row) {
+                    foreach (['bias_counts', 'sources', 'earliest_left', 'earliest_center', 'earliest_right'] as $column) {
+                        $row->{$column} = json_decode($row->{$column} ?? 'null', true);
+                    }
+                    return $row;
+                })
+                ->keyBy('cluster_id');
+        } catch (\Exception $e) {
+            Log::warning("Story coverage unavailable: " . $e->getMessage());
+            return collect();
+        }
     }
 }
@@ -42,6 +42,15 @@
             'synchronous' => env('DB_SYNCHRONOUS', 'NORMAL'),
         ],
 
+        // Article batch and story clusters written by tools/ingest_feeds.py and tools/cluster_stories.py
+        'ingest' => [
+            'driver' => 'sqlite',
+            'database' => env('INGEST_DATABASE', storage_path('app/private/articles.sqlite')),
+            'prefix' => '',
+            'foreign_key_constraints' => false,
+            'busy_timeout' => env('DB_BUSY_TIMEOUT', 30000),
+        ],
+
         'mysql' => [
             'driver' => 'mysql',
             'url' => env('DB_URL'),
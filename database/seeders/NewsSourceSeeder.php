@@ -59,7 +59,7 @@ public function run(): void
                             'name' => $feedData['name'],
                             'url' => $feedData['url'],
                             'category' => $feedData['category'] ?? 'general',
-                            'is_active' => true,
+                            'is_active' => $feedData['is_active'] ?? true,
                         ]);
                     }
                     
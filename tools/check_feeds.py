@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Health check for every feed listed in database/sources/*.json.
+
+All feeds are fetched at once (within the per-host limits of the scheduler),
+and the whole run has a deadline of about one timeout period however many
+feeds there are: feeds still waiting for a slot then are recorded as not
+checked, and feeds still downloading as timed out. Each
+check is a conditional GET using the validators of the previous run, and
+records the HTTP status, latency, size, number of items and the date of the
+newest item in storage/app/private/feed_health.sqlite.
+
+Feeds failing `--failures` runs in a row are reported as dead; with
+--deactivate they are marked "is_active": false in their source file (and
+reactivated once they recover), with --drop they are removed.
+
+Usage:
+    python tools/check_feeds.py
+    python tools/check_feeds.py --deactivate --failures 3
+    python tools/check_feeds.py --drop --failures 5 --source nytimes
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from feed_parser import FeedParser, NotAFeedError, parse_feed_date
+from http_client import HttpClient
+from instrumentation import Tracer, get_tracer, set_tracer
+from scheduler import HostScheduler, SlotTimeout, host_key
+from source_catalog import DEFAULT_CATALOG_PATH, SourceCatalog
+from update_rss_feeds import locked_source_file, write_json_atomic
+from url_index import DEFAULT_SOURCES_DIR, canonicalize_url
+
+DEFAULT_HEALTH_PATH = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'feed_health.sqlite'
+
+# Timeout in seconds for each feed
+DEFAULT_TIMEOUT = 10
+# The whole run ends this many timeouts after it started (see --deadline)
+RUN_DEADLINE_FACTOR = 1.5
+# Maximum number of feeds checked at the same time
+DEFAULT_CONCURRENCY = 64
+# Consecutive failed runs before a feed counts as dead
+DEFAULT_FAILURES = 3
+# Stop reading a feed after this many bytes
+MAX_FEED_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# Error of feeds the run's deadline left no time for
+NOT_CHECKED = 'not checked before the run deadline'
+
+# Feed hosts serve many small files; allow more parallelism than page crawls
+HOST_RATE = 10.0
+HOST_CONCURRENCY = 8
+# Hosts with more feeds than HOST_CONCURRENCY get up to this many slots,
+# so e.g. rss.nytimes.com's dozens of feeds don't queue up for several timeouts
+MAX_HOST_CONCURRENCY = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feed_checks (
+    url TEXT PRIMARY KEY,
+    source TEXT,
+    status INTEGER,
+    ok INTEGER NOT NULL,
+    error TEXT,
+    latency REAL,
+    bytes INTEGER,
+    items INTEGER,
+    last_item_at TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    failures INTEGER NOT NULL DEFAULT 0,
+    checked_at REAL NOT NULL
+)
+"""
+
+
+class RunDeadlineExceeded(Exception):
+    """The run's deadline passed while a feed was still being read."""
+
+
+def scan_feed(chunks, max_bytes=MAX_FEED_BYTES, deadline=None):
+    """Stream a feed body; returns (is_feed, items, newest item date, bytes read).
+
+    Raises RunDeadlineExceeded once time.monotonic() passes `deadline`.
+    """
+    parser = FeedParser()
+    items = 0
+    newest = None
+    size = 0
+
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            for item in parser.feed(chunk):
+                items += 1
+                published = parse_feed_date(item['published'])
+                if published is not None and (newest is None or published > newest):
+                    newest = published
+            if size >= max_bytes:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise RunDeadlineExceeded()
+    except NotAFeedError:
+        return False, 0, None, size
+    except ET.ParseError:
+        # A feed cut short or with a stray byte still counts if it started like one
+        pass
+
+    return parser.is_feed, items, newest, size
+
+
+class FeedCheck:
+    """The outcome of checking one feed."""
+
+    def __init__(self, url, source=None, status=None, ok=False, error=None, latency=None, size=None,
+                 items=None, last_item_at=None, etag=None, last_modified=None, failures=0):
+        self.url = url
+        self.source = source
+        self.status = status
+        self.ok = ok
+        self.error = error
+        self.latency = latency
+        self.size = size
+        self.items = items
+        self.last_item_at = last_item_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.failures = failures
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class FeedHealthStore:
+    """Thread-safe SQLite record of the latest check of every feed."""
+
+    def __init__(self, path=DEFAULT_HEALTH_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, source, status, ok, error, latency, bytes, items, last_item_at, etag, last_modified, failures "
+                "FROM feed_checks WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        check = FeedCheck(*row)
+        check.ok = bool(check.ok)
+        return check
+
+    def store(self, check):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feed_checks (url, source, status, ok, error, latency, bytes, items, "
+                "last_item_at, etag, last_modified, failures, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    check.url, check.source, check.status, int(check.ok), check.error, check.latency, check.size,
+                    check.items, check.last_item_at, check.etag, check.last_modified, check.failures, time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def check_feed(http, url, previous=None, source=None, timeout=DEFAULT_TIMEOUT, deadline=None):
+    """Fetch `url` once (conditionally, if it was seen before) and return a FeedCheck.
+
+    Nothing is fetched past `deadline` (a time.monotonic() value): a feed
+    that could not start before it is returned with the NOT_CHECKED error and
+    its previous failure count, one cut off while downloading counts as failed.
+    """
+    headers = previous.conditional_headers() if previous is not None and previous.ok else None
+    check = FeedCheck(url, source)
+    started = time.perf_counter()
+    try:
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise SlotTimeout()
+        with http.get(url, headers=headers, timeout=timeout) as response:
+            check.status = response.status
+            check.etag = response.headers.get('etag')
+            check.last_modified = response.headers.get('last-modified')
+            if response.status == 304:
+                # Unchanged since the last run; its items are the ones we saw then
+                check.ok = True
+                check.size = 0
+                check.items = previous.items
+                check.last_item_at = previous.last_item_at
+                check.etag = check.etag or previous.etag
+                check.last_modified = check.last_modified or previous.last_modified
+            else:
+                is_feed, items, newest, size = scan_feed(response.iter_chunks(CHUNK_SIZE), deadline=deadline)
+                check.ok = is_feed
+                check.size = size
+                check.items = items
+                check.last_item_at = newest.isoformat() if newest is not None else None
+                if not is_feed:
+                    check.error = 'not an RSS/Atom feed'
+    except SlotTimeout:
+        check.error = NOT_CHECKED
+        check.failures = previous.failures if previous is not None else 0
+        return check
+    except RunDeadlineExceeded:
+        check.error = 'timed out (run deadline)'
+    except urllib.error.HTTPError as e:
+        check.status = e.code
+        check.error = f"HTTP {e.code} {e.reason}"
+    except Exception as e:
+        check.error = str(e) or e.__class__.__name__
+    check.latency = round(time.perf_counter() - started, 3)
+
+    check.failures = 0 if check.ok else (previous.failures if previous is not None else 0) + 1
+    return check
+
+
+def check_all(feeds, store, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY, rate=HOST_RATE, per_host=HOST_CONCURRENCY,
+              deadline=None):
+    """Check (source, url) pairs concurrently; returns FeedChecks in input order.
+
+    The run ends `deadline` seconds after it started (default:
+    RUN_DEADLINE_FACTOR timeouts); see check_feed() for feeds not done by then.
+    """
+    if not feeds:
+        return []
+    hosts = Counter(host_key(url) for _, url in feeds)
+    per_host = max(per_host, min(MAX_HOST_CONCURRENCY, max(hosts.values())))
+    scheduler = HostScheduler(rate=rate, burst=per_host, per_host=per_host, max_in_flight=concurrency)
+    scheduler.deadline = time.monotonic() + (timeout * RUN_DEADLINE_FACTOR if deadline is None else deadline)
+    http = HttpClient(timeout=timeout, scheduler=scheduler)
+
+    def run(feed):
+        source, url = feed
+        check = check_feed(http, url, store.lookup(url), source, timeout, scheduler.deadline)
+        # Keep the previous result (and its validators) of feeds there was no time for
+        if check.error != NOT_CHECKED:
+            store.store(check)
+        return check
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(feeds)))) as executor:
+            return list(executor.map(run, feeds))
+    finally:
+        http.close()
+
+
+def apply_health(sources_dir, dead, healthy, drop=False):
+    """Deactivate (or drop) dead feeds and reactivate healthy ones in the source files.
+
+    `dead` and `healthy` are sets of canonical URLs. Returns {file: {'deactivated',
+    'reactivated', 'dropped'}} for the files that were rewritten.
+    """
+    changes = {}
+    for json_file in sorted(Path(sources_dir).glob('*.json')):
+        with locked_source_file(json_file):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+
+            file_changes = {'deactivated': [], 'reactivated': [], 'dropped': []}
+            kept = []
+            for feed in data.get('rss_feeds', []):
+                key = canonicalize_url(feed.get('url', ''))
+                if key in dead and drop:
+                    file_changes['dropped'].append(feed['url'])
+                    continue
+                if key in dead and feed.get('is_active', True):
+                    feed['is_active'] = False
+                    file_changes['deactivated'].append(feed['url'])
+                elif key in healthy and feed.get('is_active') is False:
+                    feed['is_active'] = True
+                    file_changes['reactivated'].append(feed['url'])
+                kept.append(feed)
+
+            if not any(file_changes.values()):
+                continue
+            data['rss_feeds'] = kept
+            data['categories'] = sorted({feed['category'] for feed in kept if feed.get('category')})
+            write_json_atomic(json_file, data)
+            changes[json_file.name] = file_changes
+    return changes
+
+
+def format_age(last_item_at):
+    if not last_item_at:
+        return '-'
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(last_item_at)
+    hours = age.total_seconds() / 3600
+    return f"{hours:.0f}h" if hours < 48 else f"{hours / 24:.0f}d"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every feed in database/sources still works")
+    parser.add_argument("--sources-dir", default=str(DEFAULT_SOURCES_DIR), help="Directory of source JSON files")
+    parser.add_argument("--catalog", default=str(DEFAULT_CATALOG_PATH), help="SQLite source catalog")
+    parser.add_argument("--health-db", default=str(DEFAULT_HEALTH_PATH), help="SQLite file recording check results")
+    parser.add_argument("--source", action="append", help="Only check this source slug (repeatable)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help=f"Timeout per feed (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help=f"Seconds the whole run may take (default: {RUN_DEADLINE_FACTOR}x --timeout)")
+    parser.add_argument("--concurrency", "-c", type=int, default=DEFAULT_CONCURRENCY, help=f"Feeds checked at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--failures", type=int, default=DEFAULT_FAILURES, help=f"Consecutive failed runs before a feed is dead (default: {DEFAULT_FAILURES})")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--deactivate", action="store_true", help="Set is_active to false on dead feeds (and back to true once they recover)")
+    action.add_argument("--drop", action="store_true", help="Remove dead feeds from their source files")
+    parser.add_argument("--output", "-o", help="Also write the results as JSON to this file")
+    parser.add_argument("--trace", default=None, help="Write per-request timings to this JSON-lines file")
+    args = parser.parse_args()
+
+    if args.trace:
+        set_tracer(Tracer(args.trace))
+
+    catalog = SourceCatalog(args.catalog)
+    catalog.build(args.sources_dir)
+    rows = catalog.feeds(active_only=False)
+    if args.source:
+        rows = [row for row in rows if row['source'] in args.source]
+    feeds = [(row['source'], row['url']) for row in rows]
+    if not feeds:
+        print("No feeds to check")
+        sys.exit(1)
+
+    print(f"Checking {len(feeds)} feeds...")
+    store = FeedHealthStore(args.health_db)
+    started = time.perf_counter()
+    checks = check_all(feeds, store, timeout=args.timeout, concurrency=args.concurrency, deadline=args.deadline)
+    elapsed = time.perf_counter() - started
+    store.close()
+
+    dead = [check for check in checks if check.failures >= args.failures]
+    failing = [check for check in checks if not check.ok]
+    not_checked = sum(1 for check in checks if check.error == NOT_CHECKED)
+
+    print(f"\n{'Status':>6} {'Latency':>8} {'KiB':>6} {'Items':>5} {'Newest':>6}  Feed")
+    for check in sorted(checks, key=lambda c: (c.ok, c.source or '', c.url)):
+        status = check.status if check.status is not None else 'ERR'
+        latency = f"{check.latency * 1000:.0f}ms" if check.latency is not None else '-'
+        size = f"{check.size / 1024:.0f}" if check.size is not None else '-'
+        items = check.items if check.items is not None else '-'
+        line = f"{status:>6} {latency:>8} {size:>6} {items:>5} {format_age(check.last_item_at):>6}  {check.source}: {check.url}"
+        if check.error:
+            line += f"  ({check.error}, failed {check.failures}x)"
+        print(line)
+
+    print(f"\nChecked {len(checks)} feeds in {elapsed:.1f}s: {len(checks) - len(failing)} ok, "
+          f"{len(failing)} failing, {len(dead)} dead (failed {args.failures}+ runs in a row)")
+    if not_checked:
+        print(f"{not_checked} feeds were not checked before the run deadline; raise --deadline or --concurrency")
+
+    if args.deactivate or args.drop:
+        dead_keys = {canonicalize_url(check.url) for check in dead}
+        healthy_keys = {canonicalize_url(check.url) for check in checks if check.ok}
+        changes = apply_health(args.sources_dir, dead_keys, healthy_keys, drop=args.drop)
+        for file_name, file_changes in changes.items():
+            for kind, urls in file_changes.items():
+                for url in urls:
+                    print(f"  {kind.capitalize()}: {file_name} - {url}")
+        if changes:
+            catalog.build(args.sources_dir)
+        else:
+            print("No source files changed")
+    catalog.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump([vars(check) for check in checks], f, indent=4)
+
+    get_tracer().print_summary()
+    get_tracer().close()
+
+
+if __name__ == '__main__':
+    main()
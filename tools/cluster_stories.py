@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Story clustering: group ingested articles that cover the same story.
+
+Reads the SQLite article batch written by ingest_feeds.py --format sqlite and
+groups the recent articles by the words of their title and summary. Every
+article gets a MinHash signature, and locality-sensitive hashing over bands
+of those signatures only puts articles with similar word sets in the same
+bucket, so a run costs about one pass over the articles instead of comparing
+every pair. Candidates from a bucket are joined when their word sets are
+similar enough and they were published close together.
+
+Clusters of two or more articles are written to the same file:
+    article_clusters (url -> cluster_id)
+    story_clusters (id, title, size, sources, first/last published_at)
+    story_coverage (see story_coverage.py), rebuilt for changed clusters only
+NewsAggregatorService::groupIntoStoryClusters() reads article_clusters by
+URL. A new cluster's ID is derived from its earliest article; after that a
+cluster keeps the ID its articles already have, also once the story runs
+longer than --hours and its first articles are no longer re-clustered.
+story_clusters rows count every article of a cluster, old ones included.
+
+Usage:
+    python tools/cluster_stories.py
+    python tools/cluster_stories.py --hours 72 --window 48 --similarity 0.25
+"""
+
+import argparse
+import functools
+import gc
+import hashlib
+import sqlite3
+import sys
+import time
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from instrumentation import Tracer, get_tracer, set_tracer
+from normalize import content_words
+from source_catalog import DEFAULT_CATALOG_PATH, SourceCatalog
+from story_coverage import SCHEMA as COVERAGE_SCHEMA, update_coverage
+from url_index import DEFAULT_SOURCES_DIR
+
+DEFAULT_ARTICLES_PATH = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'articles.sqlite'
+
+# Cluster the articles published within this many hours
+DEFAULT_HOURS = 48
+# Articles published further apart than this many hours are never joined
+DEFAULT_WINDOW = 36
+# Minimum Jaccard similarity of the word sets of two joined articles
+DEFAULT_SIMILARITY = 0.3
+
+# Signature slots, as BANDS bands of ROWS slots; two articles share a bucket
+# with probability 1 - (1 - J**ROWS)**BANDS for word-set similarity J
+BANDS = 32
+ROWS = 3
+SIGNATURE_SIZE = BANDS * ROWS
+# Each article is only compared with this many earlier articles of a bucket,
+# which bounds the work for boilerplate text that lands in huge buckets
+MAX_BUCKET_PEERS = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS story_clusters (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sources INTEGER NOT NULL,
+    first_published_at TEXT NOT NULL,
+    last_published_at TEXT NOT NULL,
+    clustered_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS article_clusters (
+    url TEXT PRIMARY KEY,
+    cluster_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS article_clusters_cluster_id ON article_clusters (cluster_id);
+"""
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def word_hashes(word):
+    """SIGNATURE_SIZE independent 32-bit hashes of a word, one per MinHash slot."""
+    return tuple(array('I', hashlib.shake_128(word.encode('utf-8')).digest(4 * SIGNATURE_SIZE)))
+
+
+def signature(words):
+    """MinHash signature of a word set, or None if it is empty.
+
+    The hashes of a word are computed once (news vocabulary repeats a lot)
+    and the per-slot minimum over all words is taken in C by map(min, ...).
+    """
+    if not words:
+        return None
+    if len(words) == 1:
+        return list(word_hashes(next(iter(words))))
+    return list(map(min, *(word_hashes(word) for word in words)))
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class DisjointSet:
+    """Union-find over article indexes."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, index):
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def cluster_articles(articles, window=timedelta(hours=DEFAULT_WINDOW), similarity=DEFAULT_SIMILARITY):
+    """Group article dicts (url, title, summary, published_at as datetime).
+
+    Returns a list of clusters, each a list of indexes into `articles` sorted
+    by publication time; articles that match nothing are their own cluster.
+    """
+    # Millions of small bucket tuples and lists would trigger a garbage collection
+    # every few thousand allocations, none of which can free anything
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _cluster_articles(articles, window, similarity)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _cluster_articles(articles, window, similarity):
+    words = [content_words(f"{article['title']} {article['summary']}") for article in articles]
+    order = sorted(range(len(articles)), key=lambda index: articles[index]['published_at'])
+
+    buckets = defaultdict(list)
+    tracer = get_tracer()
+    with tracer.stage('minhash'):
+        for index in order:
+            slots = signature(words[index])
+            if slots is None:
+                continue
+            for band in range(BANDS):
+                buckets[(band, *slots[band * ROWS:(band + 1) * ROWS])].append(index)
+
+    clusters = DisjointSet(len(articles))
+    with tracer.stage('join'):
+        for members in buckets.values():
+            # Members are in publication order, so earlier peers past the window can be skipped
+            for position in range(1, len(members)):
+                index = members[position]
+                published_at = articles[index]['published_at']
+                for peer in reversed(members[max(0, position - MAX_BUCKET_PEERS):position]):
+                    if published_at - articles[peer]['published_at'] > window:
+                        break
+                    if clusters.find(index) != clusters.find(peer) and jaccard(words[index], words[peer]) >= similarity:
+                        clusters.union(index, peer)
+
+    groups = defaultdict(list)
+    for index in order:
+        groups[clusters.find(index)].append(index)
+    return list(groups.values())
+
+
+def cluster_id(article):
+    """ID of a new cluster, taken from its earliest article."""
+    return hashlib.sha1(article['url'].encode('utf-8')).hexdigest()[:16]
+
+
+def assign_cluster_ids(articles, clusters, previous, is_taken=lambda identifier: False):
+    """Pair every cluster of two or more articles with an ID: [(ID, members)].
+
+    A cluster keeps the ID its articles had before (`previous`: {url: ID});
+    when several clusters carry the same old ID, the one with most of its
+    articles keeps it. Other clusters get a new ID from their earliest article
+    that is neither in use in this run nor is_taken() by older articles.
+    """
+    clusters = [members for members in clusters if len(members) >= 2]
+    claims = []
+    for position, members in enumerate(clusters):
+        counts = Counter(previous[articles[index]['url']] for index in members if articles[index]['url'] in previous)
+        claims.extend((-count, position, identifier) for identifier, count in counts.items())
+
+    identifiers = {}
+    used = set()
+    for _, position, identifier in sorted(claims):
+        if position not in identifiers and identifier not in used:
+            identifiers[position] = identifier
+            used.add(identifier)
+
+    assigned = []
+    for position, members in enumerate(clusters):
+        identifier = identifiers.get(position)
+        if identifier is None:
+            candidates = (cluster_id(articles[index]) for index in members)
+            identifier = next(
+                (candidate for candidate in candidates if candidate not in used and not is_taken(candidate)),
+                None,
+            )
+            if identifier is None:
+                # Every member's ID is in use elsewhere; derive one from all of them
+                urls = '\n'.join(articles[index]['url'] for index in members)
+                identifier = hashlib.sha1(urls.encode('utf-8')).hexdigest()[:16]
+            used.add(identifier)
+        assigned.append((identifier, members))
+    return assigned
+
+
+def load_articles(conn, since):
+    rows = conn.execute(
+        "SELECT url, source, title, summary, published_at FROM articles WHERE published_at >= ?",
+        (since.isoformat(),),
+    ).fetchall()
+    return [
+        {
+            'url': url,
+            'source': source,
+            'title': title,
+            'summary': summary,
+            'published_at': datetime.fromisoformat(published_at),
+        }
+        for url, source, title, summary, published_at in rows
+    ]
+
+
+def _is_taken_before(conn, since):
+    def is_taken(identifier):
+        return conn.execute(
+            "SELECT 1 FROM article_clusters ac JOIN articles a ON a.url = ac.url "
+            "WHERE ac.cluster_id = ? AND a.published_at < ? LIMIT 1",
+            (identifier, since.isoformat()),
+        ).fetchone() is not None
+    return is_taken
+
+
+def _refresh_story_clusters(conn, cluster_ids, clustered_at):
+    """Recompute the story_clusters rows of `cluster_ids` from all their articles.
+
+    Clusters left with fewer than two articles are dissolved.
+    """
+    cluster_ids = list(cluster_ids)
+    # Chunked to stay below SQLite's limit on bound parameters
+    for start in range(0, len(cluster_ids), 500):
+        chunk = cluster_ids[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        conn.execute(f"DELETE FROM story_clusters WHERE id IN ({placeholders})", chunk)
+        conn.execute(
+            "INSERT INTO story_clusters (id, title, size, sources, first_published_at, last_published_at, clustered_at) "
+            "SELECT ac.cluster_id, (SELECT first.title FROM article_clusters fc JOIN articles first ON first.url = fc.url "
+            "WHERE fc.cluster_id = ac.cluster_id ORDER BY first.published_at LIMIT 1), "
+            "COUNT(*), COUNT(DISTINCT a.source), MIN(a.published_at), "
+            "MAX(a.published_at), ? FROM article_clusters ac JOIN articles a ON a.url = ac.url "
+            f"WHERE ac.cluster_id IN ({placeholders}) GROUP BY ac.cluster_id HAVING COUNT(*) >= 2",
+            [clustered_at, *chunk],
+        )
+        conn.execute(
+            f"DELETE FROM article_clusters WHERE cluster_id IN ({placeholders}) "
+            "AND cluster_id NOT IN (SELECT id FROM story_clusters)",
+            chunk,
+        )
+
+
+def store_clusters(conn, articles, clusters, since, bias_labels=None):
+    """Replace the cluster assignments of the articles published since `since`.
+
+    Clusters keep the IDs their articles already have (see
+    assign_cluster_ids()), and the story_clusters and coverage rows of
+    clusters that gained or lost articles are rebuilt in the same transaction
+    (bias_labels: {source slug: bias label}). Returns (stories, clustered
+    articles, changed cluster IDs).
+    """
+    with conn:
+        previous = dict(conn.execute(
+            "SELECT ac.url, ac.cluster_id FROM article_clusters ac JOIN articles a ON a.url = ac.url "
+            "WHERE a.published_at >= ?",
+            (since.isoformat(),),
+        ))
+        assigned = assign_cluster_ids(articles, clusters, previous, _is_taken_before(conn, since))
+        assignments = [(articles[index]['url'], identifier) for identifier, members in assigned for index in members]
+        current = dict(assignments)
+        changed = {cluster for url, cluster in previous.items() if current.get(url) != cluster}
+        changed.update(cluster for url, cluster in current.items() if previous.get(url) != cluster)
+
+        conn.execute(
+            "DELETE FROM article_clusters WHERE url IN (SELECT url FROM articles WHERE published_at >= ?)",
+            (since.isoformat(),),
+        )
+        conn.executemany("INSERT OR REPLACE INTO article_clusters (url, cluster_id) VALUES (?, ?)", assignments)
+        _refresh_story_clusters(conn, changed, time.time())
+        conn.execute("DELETE FROM story_clusters WHERE id NOT IN (SELECT cluster_id FROM article_clusters)")
+        if bias_labels is not None:
+            # Clusters from before story_coverage existed have no row yet
+            missing = conn.execute("SELECT id FROM story_clusters WHERE id NOT IN (SELECT cluster_id FROM story_coverage)")
+            update_coverage(conn, changed.union(cluster for cluster, in missing), bias_labels)
+    return len(assigned), len(assignments), changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group ingested articles into story clusters")
+    parser.add_argument("--articles", default=str(DEFAULT_ARTICLES_PATH), help="SQLite article batch from ingest_feeds.py")
+    parser.add_argument("--hours", type=int, default=DEFAULT_HOURS, help=f"Cluster articles from the last N hours (default: {DEFAULT_HOURS})")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW, help=f"Max hours between joined articles (default: {DEFAULT_WINDOW})")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY, help=f"Min word-set similarity (default: {DEFAULT_SIMILARITY})")
+    parser.add_argument("--sources-dir", default=str(DEFAULT_SOURCES_DIR), help="Directory of source JSON files")
+    parser.add_argument("--catalog", default=str(DEFAULT_CATALOG_PATH), help="SQLite source catalog")
+    parser.add_argument("--trace", default=None, help="Write stage timings to this JSON-lines file")
+    args = parser.parse_args()
+
+    if args.trace:
+        set_tracer(Tracer(args.trace))
+
+    if not Path(args.articles).exists():
+        print(f"No article batch at {args.articles}; run ingest_feeds.py --format sqlite first")
+        sys.exit(1)
+
+    catalog = SourceCatalog(args.catalog)
+    catalog.build(args.sources_dir)
+    bias_labels = catalog.bias_labels()
+    catalog.close()
+
+    conn = sqlite3.connect(args.articles)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    conn.executescript(COVERAGE_SCHEMA)
+
+    started = time.perf_counter()
+    since = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+    articles = load_articles(conn, since)
+    clusters = cluster_articles(articles, window=timedelta(hours=args.window), similarity=args.similarity)
+    stored, assigned, changed = store_clusters(conn, articles, clusters, since, bias_labels)
+    conn.close()
+
+    print(f"Clustered {len(articles)} articles in {time.perf_counter() - started:.1f}s: "
+          f"{stored} stories with {assigned} articles, {len(articles) - assigned} unmatched, "
+          f"{len(changed)} stories changed")
+    largest = sorted(clusters, key=len, reverse=True)[:5]
+    for members in largest:
+        if len(members) > 1:
+            print(f"  {len(members):4d}  {articles[members[0]]['title']}")
+
+    get_tracer().print_summary()
+    get_tracer().close()
+
+
+if __name__ == '__main__':
+    main()
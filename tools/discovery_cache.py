@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache for feed discovery.
+
+Stores the verdict of every probed URL (feed, html or error) together with
+the validators (ETag / Last-Modified) the server sent, and optionally the
+fetched page body. Fresh verdicts are answered without touching the network;
+stale ones are revalidated with If-None-Match / If-Modified-Since so unchanged
+publishers only cost a 304 response.
+
+Usage:
+    from discovery_cache import DiscoveryCache
+
+    cache = DiscoveryCache()
+    entry = cache.lookup(url)
+"""
+
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'discovery_cache.sqlite'
+
+# How long a positive (feed) verdict is trusted without revalidation
+FEED_TTL = 7 * 24 * 3600
+# How long a negative (not a feed / gone) verdict is trusted
+NEGATIVE_TTL = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    content_type TEXT NOT NULL DEFAULT '',
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB,
+    checked_at REAL NOT NULL
+)
+"""
+
+
+class CacheEntry:
+    """A cached verdict for a single URL."""
+
+    def __init__(self, url, kind, content_type, etag, last_modified, body, checked_at):
+        self.url = url
+        self.kind = kind
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = zlib.decompress(body) if body is not None else None
+        self.checked_at = checked_at
+
+    def is_fresh(self, feed_ttl=FEED_TTL, negative_ttl=NEGATIVE_TTL, now=None):
+        """Whether the verdict can be used without asking the server again."""
+        ttl = feed_ttl if self.kind == "feed" else negative_ttl
+        return (now or time.time()) - self.checked_at < ttl
+
+    def conditional_headers(self):
+        """Request headers that let the server answer 304 Not Modified."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DiscoveryCache:
+    """Thread-safe SQLite cache of discovery verdicts and page validators."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, feed_ttl=FEED_TTL, negative_ttl=NEGATIVE_TTL):
+        self.path = Path(path)
+        self.feed_ttl = feed_ttl
+        self.negative_ttl = negative_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def lookup(self, url):
+        """Return the CacheEntry for `url`, or None if it was never seen."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, kind, content_type, etag, last_modified, body, checked_at FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def is_fresh(self, entry):
+        return entry.is_fresh(self.feed_ttl, self.negative_ttl)
+
+    def store(self, url, kind, content_type="", etag=None, last_modified=None, body=None):
+        """Record a new verdict (and optionally the page body) for `url`."""
+        packed = zlib.compress(body) if body is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (url, kind, content_type, etag, last_modified, body, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, kind, content_type, etag, last_modified, packed, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """Mark a cached verdict as revalidated (the server answered 304)."""
+        with self._lock:
+            self._conn.execute("UPDATE entries SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
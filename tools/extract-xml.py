@@ -1,11 +1,85 @@
 import argparse
+import codecs
+import io
 import re
 import sys
-import urllib.request
-import urllib.parse
+import threading
+import time
 import urllib.error
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from html.parser import HTMLParser
 
+from discovery_cache import DEFAULT_CACHE_PATH, DiscoveryCache
+from http_client import HttpClient
+from instrumentation import Tracer, get_tracer, set_tracer, traced
+from robots import RobotsCache
+from scheduler import DEFAULT_MAX_IN_FLIGHT, HostScheduler
+from sitemaps import read_sitemaps
+from source_catalog import DEFAULT_CATALOG_PATH, KnownFeeds, SourceCatalog
+from url_index import DEFAULT_SOURCES_DIR, UrlIndex
+
+# Default number of candidate feeds verified at the same time
+DEFAULT_CONCURRENCY = 16
+# Maximum number of simultaneous requests against a single host
+DEFAULT_PER_HOST_CONCURRENCY = 4
+# Requests per second allowed against a single host
+DEFAULT_HOST_RATE = 5.0
+# Timeout in seconds for feed probes
+PROBE_TIMEOUT = 5
+# Timeout in seconds for fetching the page being scanned
+PAGE_TIMEOUT = 30
+# Number of leading bytes used to tell feeds from HTML pages
+FEED_SNIFF_BYTES = 2000
+# Stop reading a page after this many bytes; feeds are advertised near the top
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+# Size of the chunks fed to the HTML parser while streaming a page
+STREAM_CHUNK_SIZE = 16 * 1024
+# Maximum number of pages fetched by a --depth crawl
+DEFAULT_MAX_PAGES = 30
+# Fetch results kept in memory; the least recently used ones are dropped first
+FETCH_CACHE_SIZE = 10_000
+# Seconds a failed fetch is remembered, so a long in-process run retries it
+ERROR_CACHE_TTL = 60
+
+# Links that look like they might point at a feed
+FEED_LINK_PATTERN = re.compile(r"\.xml$|\.rss$|feed|rss|atom", re.IGNORECASE)
+# Pages that usually list a site's feeds
+FEED_PAGE_PATTERN = re.compile(r"rss|feeds?|syndication|atom|xml", re.IGNORECASE)
+# Path segments of section pages that often advertise their own feed
+SECTION_SEGMENTS = {
+    "section", "sections", "topic", "topics", "category", "categories", "news",
+    "world", "us", "national", "politics", "business", "technology", "tech",
+    "science", "health", "sports", "arts", "culture", "opinion", "lifestyle",
+}
+# Links to these never lead to more feeds
+SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".pdf",
+    ".zip", ".mp3", ".mp4", ".css", ".js", ".json",
+)
+# Dated paths (/2025/06/10/...) are articles rather than section pages
+ARTICLE_PATH_PATTERN = re.compile(r"/(19|20)\d{2}/\d{1,2}/")
+# Minimum score_crawl_link() score for a sitemap URL to count as a section page
+SECTION_MIN_SCORE = 1
+
+# Per-host rate limits and in-flight caps applied to every fetch in this tool
+scheduler = HostScheduler(rate=DEFAULT_HOST_RATE, per_host=DEFAULT_PER_HOST_CONCURRENCY)
+# Shared pooled client used by every fetch in this tool
+http = HttpClient(timeout=PROBE_TIMEOUT, scheduler=scheduler)
+# robots.txt rules, fetched once per origin
+robots = RobotsCache(http)
+# Crawl-delay slows the host's token bucket down
+scheduler.crawl_delay = robots.crawl_delay
+# Persistent verdict/page cache, enabled with set_discovery_cache()
+discovery_cache = None
+
+
+def set_discovery_cache(cache):
+    """Use `cache` (a DiscoveryCache, or None to disable) for all fetches."""
+    global discovery_cache
+    discovery_cache = cache
+
 
 class FeedLinkParser(HTMLParser):
     def __init__(self, base_url):
@@ -13,10 +87,22 @@ class FeedLinkParser(HTMLParser):
         self.base_url = base_url
         self.links = []
         self.xml_links = []
+        self.head_closed = False
+
+    def is_done(self, scan_anchors=True):
+        """Whether the rest of the document can't add anything we're looking for."""
+        return not scan_anchors and self.head_closed and bool(self.xml_links)
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.head_closed = True
 
     def handle_starttag(self, tag, attrs):
         attrs_dict = dict(attrs)
 
+        if tag == "body":
+            self.head_closed = True
+
         # Extract links from <link> tags
         if tag == "link" and "href" in attrs_dict:
             link_type = attrs_dict.get("type", "") or ""
@@ -62,103 +148,537 @@ def is_audio_feed(url, title: str | None = ""):
     return False  # Not an audio feed
 
 
-def is_valid_feed(url):
-    """Check if the URL points to a valid RSS/Atom feed."""
+def looks_like_feed(content):
+    """Check whether the start of a document looks like an RSS/Atom feed."""
+    # Check for XML tags that typically appear in feeds
+    return (
+        ("<rss" in content and "<channel>" in content)
+        or (
+            "<feed" in content
+            and 'xmlns="http://www.w3.org/2005/Atom"' in content
+        )
+        or ("<?xml" in content and ("<rss" in content or "<feed" in content))
+    )
+
+
+class FetchError(Exception):
+    """Raised when the page to scan can't be fetched at all."""
+
+
+class FetchResult:
+    """The outcome of fetching a URL once, classified as feed, html or error."""
+
+    def __init__(self, url, kind, content_type="", head="", parser=None, scanned_anchors=False, error=None):
+        self.url = url
+        self.kind = kind
+        self.content_type = content_type
+        self.head = head
+        self.parser = parser
+        self.scanned_anchors = scanned_anchors
+        self.error = error
+
+    def satisfies(self, parse_html, scan_anchors):
+        """Whether this result can answer a fetch with the given requirements."""
+        if not parse_html or self.kind != "html":
+            return True
+        return self.parser is not None and (self.scanned_anchors or not scan_anchors)
+
+    @property
+    def is_feed(self):
+        return self.kind == "feed"
+
+    @property
+    def is_xml_feed(self):
+        """A feed that is also served with an XML content type."""
+        return self.is_feed and any(
+            xml_type in self.content_type for xml_type in ["xml", "rss", "atom"]
+        )
+
+
+# (fetch result, expiry or None) shared across the run, keyed by URL, least recently used first
+_fetch_cache = OrderedDict()
+_fetch_cache_lock = threading.Lock()
+
+
+def _cached_fetch(url):
+    with _fetch_cache_lock:
+        result, expires = _fetch_cache.get(url, (None, None))
+        if result is None:
+            return None
+        if expires is not None and time.monotonic() >= expires:
+            del _fetch_cache[url]
+            return None
+        _fetch_cache.move_to_end(url)
+        return result
+
+
+def _cache_fetch(url, result):
+    expires = time.monotonic() + ERROR_CACHE_TTL if result.kind == "error" else None
+    with _fetch_cache_lock:
+        _fetch_cache[url] = (result, expires)
+        _fetch_cache.move_to_end(url)
+        while len(_fetch_cache) > FETCH_CACHE_SIZE:
+            _fetch_cache.popitem(last=False)
+
+
+def stream_into_parser(response, parser, head=b"", scan_anchors=True, max_bytes=MAX_PAGE_BYTES):
+    """Feed a response to `parser` chunk by chunk as the bytes arrive.
+
+    Reading stops as soon as the parser has everything it needs (see
+    FeedLinkParser.is_done) or once `max_bytes` have been read. Returns the
+    raw bytes that were consumed.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    consumed = [head]
+    bytes_read = len(head)
+    parser.feed(decoder.decode(head))
+
+    while bytes_read < max_bytes and not parser.is_done(scan_anchors):
+        chunk = response.read(min(STREAM_CHUNK_SIZE, max_bytes - bytes_read))
+        if not chunk:
+            break
+        consumed.append(chunk)
+        bytes_read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return b"".join(consumed)
+
+
+def _result_from_entry(entry, parse_html, scan_anchors, max_bytes):
+    """Rebuild a FetchResult from a persistent cache entry."""
+    if entry.kind == "error":
+        return FetchResult(entry.url, "error", error="cached negative verdict")
+
+    body = entry.body or b""
+    head_text = body[:FEED_SNIFF_BYTES].decode("utf-8", errors="ignore")
+    if entry.kind == "html" and parse_html:
+        parser = FeedLinkParser(entry.url)
+        stream_into_parser(io.BytesIO(body), parser, scan_anchors=scan_anchors, max_bytes=max_bytes)
+        return FetchResult(entry.url, "html", entry.content_type, head_text, parser, scan_anchors)
+    return FetchResult(entry.url, entry.kind, entry.content_type, head_text)
+
+
+def _fetch_from_network(url, entry, parse_html, scan_anchors, max_bytes, timeout):
+    """Fetch `url`, revalidating `entry` if given, and record the verdict."""
+    headers = entry.conditional_headers() if entry is not None else None
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=5) as response:
-            content = response.read(2000).decode("utf-8", errors="ignore")
-            # Check for XML tags that typically appear in feeds
-            if (
-                ("<rss" in content and "<channel>" in content)
-                or (
-                    "<feed" in content
-                    and 'xmlns="http://www.w3.org/2005/Atom"' in content
+        with http.get(url, headers=headers, timeout=timeout) as response:
+            if response.status == 304 and entry is not None:
+                discovery_cache.touch(url)
+                return _result_from_entry(entry, parse_html, scan_anchors, max_bytes)
+
+            content_type = response.content_type
+            head = response.read(FEED_SNIFF_BYTES)
+            head_text = head.decode("utf-8", errors="ignore")
+            body = None
+
+            if looks_like_feed(head_text):
+                result = FetchResult(url, "feed", content_type, head_text)
+            elif parse_html:
+                parser = FeedLinkParser(url)
+                consumed = stream_into_parser(response, parser, head, scan_anchors, max_bytes)
+                result = FetchResult(url, "html", content_type, head_text, parser, scan_anchors)
+                # A page cut short by the early exit can't answer a later full scan
+                if not parser.is_done(scan_anchors):
+                    body = consumed
+            else:
+                result = FetchResult(url, "html", content_type, head_text)
+
+            if discovery_cache is not None:
+                discovery_cache.store(
+                    url,
+                    result.kind,
+                    content_type,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                    body=body,
                 )
-                or ("<?xml" in content and ("<rss" in content or "<feed" in content))
-            ):
-                return True
-            return False
-    except Exception:
-        return False
+            return result
+    except urllib.error.HTTPError as e:
+        # Client errors (404, 410, ...) are stable enough to remember; 429 is not
+        if discovery_cache is not None and 400 <= e.code < 500 and e.code != 429:
+            discovery_cache.store(url, "error")
+        return FetchResult(url, "error", error=e)
+    except Exception as e:
+        return FetchResult(url, "error", error=e)
+
+
+def fetch_url(url, parse_html=False, scan_anchors=True, max_bytes=MAX_PAGE_BYTES, timeout=None):
+    """Fetch a URL once and classify the response as a feed or an HTML page.
+
+    Only the first FEED_SNIFF_BYTES are read unless the response is HTML and
+    `parse_html` is requested, in which case the page is streamed into a
+    FeedLinkParser. Results are cached for the run (failures only for
+    ERROR_CACHE_TTL seconds), so a candidate pointing back at an already
+    fetched page does not cause another request. With a discovery cache
+    configured, fresh verdicts skip the network entirely and pages are
+    revalidated with a conditional GET.
+    """
+    cached = _cached_fetch(url)
+    if cached is not None and cached.satisfies(parse_html, scan_anchors):
+        return cached
+
+    entry = discovery_cache.lookup(url) if discovery_cache is not None else None
+    if entry is not None and entry.kind == "html" and parse_html and entry.body is None:
+        # Only the verdict is known; the page itself has to be downloaded again
+        entry = None
+
+    if entry is not None and discovery_cache.is_fresh(entry) and not (parse_html and entry.kind == "html"):
+        result = _result_from_entry(entry, parse_html, scan_anchors, max_bytes)
+    else:
+        result = _fetch_from_network(url, entry, parse_html, scan_anchors, max_bytes, timeout)
+
+    _cache_fetch(url, result)
+    return result
+
+
+@traced("is_valid_feed")
+def is_valid_feed(url):
+    """Check if the URL points to a valid RSS/Atom feed."""
+    return fetch_url(url).is_feed
 
 
 def check_if_xml_feed(url):
     """Check if the URL itself is an XML feed."""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=5) as response:
-            content_type = response.headers.get('content-type', '').lower()
-            content = response.read(2000).decode("utf-8", errors="ignore")
-            
-            # Check content type
-            if any(xml_type in content_type for xml_type in ['xml', 'rss', 'atom']):
-                # Verify it's actually a feed
-                if (
-                    ("<rss" in content and "<channel>" in content)
-                    or (
-                        "<feed" in content
-                        and 'xmlns="http://www.w3.org/2005/Atom"' in content
-                    )
-                    or ("<?xml" in content and ("<rss" in content or "<feed" in content))
-                ):
-                    return True
-            return False
-    except Exception:
-        return False
+    return fetch_url(url).is_xml_feed
 
 
-def extract_xml_links(url):
-    """Extract all XML links from a given URL."""
-    # First check if the URL itself is an XML feed
-    if check_if_xml_feed(url) and not is_audio_feed(url):
-        return [("Direct Feed", url)]
-    
-    try:
-        # Make a request to the URL
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            html = response.read().decode("utf-8", errors="ignore")
-
-        # Parse the HTML content
+def verify_feeds(candidates, concurrency=DEFAULT_CONCURRENCY):
+    """Verify (title, url) candidates concurrently, keeping only valid feeds.
+
+    At most `concurrency` checks run at once; per-host limits are enforced
+    by the scheduler. Results are returned in the order of `candidates`.
+    """
+    if not candidates:
+        return []
+
+    def check(candidate):
+        return is_valid_feed(candidate[1])
+
+    workers = max(1, min(concurrency, len(candidates)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # executor.map yields results in submission order
+        results = list(executor.map(check, candidates))
+
+    return [candidate for candidate, valid in zip(candidates, results) if valid]
+
+
+def collect_candidates(url, page, seen, scan_anchors=True, known_feeds=None):
+    """Split a fetched page's links into accepted feeds and candidates to probe.
+
+    Returns (accepted, potential): <link> feeds and already known feeds are
+    accepted as is, anchors that look like feeds need verification. `seen`
+    is a UrlIndex shared across pages so nothing is considered twice.
+    """
+    if page.is_xml_feed and not is_audio_feed(url):
+        return ([("Direct Feed", url)] if seen.add(url) else []), []
+
+    parser = page.parser
+    if parser is None:
+        # The page sniffed as a feed but isn't served as XML; parse what we have
         parser = FeedLinkParser(url)
-        parser.feed(html)
+        parser.feed(page.head)
+
+    accepted = [link for link in parser.xml_links if seen.add(link[1])]
+    anchors = parser.links if scan_anchors else []
+    links = [
+        urllib.parse.urljoin(url, link)
+        for link in anchors
+        if link and FEED_LINK_PATTERN.search(link)
+    ]
+    already_known, potential = split_candidates(links, seen, known_feeds)
+    return accepted + already_known, potential
 
-        # Process regular links to find potential feeds
-        xml_pattern = re.compile(r"\.xml$|\.rss$|feed|rss|atom", re.IGNORECASE)
-        xml_links = parser.xml_links.copy()
 
-        potential_feeds = []
-        for link in parser.links:
-            if link and xml_pattern.search(link):
-                absolute_url = urllib.parse.urljoin(url, link)
-                if absolute_url not in [x[1] for x in xml_links] and not is_audio_feed(absolute_url):  # Avoid duplicates and audio feeds
-                    potential_feeds.append(("Potential Feed", absolute_url))
+def split_candidates(urls, seen, known_feeds=None):
+    """Split feed-looking URLs into (already known, to probe) candidate lists.
+
+    Duplicates (per the shared `seen` UrlIndex) and audio feeds are dropped.
+    """
+    already_known = []
+    potential = []
+    for absolute_url in urls:
+        # Avoid duplicates and audio feeds
+        if is_audio_feed(absolute_url) or not seen.add(absolute_url):
+            continue
+        if known_feeds is not None and absolute_url in known_feeds:
+            already_known.append(("Known Feed", absolute_url))
+        else:
+            potential.append(("Potential Feed", absolute_url))
+
+    if already_known:
+        print(f"Skipping {len(already_known)} feeds already in the sources database", file=sys.stderr)
+    return already_known, potential
+
+
+def sitemap_links(url, concurrency=DEFAULT_CONCURRENCY):
+    """Read the site's sitemaps and return (feed URLs, section page URLs).
+
+    Sitemaps come from robots.txt, falling back to /sitemap.xml. Section
+    pages are ordered best first by score_crawl_link().
+    """
+    site = site_domain(url)
+    sitemap_urls = robots.sitemaps(url) or [urllib.parse.urljoin(url, "/sitemap.xml")]
+
+    def is_feed_url(loc):
+        parts = urllib.parse.urlsplit(loc)
+        return bool(FEED_LINK_PATTERN.search(parts.path + "?" + parts.query))
+
+    def keep(loc):
+        if not is_same_site(loc, site):
+            return False
+        if is_feed_url(loc):
+            return True
+        score = score_crawl_link(loc)
+        return score is not None and score >= SECTION_MIN_SCORE
+
+    locs = read_sitemaps(http, sitemap_urls, keep, concurrency=min(concurrency, DEFAULT_PER_HOST_CONCURRENCY))
+    feeds = [loc for loc in locs if is_feed_url(loc)]
+    sections = [loc for loc in locs if not is_feed_url(loc)]
+    # sort() is stable, so equally scored pages keep their sitemap order
+    sections.sort(key=lambda loc: -score_crawl_link(loc))
+    print(f"Sitemaps listed {len(feeds)} feed and {len(sections)} section URLs", file=sys.stderr)
+    return feeds, sections
+
+
+def sitemap_candidates(url, seen, known_feeds=None, max_pages=DEFAULT_MAX_PAGES, concurrency=DEFAULT_CONCURRENCY, max_bytes=MAX_PAGE_BYTES):
+    """Collect (accepted, potential) feed candidates from the site's sitemaps.
+
+    Feed URLs listed in the sitemaps become candidates directly; the best
+    `max_pages` section pages are fetched concurrently, head only, for the
+    <link> feeds they advertise.
+    """
+    feeds, sections = sitemap_links(url, concurrency)
+    already_known, potential = split_candidates(feeds, seen, known_feeds)
+
+    sections = [page_url for page_url in sections[:max_pages] if robots.can_fetch(page_url)]
+
+    def fetch_head(page_url):
+        return fetch_url(page_url, parse_html=True, scan_anchors=False, max_bytes=max_bytes, timeout=PAGE_TIMEOUT)
+
+    accepted = []
+    if sections:
+        workers = max(1, min(concurrency, len(sections)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(fetch_head, sections))
+        for page_url, page in zip(sections, pages):
+            if page.kind != "error":
+                page_accepted, _ = collect_candidates(page_url, page, seen, scan_anchors=False, known_feeds=known_feeds)
+                accepted.extend(page_accepted)
+
+    return already_known + accepted, potential
+
+
+@traced("extract_xml_links")
+def extract_xml_links(
+    url,
+    concurrency=DEFAULT_CONCURRENCY,
+    scan_anchors=False,
+    max_bytes=MAX_PAGE_BYTES,
+    known_feeds=None,
+    depth=0,
+    max_pages=DEFAULT_MAX_PAGES,
+    use_sitemaps=False,
+    raise_errors=False,
+):
+    """Extract all XML links from a given URL.
+
+    By default only the <link> feeds advertised in the page head are used,
+    and reading stops at </head> once there are any; pages that advertise
+    none are read on and their feed-looking anchors probed instead. With
+    `scan_anchors` the anchors of every page are probed as well.
+    Candidates found in `known_feeds` (a UrlIndex) are accepted without
+    being probed again. A `depth` above zero crawls same-site pages as well
+    (see crawl_for_feeds), and `use_sitemaps` adds the feeds and section
+    pages listed in the site's sitemaps. With `raise_errors`, failing to
+    fetch the page raises FetchError instead of returning no feeds.
+    """
+    if depth > 0:
+        return crawl_for_feeds(
+            url,
+            depth=depth,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            max_bytes=max_bytes,
+            known_feeds=known_feeds,
+            use_sitemaps=use_sitemaps,
+            raise_errors=raise_errors,
+        )
+
+    # Fetch the page once; the response tells us whether it is a feed itself
+    page = fetch_url(url, parse_html=True, scan_anchors=scan_anchors, max_bytes=max_bytes, timeout=PAGE_TIMEOUT)
+    if page.kind == "error":
+        if raise_errors:
+            raise FetchError(f"Error fetching {url}: {page.error}")
+        print(f"Error fetching URL: {page.error}", file=sys.stderr)
+        return []
+
+    if page.parser is not None and not page.parser.xml_links:
+        # Nothing advertised in the head, so the page was read on; fall back to its anchors
+        scan_anchors = True
+
+    try:
+        seen = UrlIndex()
+        verified_feeds, potential_feeds = collect_candidates(url, page, seen, scan_anchors, known_feeds)
+        if use_sitemaps and not page.is_xml_feed:
+            sitemap_accepted, sitemap_potential = sitemap_candidates(
+                url, seen, known_feeds, max_pages=max_pages, concurrency=concurrency, max_bytes=max_bytes
+            )
+            verified_feeds.extend(sitemap_accepted)
+            potential_feeds.extend(sitemap_potential)
 
         # Verify which potential feeds are actually RSS/Atom feeds
-        verified_feeds = xml_links.copy()
         print(f"Checking {len(potential_feeds)} potential feeds...", file=sys.stderr)
-
-        for title, feed_url in potential_feeds:
-            if is_valid_feed(feed_url):
-                verified_feeds.append((title, feed_url))
+        verified_feeds.extend(verify_feeds(potential_feeds, concurrency=concurrency))
 
         return verified_feeds
 
-    except urllib.error.URLError as e:
-        print(f"Error fetching URL: {e}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error parsing {url}: {e}", file=sys.stderr)
         return []
 
 
+def discover_feeds(url, **options):
+    """Library entry point: discover the feeds published by `url`.
+
+    Accepts the keyword arguments of extract_xml_links() and returns a list
+    of {'title': ..., 'url': ...} dicts. Raises FetchError if the page itself
+    can't be fetched. The module's HTTP pool, robots and fetch caches are
+    shared by every call in the same process.
+    """
+    return [
+        {"title": title, "url": feed_url}
+        for title, feed_url in extract_xml_links(url, raise_errors=True, **options)
+    ]
+
+
+def site_domain(url):
+    """The host of `url` without a leading 'www.', used to stay on one site."""
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def is_same_site(url, site):
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return host == site or host.endswith("." + site)
+
+
+def score_crawl_link(url):
+    """Rank a same-site link by how likely it is to lead to feeds.
+
+    Returns None for links that are not worth fetching at all.
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path.lower()
+    if parts.scheme not in ("http", "https") or path.endswith(SKIP_EXTENSIONS):
+        return None
+    segments = [segment for segment in path.split("/") if segment]
+    if ARTICLE_PATH_PATTERN.search(path) or any(len(segment) > 40 for segment in segments):
+        return None
+
+    score = 0
+    if FEED_PAGE_PATTERN.search(path):
+        score += 10
+    score += 3 * sum(1 for segment in segments if segment in SECTION_SEGMENTS)
+    score -= len(segments)
+    if parts.query:
+        score -= 2
+    return score
+
+
+def crawl_for_feeds(
+    start_url,
+    depth=1,
+    max_pages=DEFAULT_MAX_PAGES,
+    concurrency=DEFAULT_CONCURRENCY,
+    max_bytes=MAX_PAGE_BYTES,
+    known_feeds=None,
+    use_sitemaps=False,
+    raise_errors=False,
+):
+    """Breadth-first crawl of same-site pages collecting their feeds.
+
+    Each level's pages are fetched concurrently, paced by the scheduler's
+    per-host rate (or slower if robots.txt asks for a Crawl-delay), and
+    pages disallowed by robots.txt are skipped. The next level is made of
+    the best scoring links (see score_crawl_link) until `max_pages` pages
+    have been fetched. With `use_sitemaps`, feeds listed in the sitemaps are
+    probed with the start page and their section pages join the first
+    crawl level. Results are in discovery order.
+    """
+    site = site_domain(start_url)
+    queued = UrlIndex([start_url])
+    seen = UrlIndex()
+    found = []
+    frontier = [start_url]
+    pages_fetched = 0
+
+    def fetch_page(page_url):
+        if page_url != start_url and not robots.can_fetch(page_url):
+            return None
+        return fetch_url(page_url, parse_html=True, max_bytes=max_bytes, timeout=PAGE_TIMEOUT)
+
+    for level in range(depth + 1):
+        frontier = frontier[: max_pages - pages_fetched]
+        if not frontier:
+            break
+        pages_fetched += len(frontier)
+        print(f"Crawling {len(frontier)} pages at depth {level}...", file=sys.stderr)
+
+        workers = max(1, min(concurrency, len(frontier)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(fetch_page, frontier))
+        if level == 0 and raise_errors and pages[0] is not None and pages[0].kind == "error":
+            raise FetchError(f"Error fetching {start_url}: {pages[0].error}")
+
+        level_candidates = []
+        next_links = []
+        for page_url, page in zip(frontier, pages):
+            if page is None or page.kind == "error":
+                continue
+            accepted, potential = collect_candidates(page_url, page, seen, known_feeds=known_feeds)
+            level_candidates.extend((candidate, True) for candidate in accepted)
+            level_candidates.extend((candidate, False) for candidate in potential)
+
+            if page.parser is not None and level < depth:
+                next_links.extend(urllib.parse.urljoin(page_url, link) for link in page.parser.links)
+
+        if level == 0 and use_sitemaps:
+            sitemap_feeds, sitemap_sections = sitemap_links(start_url, concurrency)
+            already_known, potential = split_candidates(sitemap_feeds, seen, known_feeds)
+            level_candidates.extend((candidate, True) for candidate in already_known)
+            level_candidates.extend((candidate, False) for candidate in potential)
+            next_links.extend(sitemap_sections)
+
+        # Verify the level's candidates in one concurrent batch, keeping page order
+        to_verify = [candidate for candidate, accepted in level_candidates if not accepted]
+        print(f"Checking {len(to_verify)} potential feeds...", file=sys.stderr)
+        valid = {feed_url for _, feed_url in verify_feeds(to_verify, concurrency=concurrency)}
+        level_found = [
+            candidate for candidate, accepted in level_candidates
+            if accepted or candidate[1] in valid
+        ]
+        found.extend(level_found)
+
+        # Feeds are never crawled as pages; only score the remaining same-site links
+        feed_urls = UrlIndex(feed_url for _, feed_url in found)
+        scored = []
+        for link in next_links:
+            if not is_same_site(link, site) or link in feed_urls:
+                continue
+            score = score_crawl_link(link)
+            if score is not None and queued.add(link):
+                scored.append((score, link))
+
+        # sort() is stable, so equally scored links keep their page order
+        scored.sort(key=lambda item: -item[0])
+        frontier = [link for _, link in scored]
+
+    return found
+
+
 def main():
     # Set up command line arguments
     parser = argparse.ArgumentParser(description="Extract XML/RSS links from a website")
@@ -169,10 +689,121 @@ def main():
         help="Output file to save the results",
         default=None,
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=PROBE_TIMEOUT,
+        help=f"Timeout in seconds for each feed probe (default: {PROBE_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Number of candidate feeds to verify in parallel (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--scan-anchors",
+        action="store_true",
+        help="Also probe feed-looking anchors when the page head advertises feeds (reads the whole page)",
+    )
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        default=MAX_PAGE_BYTES,
+        help=f"Stop reading a page after this many bytes (default: {MAX_PAGE_BYTES})",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=str(DEFAULT_CACHE_PATH),
+        help="SQLite file used to cache verdicts and pages between runs",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the on-disk discovery cache",
+    )
+    parser.add_argument(
+        "--sources-dir",
+        default=str(DEFAULT_SOURCES_DIR),
+        help="Directory of source JSON files whose feeds are already known",
+    )
+    parser.add_argument(
+        "--catalog",
+        default=str(DEFAULT_CATALOG_PATH),
+        help="SQLite source catalog, refreshed from --sources-dir before the run",
+    )
+    parser.add_argument(
+        "--reverify-known",
+        action="store_true",
+        help="Probe candidates even if they are already listed in the sources",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=0,
+        help="Also crawl same-site pages up to this many links away (default: 0)",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=DEFAULT_MAX_PAGES,
+        help=f"Page budget for --depth crawls (default: {DEFAULT_MAX_PAGES})",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_HOST_RATE,
+        help=f"Maximum requests per second per host (default: {DEFAULT_HOST_RATE})",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=DEFAULT_PER_HOST_CONCURRENCY,
+        help=f"Maximum simultaneous requests per host (default: {DEFAULT_PER_HOST_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT,
+        help=f"Maximum simultaneous requests overall (default: {DEFAULT_MAX_IN_FLIGHT})",
+    )
+    parser.add_argument(
+        "--sitemaps",
+        action="store_true",
+        help="Also look for feeds and section pages in the site's sitemaps",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write per-request and per-stage timings to this JSON-lines file and print a latency summary",
+    )
     args = parser.parse_args()
+    http.timeout = args.timeout
+    scheduler.rate = args.rate
+    scheduler.per_host = max(1, args.per_host)
+    scheduler.max_in_flight = max(1, args.max_in_flight)
+    if args.trace:
+        set_tracer(Tracer(args.trace))
+    if not args.no_cache:
+        set_discovery_cache(DiscoveryCache(args.cache_path))
+    known_feeds = None
+    if not args.reverify_known:
+        catalog = SourceCatalog(args.catalog)
+        catalog.build(args.sources_dir)
+        known_feeds = KnownFeeds(catalog)
 
     # Extract XML links
-    xml_links = extract_xml_links(args.url)
+    xml_links = extract_xml_links(
+        args.url,
+        concurrency=args.concurrency,
+        scan_anchors=args.scan_anchors,
+        max_bytes=args.max_bytes,
+        known_feeds=known_feeds,
+        depth=args.depth,
+        max_pages=args.max_pages,
+        use_sitemaps=args.sitemaps,
+    )
 
     # Print results
     if xml_links:
@@ -188,6 +819,9 @@ def main():
     else:
         print("No RSS/Atom feeds found")
 
+    get_tracer().print_summary()
+    get_tracer().close()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Streaming RSS 2.0 / RSS 1.0 (RDF) / Atom parser for the feed tools.
+
+Bytes are pushed into an incremental XML parser as they arrive from the
+network, and every <item> / <entry> is handed out (and dropped from memory)
+as soon as its closing tag has been read, so large feeds never sit in memory
+and callers can stop reading early.
+
+Items are plain dicts with the fields NewsAggregatorService reads from
+SimpleXML, as raw strings ('' when missing):
+    title, link, guid, description, published, author
+
+Usage:
+    from feed_parser import iter_feed_items
+
+    with http.get(url) as response:
+        for item in iter_feed_items(response.iter_chunks()):
+            ...
+"""
+
+import email.utils
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+# Root elements of the supported formats
+FEED_FORMATS = {'rss': 'rss', 'rdf': 'rdf', 'feed': 'atom'}
+ITEM_TAGS = {'item', 'entry'}
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+DC_NS = 'http://purl.org/dc/elements/1.1/'
+
+
+class NotAFeedError(ValueError):
+    """The document is XML, but not an RSS or Atom feed."""
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def namespace(tag):
+    return tag[1:].split('}', 1)[0] if tag.startswith('{') else ''
+
+
+def parse_feed_date(value):
+    """Parse an RFC 822 (RSS) or ISO 8601 (Atom, Dublin Core) date into an aware datetime."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def element_text(element):
+    """Text of an element; XHTML content (Atom type="xhtml") is flattened."""
+    if len(element):
+        return ''.join(element.itertext())
+    return element.text or ''
+
+
+def item_fields(element):
+    """Map an <item> or <entry> element to the raw item dict."""
+    fields = {}
+    atom_links = []
+    for child in element:
+        name = local_name(child.tag)
+        ns = namespace(child.tag)
+
+        if name == 'link':
+            if (child.text or '').strip():
+                fields.setdefault('link', child.text.strip())
+            elif child.get('rel', 'alternate') == 'alternate' and child.get('href'):
+                atom_links.append(child.get('href').strip())
+        elif name == 'title' and ns != DC_NS:
+            fields.setdefault('title', element_text(child))
+        elif name in ('guid', 'id'):
+            fields.setdefault('guid', (child.text or '').strip())
+        elif name == 'description' or (name == 'summary' and ns == ATOM_NS):
+            fields.setdefault('description', element_text(child))
+        elif name == 'content' and ns == ATOM_NS:
+            fields.setdefault('content', element_text(child))
+        elif name == 'pubdate':
+            fields.setdefault('pubdate', (child.text or '').strip())
+        elif name == 'date' and ns == DC_NS:
+            fields.setdefault('dc_date', (child.text or '').strip())
+        elif name in ('published', 'updated') and ns == ATOM_NS:
+            fields.setdefault(name, (child.text or '').strip())
+        elif name == 'author':
+            # RSS: an e-mail address as text; Atom: <author><name>...</name></author>
+            author = (child.text or '').strip()
+            if not author:
+                author = next((grandchild.text or '' for grandchild in child if local_name(grandchild.tag) == 'name'), '')
+            fields.setdefault('author', author.strip())
+        elif name == 'creator' and ns == DC_NS:
+            fields.setdefault('dc_creator', (child.text or '').strip())
+
+    # Same precedence as NewsAggregatorService: link ?? guid, pubDate ?? dc:date, author ?? dc:creator
+    return {
+        'title': fields.get('title', ''),
+        'link': fields.get('link') or (atom_links[0] if atom_links else ''),
+        'guid': fields.get('guid', ''),
+        'description': fields.get('description') or fields.get('content', ''),
+        'published': (
+            fields.get('pubdate') or fields.get('dc_date')
+            or fields.get('published') or fields.get('updated', '')
+        ),
+        'author': fields.get('author') or fields.get('dc_creator', ''),
+    }
+
+
+class FeedParser:
+    """Incremental feed parser: feed() bytes in, get the completed items back."""
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack = []
+        self.format = None
+
+    @property
+    def is_feed(self):
+        return self.format is not None
+
+    def feed(self, data):
+        """Parse another chunk; returns the items it completed.
+
+        Raises NotAFeedError as soon as the root element shows this is not a
+        feed, and xml.etree.ElementTree.ParseError on malformed XML.
+        """
+        self._parser.feed(data)
+        return self._read_items()
+
+    def close(self):
+        """Finish parsing; returns the items completed by the end of the document."""
+        self._parser.close()
+        return self._read_items()
+
+    def _read_items(self):
+        items = []
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if not self._stack:
+                    self.format = FEED_FORMATS.get(local_name(element.tag))
+                    if self.format is None:
+                        raise NotAFeedError(f"root element <{local_name(element.tag)}> is not a feed")
+                self._stack.append(element)
+                continue
+
+            self._stack.pop()
+            if local_name(element.tag) in ITEM_TAGS:
+                items.append(item_fields(element))
+                # Drop the finished item from its parent so memory stays flat
+                if self._stack and len(self._stack[-1]) and self._stack[-1][-1] is element:
+                    del self._stack[-1][-1]
+        return items
+
+
+def iter_feed_items(chunks):
+    """Yield the items of a feed from an iterable of byte chunks, as they complete."""
+    parser = FeedParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the feed tools.
+
+Keeps a pool of keep-alive connections per host so that repeated requests
+against the same publisher reuse a single TCP/TLS handshake, and transparently
+decodes gzip/deflate encoded responses. With a HostScheduler attached, every
+request waits for a politeness slot first (see scheduler.py).
+
+Usage:
+    from http_client import HttpClient
+
+    client = HttpClient(timeout=5)
+    with client.get("https://rss.nytimes.com/services/xml/rss/nyt/World.xml") as response:
+        content = response.read(2000)
+"""
+
+import http.client
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+
+from instrumentation import get_tracer
+from scheduler import parse_retry_after
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+
+DEFAULT_HEADERS = {
+    "User-Agent": DEFAULT_USER_AGENT,
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+# Default socket timeout in seconds
+DEFAULT_TIMEOUT = 10
+# Idle connections kept open per host
+DEFAULT_MAX_IDLE_PER_HOST = 8
+# Maximum number of redirects followed for a single request
+MAX_REDIRECTS = 5
+# Unread response bodies up to this size are drained so the connection can be reused
+DRAIN_LIMIT = 64 * 1024
+# Size of the raw reads performed on the socket
+CHUNK_SIZE = 16 * 1024
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Statuses telling us to slow down; the host is backed off per Retry-After
+BACKOFF_STATUSES = {429, 503}
+
+
+class Response:
+    """A decoded HTTP response whose connection returns to the pool on close."""
+
+    def __init__(self, client, pool_key, connection, raw, url, timing=None, slot=None):
+        self._client = client
+        self._slot = slot
+        self._pool_key = pool_key
+        self._connection = connection
+        self._raw = raw
+        self._buffer = b""
+        self._eof = False
+        # started/connect/ttfb/reused of the request, reported on close()
+        self._timing = timing or {}
+        self._wire_bytes = 0
+        self._bytes = 0
+        self.url = url
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers
+        self.content_type = (raw.headers.get("content-type", "") or "").lower()
+
+        encoding = (raw.headers.get("content-encoding", "") or "").lower()
+        if encoding == "gzip":
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decoder = _DeflateDecoder()
+        else:
+            self._decoder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _fill(self):
+        """Read and decode whatever raw bytes are available (up to CHUNK_SIZE) into the buffer."""
+        raw = self._raw.read1(CHUNK_SIZE)
+        if not raw:
+            self._eof = True
+            if self._decoder is not None:
+                tail = self._decoder.flush()
+                self._bytes += len(tail)
+                self._buffer += tail
+            return
+        self._wire_bytes += len(raw)
+        if self._decoder is not None:
+            raw = self._decoder.decompress(raw)
+        self._bytes += len(raw)
+        self._buffer += raw
+
+    def read(self, amt=None):
+        """Read up to `amt` decoded bytes, or the whole body when `amt` is None."""
+        while not self._eof and (amt is None or len(self._buffer) < amt):
+            self._fill()
+
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def iter_chunks(self, size=CHUNK_SIZE):
+        """Yield decoded chunks of the body, at most `size` bytes each, as they arrive."""
+        while True:
+            if not self._buffer:
+                if self._eof:
+                    return
+                self._fill()
+                continue
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+            yield chunk
+
+    def text(self, amt=None, encoding="utf-8"):
+        """Read the body (or its first `amt` bytes) decoded as text."""
+        return self.read(amt).decode(encoding, errors="ignore")
+
+    def close(self):
+        """Release the connection back to the pool, or drop it if it can't be reused."""
+        if self._connection is None:
+            return
+
+        connection, self._connection = self._connection, None
+        reusable = not self._raw.will_close
+        if reusable and not self._raw.isclosed():
+            # Drain small leftovers so the next request can reuse the socket
+            remaining = self._raw.length
+            if remaining is not None and remaining <= DRAIN_LIMIT:
+                try:
+                    self._raw.read()
+                except (OSError, http.client.HTTPException):
+                    reusable = False
+            else:
+                reusable = False
+
+        self._raw.close()
+        if reusable:
+            self._client._release(self._pool_key, connection)
+        else:
+            connection.close()
+        if self._slot is not None:
+            self._client.scheduler.release(self._slot)
+            self._slot = None
+
+        tracer = get_tracer()
+        if tracer.enabled and self._timing:
+            tracer.request(
+                self.url,
+                method=self._timing.get("method"),
+                queued=self._timing.get("queued"),
+                status=self.status,
+                reused=self._timing.get("reused"),
+                connect=self._timing.get("connect"),
+                ttfb=self._timing.get("ttfb"),
+                total=time.perf_counter() - self._timing["started"],
+                wire_bytes=self._wire_bytes,
+                bytes=self._bytes,
+            )
+
+
+class _DeflateDecoder:
+    """Decoder for 'deflate' bodies, which servers send either zlib-wrapped or raw."""
+
+    def __init__(self):
+        self._decoder = None
+        self._pending = b""
+
+    def decompress(self, data):
+        if self._decoder is None:
+            self._pending += data
+            if len(self._pending) < 2:
+                return b""
+            data, self._pending = self._pending, b""
+            try:
+                self._decoder = zlib.decompressobj()
+                return self._decoder.decompress(data)
+            except zlib.error:
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decoder.decompress(data)
+
+    def flush(self):
+        if self._decoder is None:
+            return self.decompress(b"") if self._pending else b""
+        return self._decoder.flush()
+
+
+class HttpClient:
+    """Thread-safe HTTP client with per-host keep-alive connection pooling."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, headers=None, max_idle_per_host=DEFAULT_MAX_IDLE_PER_HOST, scheduler=None):
+        self.timeout = timeout
+        # Optional HostScheduler every request takes a slot from
+        self.scheduler = scheduler
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _acquire(self, pool_key, timeout):
+        """Take an idle connection for the host, or open a new one."""
+        with self._lock:
+            idle = self._idle.get(pool_key)
+            if idle:
+                connection = idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+
+        return self._new_connection(pool_key, timeout), False
+
+    def _new_connection(self, pool_key, timeout):
+        scheme, host, port = pool_key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _release(self, pool_key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(pool_key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _send(self, method, url, headers, timeout):
+        """Send a single request (no redirect handling) and return the Response."""
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise urllib.error.URLError(f"unsupported URL scheme: {scheme!r}")
+        if not parsed.hostname:
+            raise urllib.error.URLError(f"no host given in URL: {url}")
+
+        pool_key = (scheme, parsed.hostname.lower(), parsed.port or (443 if scheme == "https" else 80))
+        target = parsed.path or "/"
+        if parsed.query:
+            target += "?" + parsed.query
+
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update(headers)
+
+        slot = None
+        queued = None
+        if self.scheduler is not None:
+            queue_started = time.perf_counter()
+            slot = self.scheduler.acquire(url)
+            queued = time.perf_counter() - queue_started
+
+        started = time.perf_counter()
+        timing = {"method": method, "started": started, "connect": None, "queued": queued}
+        try:
+            connection, reused = self._acquire(pool_key, timeout)
+        except Exception:
+            if slot is not None:
+                self.scheduler.release(slot)
+            raise
+        try:
+            try:
+                raw = self._exchange(connection, method, target, request_headers, timing)
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry on a fresh one
+                reused = False
+                connection = self._new_connection(pool_key, timeout)
+                raw = self._exchange(connection, method, target, request_headers, timing)
+        except Exception as e:
+            connection.close()
+            if slot is not None:
+                self.scheduler.release(slot)
+            tracer = get_tracer()
+            if tracer.enabled:
+                tracer.request(
+                    url,
+                    method=method,
+                    queued=queued,
+                    reused=reused,
+                    connect=timing["connect"],
+                    total=time.perf_counter() - started,
+                    error=repr(e),
+                )
+            raise
+
+        timing["reused"] = reused
+        timing["ttfb"] = time.perf_counter() - started
+        return Response(self, pool_key, connection, raw, url, timing, slot)
+
+    @staticmethod
+    def _exchange(connection, method, target, headers, timing):
+        """Send the request on `connection` and wait for the response headers."""
+        if connection.sock is None:
+            # Connecting explicitly lets us time DNS + TCP + TLS on their own
+            connect_started = time.perf_counter()
+            connection.connect()
+            timing["connect"] = time.perf_counter() - connect_started
+        connection.request(method, target, headers=headers)
+        return connection.getresponse()
+
+    def request(self, method, url, headers=None, timeout=None, follow_redirects=True):
+        """Perform a request and return a Response.
+
+        Redirects are followed. Responses with a 4xx/5xx status raise
+        urllib.error.HTTPError so callers can keep their urllib error handling;
+        a 429/503 also backs the host off in the scheduler.
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(method, url, headers, timeout)
+            location = response.headers.get("location")
+            if follow_redirects and response.status in REDIRECT_STATUSES and location:
+                response.close()
+                url = urllib.parse.urljoin(url, location)
+                if response.status == 303:
+                    method = "GET"
+                continue
+
+            if response.status >= 400:
+                response.close()
+                if self.scheduler is not None and response.status in BACKOFF_STATUSES:
+                    self.scheduler.backoff(url, parse_retry_after(response.headers.get("retry-after")))
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            return response
+
+        raise urllib.error.URLError(f"too many redirects for {url}")
+
+    def get(self, url, headers=None, timeout=None):
+        """Perform a GET request and return a Response."""
+        return self.request("GET", url, headers=headers, timeout=timeout)
+
+    def close(self):
+        """Close every idle pooled connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
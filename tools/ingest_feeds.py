@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+"""
+Feed ingestion: fetch every active feed and emit normalized articles.
+
+All active feeds of the active sources in database/sources are fetched
+concurrently (within the scheduler's per-host limits) and parsed while they
+stream in. Items are turned into articles exactly like
+NewsAggregatorService::createArticleFromFeedItem() does it: cleaned title,
+cleaned and truncated summary, keywords, link (or guid) as the URL, and
+items older than --hours skipped. The batch is written as JSON lines, to
+a SQLite file the web app can read instead of fetching feeds live, or
+(--format database) straight into the web app's articles table. SQLite
+output goes through a single writer thread that upserts in batches, so the
+fetchers never wait for the database. A SQLite batch file also gets a
+full-text search index (see search_index.py), updated with every batch.
+
+Most feeds list their items newest first. Every run checks whether the
+item dates of each feed are in that order, and once a feed has been ordered
+for a few runs in a row (see storage/app/private/ingest_state.sqlite) it is
+only read until its items are safely past the cutoff. Any out-of-order item
+puts the feed back on full scans, and trusted feeds are still scanned fully
+every few runs to keep checking the tail.
+
+Items already ingested by an earlier run, with the same title, description,
+author and date, are skipped before they are normalized (see seen_items.py),
+so a run only emits new and edited articles. That needs an output that keeps
+what earlier runs wrote: SQLite, or JSONL with --append. Without --append the
+JSONL file is replaced, so every run writes all current articles. Use --all to
+emit everything again, e.g. after deleting the output.
+
+Usage:
+    python tools/ingest_feeds.py
+    python tools/ingest_feeds.py --format sqlite --output storage/app/private/articles.sqlite
+    python tools/ingest_feeds.py --format database --batch-size 1000
+    python tools/ingest_feeds.py --hours 48 --source nytimes --source npr
+    python tools/ingest_feeds.py --early-stop off
+    python tools/ingest_feeds.py --append
+    python tools/ingest_feeds.py --all
+"""
+
+import abc
+import argparse
+import functools
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from feed_parser import NotAFeedError, iter_feed_items, parse_feed_date
+from http_client import HttpClient
+from instrumentation import Tracer, get_tracer, set_tracer, traced
+from normalize import clean_description, clean_title, extract_keywords
+from scheduler import HostScheduler
+from search_index import ensure_search_index
+from seen_items import SeenItemIndex, content_hash
+from source_catalog import DEFAULT_CATALOG_PATH, SourceCatalog
+from url_index import DEFAULT_SOURCES_DIR
+
+DEFAULT_OUTPUT_DIR = Path(__file__).parent.parent / 'storage' / 'app' / 'private'
+DEFAULT_STATE_PATH = DEFAULT_OUTPUT_DIR / 'ingest_state.sqlite'
+DEFAULT_APP_DATABASE = Path(__file__).parent.parent / 'database' / 'database.sqlite'
+
+# Only keep articles published within this many hours (NewsAggregatorService's $hoursBack)
+DEFAULT_HOURS_BACK = 24
+# Timeout in seconds for each feed
+DEFAULT_TIMEOUT = 10
+# Maximum number of feeds fetched at the same time
+DEFAULT_CONCURRENCY = 32
+CHUNK_SIZE = 64 * 1024
+# Maximum number of articles upserted in one transaction
+DEFAULT_BATCH_SIZE = 500
+# How Laravel stores datetimes in SQLite
+APP_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# What to do once an ordered feed is past the cutoff: 'read' stops reading the
+# response, 'parse' only stops parsing (keeps the connection reusable), 'off' never stops
+EARLY_STOP_MODES = ('read', 'parse', 'off')
+# An item may be this much newer than an earlier item and still count as ordered;
+# reading stops once the items are this far past the cutoff
+ORDER_MARGIN = timedelta(hours=6)
+# Ordered full scans in a row before a feed is trusted to be ordered
+ORDER_CONFIDENCE = 3
+# Dated items a scan needs to say anything about the order of a feed
+ORDER_MIN_ITEMS = 3
+# Trusted feeds are still scanned fully after this many early stops
+RECHECK_EVERY = 10
+
+# Items unchanged for this long are dropped from the seen-item index
+# (at least twice --hours, so they are long past the cutoff)
+SEEN_RETENTION = timedelta(days=30)
+
+# Feed hosts serve many small files; allow more parallelism than page crawls
+HOST_RATE = 10.0
+HOST_CONCURRENCY = 8
+
+ARTICLES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    feed_url TEXT NOT NULL,
+    category TEXT NOT NULL,
+    title TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    author TEXT NOT NULL,
+    guid TEXT,
+    published_at TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_published_at ON articles (published_at);
+CREATE INDEX IF NOT EXISTS articles_source ON articles (source, published_at);
+"""
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feed_order (
+    url TEXT PRIMARY KEY,
+    ordered_runs INTEGER NOT NULL DEFAULT 0,
+    early_stops INTEGER NOT NULL DEFAULT 0,
+    ordered INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def build_article(item, feed, published_at):
+    """Turn a parsed feed item into an article dict, or None if it has no URL."""
+    url = item['link'] or item['guid']
+    if not url:
+        return None
+
+    title = clean_title(item['title'])
+    summary = clean_description(item['description'])
+    return {
+        'url': url,
+        'source': feed['source'],
+        'feed_url': feed['url'],
+        'category': feed['category'],
+        'title': title,
+        'summary': summary,
+        'author': item['author'] or 'Unknown',
+        'guid': item['guid'] or None,
+        'published_at': published_at.astimezone(timezone.utc).isoformat(),
+        'keywords': extract_keywords(f"{title} {summary}"),
+    }
+
+
+class OrderCheck:
+    """Watches the item dates of one scan for newest-first order.
+
+    A feed counts as ordered while no item is more than ORDER_MARGIN newer
+    than the oldest item before it. In such a feed nothing after an item
+    older than cutoff - ORDER_MARGIN can be newer than the cutoff, so the
+    rest of it can be skipped.
+    """
+
+    def __init__(self, cutoff):
+        self.cutoff = cutoff
+        self.oldest = None
+        self.dated = 0
+        self.in_order = True
+
+    def add(self, published):
+        if published is None:
+            # Undated items count as new wherever they are, so no position is safe to stop at
+            self.in_order = False
+            return
+        self.dated += 1
+        if self.oldest is not None and published > self.oldest + ORDER_MARGIN:
+            self.in_order = False
+        if self.oldest is None or published < self.oldest:
+            self.oldest = published
+
+    @property
+    def past_cutoff(self):
+        return self.in_order and self.oldest is not None and self.oldest < self.cutoff - ORDER_MARGIN
+
+    @property
+    def ordered(self):
+        """True or False once the scan has shown the order of the feed, else None."""
+        if not self.in_order:
+            return False
+        return True if self.dated >= ORDER_MIN_ITEMS else None
+
+
+class FeedOrderStore:
+    """Thread-safe SQLite record of which feeds have been seen to list their items in order."""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(STATE_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def can_stop_early(self, url):
+        """True if `url` is trusted to be ordered and is not due for a full scan."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ordered, early_stops FROM feed_order WHERE url = ?", (url,)
+            ).fetchone()
+        return row is not None and bool(row[0]) and row[1] < RECHECK_EVERY
+
+    def record(self, url, ordered, stopped_early=False):
+        """Learn from one scan: `ordered` is OrderCheck.ordered of a scan that
+        read the whole feed, or stopped early."""
+        if ordered is None:
+            return
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ordered_runs, early_stops FROM feed_order WHERE url = ?", (url,)
+            ).fetchone()
+            ordered_runs, early_stops = row or (0, 0)
+            if not ordered:
+                ordered_runs, early_stops = 0, 0
+            elif stopped_early:
+                early_stops += 1
+            else:
+                ordered_runs, early_stops = ordered_runs + 1, 0
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feed_order (url, ordered_runs, early_stops, ordered, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, ordered_runs, early_stops, int(ordered_runs >= ORDER_CONFIDENCE), time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FeedIngest:
+    """The outcome of ingesting one feed."""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.articles = []
+        self.items = 0
+        self.error = None
+        self.ordered = None
+        self.stopped_early = False
+        # Items skipped because the seen-item index already has them unchanged
+        self.unchanged = 0
+        # (url, content hash) of every article, for the seen-item index
+        self.hashes = []
+
+
+@traced('ingest_feed', subject=lambda http, feed, *args, **kwargs: feed['url'])
+def ingest_feed(http, feed, cutoff, timeout=DEFAULT_TIMEOUT, early_stop=None, seen=None, emit_unchanged=False):
+    """Fetch and parse one feed into a FeedIngest.
+
+    With early_stop ('read' or 'parse'), parsing stops once the items are
+    past the cutoff, provided they have been in order so far; 'read' also
+    stops reading the response. Items the `seen` SeenItemIndex already has
+    unchanged are skipped, unless `emit_unchanged` is set.
+    """
+    result = FeedIngest(feed)
+    now = datetime.now(timezone.utc)
+    order = OrderCheck(cutoff)
+    try:
+        with http.get(feed['url'], timeout=timeout) as response:
+            chunks = response.iter_chunks(CHUNK_SIZE)
+            for item in iter_feed_items(chunks):
+                result.items += 1
+                published_at = parse_feed_date(item['published'])
+                order.add(published_at)
+                # Unparseable dates count as "now", like Carbon::parse() failing
+                if (published_at or now) >= cutoff:
+                    url = item['link'] or item['guid']
+                    digest = content_hash(item) if seen is not None and url else None
+                    if digest is not None and not emit_unchanged and seen.is_unchanged(url, digest):
+                        result.unchanged += 1
+                    else:
+                        article = build_article(item, feed, published_at or now)
+                        if article is not None:
+                            result.articles.append(article)
+                            result.hashes.append((article['url'], digest))
+                if early_stop and order.past_cutoff:
+                    result.stopped_early = True
+                    break
+            if result.stopped_early and early_stop == 'parse':
+                for _ in chunks:
+                    pass
+    except urllib.error.HTTPError as e:
+        result.error = f"HTTP {e.code} {e.reason}"
+    except NotAFeedError as e:
+        result.error = str(e)
+    except ET.ParseError as e:
+        # Keep what was parsed before the error
+        result.error = f"invalid XML: {e}"
+    except Exception as e:
+        result.error = str(e) or e.__class__.__name__
+
+    # A scan cut short by an error can still show that a feed is out of order
+    result.ordered = order.ordered if not result.error or order.ordered is False else None
+    return result
+
+
+class JsonlArticleWriter:
+    """Writes one JSON object per article, skipping URLs already written.
+
+    The file is replaced unless `append` is set; an edited article is then
+    appended again, and its last line is the current one.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Scope of the seen-item index; see SeenItemIndex
+        self.target = f"jsonl:{self.path.resolve()}"
+        # Whether articles written by earlier runs are still in the output
+        self.keeps_earlier_runs = append
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.written = 0
+        self.skipped = 0
+        self.write_time = 0.0
+
+    def write(self, articles, on_written=None):
+        with self._lock:
+            started = time.perf_counter()
+            for article in articles:
+                if article['url'] in self._seen:
+                    continue
+                self._seen.add(article['url'])
+                self._file.write(json.dumps(article, ensure_ascii=False) + '\n')
+                self.written += 1
+            self.write_time += time.perf_counter() - started
+        if on_written is not None:
+            on_written({article['url'] for article in articles})
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class BatchedSqliteWriter(abc.ABC):
+    """Upserts articles into SQLite from a single writer thread.
+
+    write() only queues the articles, so concurrent fetchers never wait for
+    the database. The writer thread collects whatever is queued, up to
+    `batch_size` articles, and writes it with one executemany() per
+    transaction. Subclasses set FORMAT and UPSERT and turn articles into (url, row)
+    pairs for it, leaving out articles they cannot store.
+    """
+
+    FORMAT = None
+    UPSERT = None
+    keeps_earlier_runs = True
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = Path(path)
+        # Scope of the seen-item index; see SeenItemIndex
+        self.target = f"{self.FORMAT}:{self.path.resolve()}"
+        self.batch_size = batch_size
+        self.written = 0
+        self.skipped = 0
+        self.write_time = 0.0
+        self._conn = self._connect()
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='article-writer', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Opened here, but only ever used by the writer thread
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @abc.abstractmethod
+    def _rows(self, articles):
+        """(url, UPSERT parameter row) pairs for the `articles` to store."""
+
+    def write(self, articles, on_written=None):
+        """Queue `articles`; `on_written(urls)` gets the URLs of those stored once they are committed."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put((list(articles), on_written))
+
+    def _run(self):
+        done = False
+        while not done:
+            articles, callbacks = [], []
+            # Block for the next write, then take whatever else is already waiting
+            item = self._queue.get()
+            while True:
+                if item is None:
+                    done = True
+                    break
+                articles.extend(item[0])
+                if item[1] is not None:
+                    callbacks.append(({article['url'] for article in item[0]}, item[1]))
+                if len(articles) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if self._error is not None:
+                continue
+            try:
+                stored = set()
+                for start in range(0, len(articles), self.batch_size):
+                    stored.update(self._flush(articles[start:start + self.batch_size]))
+                for urls, callback in callbacks:
+                    callback(urls & stored)
+            except Exception as e:
+                # Reported by the next write() or by close(); later batches are dropped
+                self._error = e
+
+    def _flush(self, articles):
+        """Store `articles` in one transaction; returns the URLs stored."""
+        started = time.perf_counter()
+        with get_tracer().stage('write_batch', articles=len(articles)):
+            pairs = self._rows(articles)
+            with self._conn:
+                self._conn.executemany(self.UPSERT, [row for _, row in pairs])
+            # Every row is inserted or updated; total_changes would also count trigger writes
+            self.written += len(pairs)
+        self.write_time += time.perf_counter() - started
+        return {url for url, _ in pairs}
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._conn.close()
+        if self._error is not None:
+            raise self._error
+
+
+class SqliteArticleWriter(BatchedSqliteWriter):
+    """Adds articles to a SQLite batch file; articles already present are updated.
+
+    The file's search index (search_index.py) is kept current by triggers, in
+    the same transaction as the articles; `bias_labels` ({source slug: bias
+    label}) are stored with it first.
+    """
+
+    FORMAT = 'sqlite'
+    UPSERT = (
+        "INSERT INTO articles (url, source, feed_url, category, title, summary, author, guid, "
+        "published_at, keywords, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (url) DO UPDATE SET title = excluded.title, summary = excluded.summary, "
+        "author = excluded.author, published_at = excluded.published_at, keywords = excluded.keywords, "
+        "fetched_at = excluded.fetched_at"
+    )
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, bias_labels=None):
+        self.bias_labels = bias_labels
+        super().__init__(path, batch_size)
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.executescript(ARTICLES_SCHEMA)
+        ensure_search_index(conn, self.bias_labels)
+        return conn
+
+    def _rows(self, articles):
+        fetched_at = time.time()
+        return [
+            (article['url'], (
+                article['url'], article['source'], article['feed_url'], article['category'], article['title'],
+                article['summary'], article['author'], article['guid'], article['published_at'],
+                json.dumps(article['keywords']), fetched_at,
+            ))
+            for article in articles
+        ]
+
+
+class AppArticleWriter(BatchedSqliteWriter):
+    """Upserts articles straight into the web app's `articles` table (database/database.sqlite).
+
+    Rows look like the ones NewsAggregatorService::createArticleFromFeedItem()
+    creates; articles of sources that are not in news_sources (not seeded
+    yet) are skipped.
+    """
+
+    FORMAT = 'database'
+    UPSERT = (
+        "INSERT INTO articles (news_source_id, title, summary, url, author, published_at, keywords, is_active, "
+        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?) "
+        "ON CONFLICT (url) DO UPDATE SET title = excluded.title, summary = excluded.summary, "
+        "author = excluded.author, published_at = excluded.published_at, keywords = excluded.keywords, "
+        "updated_at = excluded.updated_at"
+    )
+
+    def _connect(self):
+        if not self.path.exists():
+            raise FileNotFoundError(f"{self.path} does not exist; run php artisan migrate first")
+        conn = super()._connect()
+        conn.execute("PRAGMA foreign_keys=ON")
+        self._source_ids = dict(conn.execute("SELECT slug, id FROM news_sources"))
+        return conn
+
+    def _rows(self, articles):
+        now = datetime.now(timezone.utc).strftime(APP_DATETIME_FORMAT)
+        pairs = []
+        for article in articles:
+            source_id = self._source_ids.get(article['source'])
+            if source_id is None:
+                self.skipped += 1
+                continue
+            published_at = datetime.fromisoformat(article['published_at']).astimezone(timezone.utc)
+            pairs.append((article['url'], (
+                source_id, article['title'], article['summary'], article['url'], article['author'],
+                published_at.strftime(APP_DATETIME_FORMAT), json.dumps(article['keywords']), now, now,
+            )))
+        return pairs
+
+
+def open_writer(output_format, path=None, batch_size=DEFAULT_BATCH_SIZE, bias_labels=None, append=False):
+    if output_format == 'database':
+        return AppArticleWriter(path or DEFAULT_APP_DATABASE, batch_size)
+    if output_format == 'sqlite':
+        return SqliteArticleWriter(path or DEFAULT_OUTPUT_DIR / 'articles.sqlite', batch_size, bias_labels)
+    return JsonlArticleWriter(path or DEFAULT_OUTPUT_DIR / 'articles.jsonl', append)
+
+
+def _mark_stored(seen, marks, urls):
+    seen.mark(entry for entry in marks if entry[0] in urls)
+
+
+def ingest_all(feeds, writer, hours_back=DEFAULT_HOURS_BACK, timeout=DEFAULT_TIMEOUT, concurrency=DEFAULT_CONCURRENCY,
+               order_store=None, early_stop='read', seen=None, emit_unchanged=False):
+    """Ingest feed dicts (source, url, category) concurrently into `writer`.
+
+    With an `order_store`, feeds it trusts to be ordered stop early (see
+    EARLY_STOP_MODES) and every scan is recorded in it. With a `seen`
+    SeenItemIndex, only new and edited items are written, and they are
+    recorded in it once they are (`emit_unchanged` writes all of them); only
+    pass one for writers that keep the articles of earlier runs.
+
+    Returns {feed url: {'articles': n, 'items': n, 'unchanged': n, 'error': ...,
+    'stopped_early': bool}} in completion order.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+    scheduler = HostScheduler(rate=HOST_RATE, burst=HOST_CONCURRENCY, per_host=HOST_CONCURRENCY, max_in_flight=concurrency)
+    http = HttpClient(timeout=timeout, scheduler=scheduler)
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(feeds)))) as executor:
+            futures = {}
+            for feed in feeds:
+                stop = early_stop if early_stop != 'off' and order_store and order_store.can_stop_early(feed['url']) else None
+                future = executor.submit(
+                    ingest_feed, http, feed, cutoff, timeout, early_stop=stop, seen=seen, emit_unchanged=emit_unchanged
+                )
+                futures[future] = feed
+            for future in as_completed(futures):
+                feed = futures[future]
+                result = future.result()
+                marks = [(url, digest, feed['url']) for url, digest in result.hashes if digest is not None]
+                # Only remember items once they are stored, so failed or skipped writes are retried next run
+                writer.write(result.articles, on_written=functools.partial(_mark_stored, seen, marks) if seen and marks else None)
+                if order_store is not None:
+                    order_store.record(feed['url'], result.ordered, result.stopped_early)
+                results[feed['url']] = {
+                    'articles': len(result.articles),
+                    'items': result.items,
+                    'unchanged': result.unchanged,
+                    'error': result.error,
+                    'stopped_early': result.stopped_early,
+                }
+                status = "❌" if result.error else "✅"
+                detail = f" - {result.error}" if result.error else " (stopped early)" if result.stopped_early else ""
+                print(f"{status} {feed['source']}: {feed['url']} ({len(result.articles)}/{result.items} items){detail}")
+    finally:
+        http.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch all active feeds and write normalized articles")
+    parser.add_argument("--format", choices=("jsonl", "sqlite", "database"), default="jsonl",
+                        help="Output format; 'database' writes into the web app's articles table (default: jsonl)")
+    parser.add_argument("--output", "-o",
+                        help="Output file (default: storage/app/private/articles.<format>, or database/database.sqlite)")
+    parser.add_argument("--append", action="store_true",
+                        help="Append to the JSONL output instead of replacing it, and only write new and edited articles")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Articles per SQLite transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--hours", type=int, default=DEFAULT_HOURS_BACK, help=f"Skip articles older than this (default: {DEFAULT_HOURS_BACK})")
+    parser.add_argument("--source", action="append", help="Only ingest this source slug (repeatable)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help=f"Timeout per feed (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--concurrency", "-c", type=int, default=DEFAULT_CONCURRENCY, help=f"Feeds fetched at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--sources-dir", default=str(DEFAULT_SOURCES_DIR), help="Directory of source JSON files")
+    parser.add_argument("--catalog", default=str(DEFAULT_CATALOG_PATH), help="SQLite source catalog")
+    parser.add_argument("--early-stop", choices=EARLY_STOP_MODES, default="read",
+                        help="Stop feeds known to be ordered at the cutoff: stop reading, only stop parsing, or never (default: read)")
+    parser.add_argument("--state", default=str(DEFAULT_STATE_PATH), help="SQLite file with what was learned about each feed")
+    parser.add_argument("--all", action="store_true", help="Also emit articles ingested unchanged by earlier runs")
+    parser.add_argument("--trace", default=None, help="Write per-request timings to this JSON-lines file")
+    args = parser.parse_args()
+
+    if args.trace:
+        set_tracer(Tracer(args.trace))
+
+    catalog = SourceCatalog(args.catalog)
+    catalog.build(args.sources_dir)
+    feeds = [
+        {'source': row['source'], 'url': row['url'], 'category': row['category']}
+        for row in catalog.feeds()
+        if not args.source or row['source'] in args.source
+    ]
+    bias_labels = catalog.bias_labels()
+    catalog.close()
+    if not feeds:
+        print("No active feeds to ingest")
+        sys.exit(1)
+
+    try:
+        writer = open_writer(args.format, args.output, args.batch_size, bias_labels, args.append)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(f"Cannot open the output: {e}")
+        sys.exit(1)
+    order_store = FeedOrderStore(args.state)
+    # Skipping items earlier runs wrote only works if their articles are still in the output
+    seen = SeenItemIndex(args.state, writer.target) if writer.keeps_earlier_runs else None
+    if seen is not None:
+        seen.prune(max(SEEN_RETENTION, timedelta(hours=2 * args.hours)).total_seconds())
+    print(f"Ingesting {len(feeds)} feeds into {writer.path}...")
+    started = time.perf_counter()
+    try:
+        results = ingest_all(feeds, writer, hours_back=args.hours, timeout=args.timeout, concurrency=args.concurrency,
+                             order_store=order_store, early_stop=args.early_stop, seen=seen, emit_unchanged=args.all)
+    finally:
+        writer.close()
+        order_store.close()
+        if seen is not None:
+            seen.close()
+
+    failed = sum(1 for result in results.values() if result['error'])
+    stopped = sum(1 for result in results.values() if result['stopped_early'])
+    unchanged = sum(result['unchanged'] for result in results.values())
+    print(f"\nWrote {writer.written} articles from {len(feeds) - failed}/{len(feeds)} feeds "
+          f"in {time.perf_counter() - started:.1f}s ({unchanged} unchanged skipped, {stopped} stopped early)")
+    print(f"Writing took {writer.write_time:.2f}s")
+    if writer.skipped:
+        print(f"Skipped {writer.skipped} articles of sources missing from news_sources (run the seeder)")
+
+    get_tracer().print_summary()
+    get_tracer().close()
+
+
+if __name__ == '__main__':
+    main()
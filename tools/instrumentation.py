@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Timing and network instrumentation for the feed tools.
+
+A Tracer writes one JSON line per HTTP request (connect time, time to first
+byte, total time, bytes on the wire and decoded) and per instrumented stage
+(wall time), and keeps enough in memory to print an end-of-run summary with
+p50/p95 latencies per host.
+
+Tracing is off until a tracer is installed:
+
+    from instrumentation import Tracer, set_tracer, get_tracer
+
+    set_tracer(Tracer("storage/logs/feeds-trace.jsonl"))
+    ...
+    get_tracer().print_summary()
+"""
+
+import functools
+import json
+import math
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class NullTracer:
+    """Default tracer that records nothing."""
+
+    enabled = False
+
+    def request(self, url, **fields):
+        pass
+
+    @contextmanager
+    def stage(self, name, **fields):
+        yield
+
+    def summary(self):
+        return {}
+
+    def print_summary(self, file=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class Tracer(NullTracer):
+    """Thread-safe JSON-lines tracer with an in-memory per-host summary."""
+
+    enabled = True
+
+    def __init__(self, path=None):
+        self._file = open(path, 'w', encoding='utf-8') if path else None
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._stages = {}
+        self._started = time.perf_counter()
+
+    def _write(self, record):
+        if self._file is not None:
+            self._file.write(json.dumps(record) + '\n')
+
+    def request(self, url, **fields):
+        """Record one HTTP request. Known fields: method, status, reused,
+        connect, ttfb, total (seconds), wire_bytes, bytes, error."""
+        host = (urlsplit(url).hostname or '').lower()
+        record = {'type': 'request', 'ts': time.time(), 'host': host, 'url': url, **fields}
+        with self._lock:
+            self._write(record)
+            stats = self._hosts.setdefault(host, {'requests': 0, 'errors': 0, 'total': [], 'ttfb': [], 'connect': [], 'bytes': 0})
+            stats['requests'] += 1
+            if fields.get('error') or (fields.get('status') or 0) >= 400:
+                stats['errors'] += 1
+            for key in ('total', 'ttfb', 'connect'):
+                if fields.get(key) is not None:
+                    stats[key].append(fields[key])
+            stats['bytes'] += fields.get('wire_bytes') or 0
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time a block of work and record it as a stage."""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            wall = time.perf_counter() - started
+            record = {'type': 'stage', 'ts': time.time(), 'stage': name, 'wall': round(wall, 6), **fields}
+            if error:
+                record['error'] = error
+            with self._lock:
+                self._write(record)
+                stats = self._stages.setdefault(name, {'count': 0, 'wall': []})
+                stats['count'] += 1
+                stats['wall'].append(wall)
+
+    def summary(self):
+        """Per-host request latencies and per-stage wall times."""
+        with self._lock:
+            hosts = {
+                host: {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'bytes': stats['bytes'],
+                    'p50': percentile(stats['total'], 50),
+                    'p95': percentile(stats['total'], 95),
+                    'ttfb_p50': percentile(stats['ttfb'], 50),
+                    'connect_p50': percentile(stats['connect'], 50),
+                }
+                for host, stats in self._hosts.items()
+            }
+            stages = {
+                name: {
+                    'count': stats['count'],
+                    'total': sum(stats['wall']),
+                    'p50': percentile(stats['wall'], 50),
+                    'p95': percentile(stats['wall'], 95),
+                }
+                for name, stats in self._stages.items()
+            }
+        return {'elapsed': time.perf_counter() - self._started, 'hosts': hosts, 'stages': stages}
+
+    def print_summary(self, file=None):
+        """Print the summary table and append it to the trace file."""
+        file = file or sys.stderr
+        summary = self.summary()
+        with self._lock:
+            self._write({'type': 'summary', 'ts': time.time(), **summary})
+
+        def ms(value):
+            return f"{value * 1000:8.0f}" if value is not None else "       -"
+
+        print(f"\nRun time: {summary['elapsed']:.1f}s", file=file)
+        if summary['hosts']:
+            print(f"\n{'Host':<40} {'Reqs':>5} {'Errs':>5} {'KiB':>8} {'p50 ms':>8} {'p95 ms':>8} {'TTFB ms':>8} {'Conn ms':>8}", file=file)
+            for host, stats in sorted(summary['hosts'].items(), key=lambda item: -item[1]['requests']):
+                print(
+                    f"{host[:40]:<40} {stats['requests']:>5} {stats['errors']:>5} {stats['bytes'] / 1024:>8.0f} "
+                    f"{ms(stats['p50'])} {ms(stats['p95'])} {ms(stats['ttfb_p50'])} {ms(stats['connect_p50'])}",
+                    file=file,
+                )
+        if summary['stages']:
+            print(f"\n{'Stage':<40} {'Count':>5} {'Total s':>8} {'p50 ms':>8} {'p95 ms':>8}", file=file)
+            for name, stats in sorted(summary['stages'].items()):
+                print(f"{name:<40} {stats['count']:>5} {stats['total']:>8.2f} {ms(stats['p50'])} {ms(stats['p95'])}", file=file)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer = NullTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def set_tracer(tracer):
+    """Install `tracer` for the whole process (None turns tracing off)."""
+    global _tracer
+    _tracer = tracer if tracer is not None else NullTracer()
+
+
+def traced(stage_name, subject=None):
+    """Decorator recording each call as a stage.
+
+    The stage is tagged with subject(*args, **kwargs) if given, else with
+    the call's first argument.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if subject is not None:
+                tag = subject(*args, **kwargs)
+            else:
+                tag = str(args[0]) if args else None
+            with _tracer.stage(stage_name, subject=tag):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
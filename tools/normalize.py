@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Article text normalization matching NewsAggregatorService.
+
+clean_title(), clean_description() and extract_keywords() reproduce the PHP
+cleanTitle(), cleanDescription() and extractKeywords() helpers (strip_tags,
+html_entity_decode, PCRE whitespace, Str::limit, str_word_count), so
+articles ingested by the Python tools look exactly like the ones the web app
+creates itself.
+
+Usage:
+    from normalize import clean_title, clean_description, extract_keywords
+
+    title = clean_title(item['title'])
+"""
+
+import html
+import re
+import unicodedata
+
+# Length of a summary, in mb_strwidth() columns, before Str::limit() cuts it
+SUMMARY_LIMIT = 300
+SUMMARY_END = '...'
+MAX_KEYWORDS = 10
+
+STOP_WORDS = {
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'an', 'a',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does',
+    'did', 'will', 'would', 'could', 'should',
+}
+
+# strip_tags(): comments, then anything from '<' (not followed by whitespace) to '>' or the end
+COMMENT_PATTERN = re.compile(r'<!--.*?(?:-->|$)', re.DOTALL)
+TAG_PATTERN = re.compile(r'<(?!\s)[^>]*(?:>|$)')
+# html_entity_decode() only decodes entities terminated by ';'
+ENTITY_PATTERN = re.compile(r'&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);')
+# PCRE's \s without the /u flag: ASCII whitespace only, no NBSP
+WHITESPACE_PATTERN = re.compile(r'[ \t\n\x0b\f\r]+')
+# PHP's trim()/rtrim() default character list
+PHP_TRIM_CHARS = ' \t\n\r\0\x0b'
+# str_word_count(): ASCII letters, apostrophes and hyphens
+WORD_PATTERN = re.compile(r"[A-Za-z'-]+")
+# content_words(): any letters or digits, at least this long
+CONTENT_WORD_PATTERN = re.compile(r'\w+')
+MIN_CONTENT_WORD_LENGTH = 3
+
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def strip_tags(text):
+    return TAG_PATTERN.sub('', COMMENT_PATTERN.sub('', text))
+
+
+def decode_entities(text):
+    return ENTITY_PATTERN.sub(lambda match: html.unescape(match.group(0)), text)
+
+
+def collapse_whitespace(text):
+    return WHITESPACE_PATTERN.sub(' ', text)
+
+
+def char_width(char):
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def str_limit(value, limit=SUMMARY_LIMIT, end=SUMMARY_END):
+    """Laravel's Str::limit(): cut to `limit` display columns and append `end`."""
+    if sum(char_width(char) for char in value) <= limit:
+        return value
+    width = 0
+    cut = 0
+    for cut, char in enumerate(value):
+        width += char_width(char)
+        if width > limit:
+            break
+    return value[:cut].rstrip(PHP_TRIM_CHARS) + end
+
+
+def clean_title(title):
+    """NewsAggregatorService::cleanTitle()."""
+    return collapse_whitespace(decode_entities(strip_tags(title or ''))).strip(PHP_TRIM_CHARS)
+
+
+def clean_description(description):
+    """NewsAggregatorService::cleanDescription()."""
+    clean = collapse_whitespace(decode_entities(strip_tags(description or '')))
+    return str_limit(clean.strip(PHP_TRIM_CHARS))
+
+
+def str_word_count(text):
+    """PHP str_word_count($text, 1): only the very first character of the
+    string may not be ' or -, and only the very last may not be -."""
+    start = 1 if text[:1] in ("'", '-') else 0
+    end = len(text) - 1 if text[-1:] == '-' else len(text)
+    return WORD_PATTERN.findall(text, start, max(start, end))
+
+
+def extract_keywords(text):
+    """NewsAggregatorService::extractKeywords(): the first ten distinct words
+    longer than three letters that are not stop words."""
+    keywords = []
+    seen = set()
+    for word in str_word_count(text.translate(ASCII_LOWER)):
+        if len(word) > 3 and word not in STOP_WORDS and word not in seen:
+            seen.add(word)
+            keywords.append(word)
+            if len(keywords) == MAX_KEYWORDS:
+                break
+    return keywords
+
+
+def content_words(text):
+    """The distinct lowercased words of `text` that say what it is about
+    (no stop words, numbers or words shorter than three characters)."""
+    return frozenset(
+        word for word in CONTENT_WORD_PATTERN.findall(text.lower())
+        if len(word) >= MIN_CONTENT_WORD_LENGTH and word not in STOP_WORDS and not word.isdigit()
+    )
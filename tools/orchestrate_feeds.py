@@ -7,17 +7,74 @@ This script coordinates the RSS feed management workflow by:
 2. Extracting RSS feeds from each base URL using extract-xml.py
 3. Updating JSON source files using update_rss_feeds.py
 
-Usage: python orchestrate_feeds.py <base_urls_file>
+Both tools are called in-process, so the HTTP connection pool and the
+discovery caches are shared across the whole run.
+
+Progress is journaled per URL and stage, so an interrupted run can be
+picked up again with --resume.
+
+Usage: python orchestrate_feeds.py <base_urls_file> [--workers N] [--depth N] [--sitemaps] [--resume] [--trace FILE]
 
 Example:
   python orchestrate_feeds.py base_urls.txt
+  python orchestrate_feeds.py base_urls.txt --workers 8
+  python orchestrate_feeds.py base_urls.txt --resume
 """
 
+import argparse
+import importlib.util
 import sys
-import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import StringIO
 from pathlib import Path
 from urllib.parse import urlparse
 
+import update_rss_feeds
+from discovery_cache import DiscoveryCache
+from instrumentation import Tracer, get_tracer, set_tracer, traced
+from run_journal import RunJournal, default_journal_path
+from source_catalog import KnownFeeds, SourceCatalog
+
+
+def load_extract_xml():
+    """Import extract-xml.py, whose file name isn't a valid module name."""
+    spec = importlib.util.spec_from_file_location('extract_xml', Path(__file__).parent / 'extract-xml.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+extract_xml = load_extract_xml()
+
+
+class ThreadRoutedStream:
+    """Stream wrapper that sends a worker thread's output to its own buffer.
+
+    Threads running process_captured() have a private StringIO installed as
+    `local.buffer`, so each base URL's output can be printed as one block
+    once it is done; every other thread writes straight through to the
+    wrapped stream.
+    """
+
+    def __init__(self, stream, local):
+        self._stream = stream
+        self._local = local
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self._stream).write(text)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_thread_output = threading.local()
+
 
 def read_base_urls(file_path):
     """Read base URLs from a text file."""
@@ -88,103 +145,197 @@ def extract_domain_slug(url):
     return domain.replace('.', '-')
 
 
-def run_extract_xml(base_url, output_file):
-    """Run extract-xml.py script to discover RSS feeds."""
-    script_dir = Path(__file__).parent
-    extract_script = script_dir / 'extract-xml.py'
-    
-    try:
-        cmd = [sys.executable, str(extract_script), base_url, '--output', output_file]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return True, result.stdout
-        else:
-            return False, result.stderr
-    except Exception as e:
-        return False, str(e)
-
+def host_key(url):
+    """Host used to keep base URLs of the same publisher off each other's toes."""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
 
-def run_update_rss_feeds(txt_file, source_slug):
-    """Run update_rss_feeds.py script to update JSON files."""
-    script_dir = Path(__file__).parent
-    update_script = script_dir / 'update_rss_feeds.py'
-    
-    try:
-        cmd = [sys.executable, str(update_script), txt_file, source_slug, '--force']
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return True, result.stdout
-        else:
-            return False, result.stderr
-    except Exception as e:
-        return False, str(e)
 
+@traced('process_base_url')
+def process_base_url(base_url, workspace_dir, discovery_options=None, known_feeds=None, journal=None, changed_files=None):
+    """Process a single base URL through the complete workflow.
 
-def process_base_url(base_url, workspace_dir):
-    """Process a single base URL through the complete workflow."""
+    `discovery_options` are passed to extract_xml_links(); `known_feeds` is
+    a source_catalog.KnownFeeds view of the stored feeds, extended with
+    whatever this URL adds. With a RunJournal, stages already completed in
+    a previous run are skipped. Source files actually rewritten are added
+    to the `changed_files` set.
+    """
     print(f"\n{'='*60}")
     print(f"Processing: {base_url}")
     print(f"{'='*60}")
     
+    if journal is not None and journal.is_complete(base_url):
+        print("⏭️  Already completed in a previous run")
+        return True
+    
     # Extract domain slug for file naming
     domain_slug = extract_domain_slug(base_url)
     print(f"Domain slug: {domain_slug}")
     
-    # Create temporary file for RSS feeds
-    temp_file = workspace_dir / f"{domain_slug}_feeds_temp.txt"
-    
+    stage = 'extract'
     try:
         # Step 1: Extract RSS feeds from base URL
-        print(f"\nStep 1: Extracting RSS feeds from {base_url}")
-        success, output = run_extract_xml(base_url, str(temp_file))
-        
-        if not success:
-            print(f"❌ Failed to extract RSS feeds: {output}")
-            return False
-        
-        print(f"✅ RSS extraction completed")
-        print(output.strip())
+        extracted = journal.completed(base_url, 'extract') if journal is not None else None
+        if extracted is not None:
+            feeds = extracted['feeds']
+            print(f"\nStep 1: Reusing {len(feeds)} RSS feeds discovered in a previous run")
+        else:
+            print(f"\nStep 1: Extracting RSS feeds from {base_url}")
+            feeds = extract_xml.discover_feeds(base_url, known_feeds=known_feeds, **(discovery_options or {}))
+            if journal is not None:
+                journal.record(base_url, 'extract', feeds=feeds)
+            
+            print(f"✅ RSS extraction completed")
+            print(f"Found {len(feeds)} verified RSS/Atom feeds.")
         
         # Check if any feeds were found
-        if not temp_file.exists() or temp_file.stat().st_size == 0:
+        stage = 'update'
+        if not feeds:
             print("⚠️  No RSS feeds found for this URL")
+            if journal is not None:
+                journal.record(base_url, 'update', added=[])
             return True
         
-        # Step 2: Update JSON source file
+        # Step 2: Update JSON source file (update_json_file locks it against other writers)
         print(f"\nStep 2: Updating JSON source file for {domain_slug}")
-        success, output = run_update_rss_feeds(str(temp_file), domain_slug)
+        feed_urls = [feed['url'] for feed in feeds]
+        update = update_rss_feeds.update_source(feed_urls, domain_slug, workspace_dir)
         
-        if not success:
-            print(f"❌ Failed to update RSS feeds: {output}")
+        if not update['result']:
+            print(f"❌ Failed to update RSS feeds in {update['json_file']}")
+            if journal is not None:
+                journal.record(base_url, 'update', status='failed', error=f"could not update {update['json_file']}")
             return False
         
-        print(f"✅ JSON source file updated successfully")
-        print(output.strip())
+        result = update['result']
+        if known_feeds is not None:
+            known_feeds.update(feed_urls)
+        if result['changed'] and changed_files is not None:
+            changed_files.add(update['json_file'])
+        if journal is not None:
+            journal.record(
+                base_url,
+                'update',
+                added=[feed['url'] for feed in result['added']],
+                changed=result['changed'],
+            )
+        
+        if result['changed']:
+            print(f"✅ JSON source file updated successfully")
+        else:
+            print(f"✅ JSON source file already up to date")
         
         return True
         
     except Exception as e:
         print(f"❌ Error processing {base_url}: {e}")
+        if journal is not None:
+            journal.record(base_url, stage, status='failed', error=str(e))
         return False
-    
+
+
+def process_captured(base_url, workspace_dir, **kwargs):
+    """Run process_base_url with its output collected instead of printed."""
+    _thread_output.buffer = StringIO()
+    try:
+        success = process_base_url(base_url, workspace_dir, **kwargs)
+        return success, _thread_output.buffer.getvalue()
+    finally:
+        _thread_output.buffer = None
+
+
+def process_in_parallel(base_urls, workspace_dir, workers, **kwargs):
+    """Process base URLs on a worker pool, one publisher host at a time.
+
+    URLs sharing a host are handled sequentially by the same worker so a
+    publisher never sees more than one orchestration step at once. Each
+    URL's output is printed as a single block as soon as it finishes.
+    Returns (successful, failed) counts.
+    """
+    groups = {}
+    for index, base_url in enumerate(base_urls, 1):
+        groups.setdefault(host_key(base_url), []).append((index, base_url))
+
+    print_lock = threading.Lock()
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    sys.stdout = ThreadRoutedStream(real_stdout, _thread_output)
+    sys.stderr = ThreadRoutedStream(real_stderr, _thread_output)
+
+    def run_group(group):
+        results = []
+        for index, base_url in group:
+            success, output = process_captured(base_url, workspace_dir, **kwargs)
+            with print_lock:
+                real_stdout.write(f"\n🔄 Finished {index}/{len(base_urls)}\n{output}")
+                real_stdout.flush()
+            results.append(success)
+        return results
+
+    successful = 0
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_group, group) for group in groups.values()]
+            for future in as_completed(futures):
+                for success in future.result():
+                    if success:
+                        successful += 1
+                    else:
+                        failed += 1
     finally:
-        # Clean up temporary file
-        if temp_file.exists():
-            temp_file.unlink()
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+
+    return successful, failed
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python orchestrate_feeds.py <base_urls_file>")
-        print("\nExample:")
-        print("  python orchestrate_feeds.py base_urls.txt")
-        print("\nThe base_urls_file should contain one URL per line.")
-        print("Lines starting with # are treated as comments and ignored.")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Discover RSS feeds for a list of base URLs and update the source JSON files",
+        epilog="The base_urls_file should contain one URL per line. "
+               "Lines starting with # are treated as comments and ignored.",
+    )
+    parser.add_argument("base_urls_file", help="Text file with one base URL per line (e.g. base_urls.txt)")
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=1,
+        help="Number of base URLs processed concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=0,
+        help="Crawl same-site pages up to this many links away (default: 0)",
+    )
+    parser.add_argument(
+        "--sitemaps",
+        action="store_true",
+        help="Also discover feeds through each site's sitemaps",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the on-disk discovery cache",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the previous run: skip finished URLs and reuse discovered feeds",
+    )
+    parser.add_argument(
+        "--journal",
+        default=None,
+        help="Run journal file (default: storage/app/private/orchestrator/<base_urls_file>.journal.jsonl)",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write per-request and per-stage timings to this JSON-lines file and print a latency summary",
+    )
+    args = parser.parse_args()
     
-    base_urls_file = sys.argv[1]
+    base_urls_file = args.base_urls_file
     
     # Get workspace directory
     script_dir = Path(__file__).parent
@@ -210,23 +361,61 @@ def main():
     for i, url in enumerate(base_urls, 1):
         print(f"  {i}. {url}")
     
+    # Load the journal of the previous run before asking, so the user knows what's left
+    journal_path = Path(args.journal) if args.journal else default_journal_path(base_urls_path)
+    journal = None
+    if args.resume:
+        journal = RunJournal(journal_path, resume=True)
+        remaining = sum(1 for url in base_urls if not journal.is_complete(url))
+        print(f"\nResuming from {journal_path}: {len(base_urls) - remaining} done, {remaining} remaining")
+    
     # Confirm before proceeding
     response = input(f"\nProcess all {len(base_urls)} base URLs? (y/N): ")
     if response.lower() != 'y':
         print("Cancelled")
         sys.exit(0)
     
+    # A fresh run starts a new journal
+    if journal is None:
+        journal = RunJournal(journal_path)
+    
+    if args.trace:
+        set_tracer(Tracer(args.trace))
+    
+    # Share the discovery cache and the catalog of stored feeds across the run
+    if not args.no_cache:
+        extract_xml.set_discovery_cache(DiscoveryCache())
+    catalog = SourceCatalog()
+    catalog.build(workspace_dir / 'database' / 'sources')
+    options = {
+        'discovery_options': {'depth': args.depth, 'use_sitemaps': args.sitemaps},
+        'known_feeds': KnownFeeds(catalog),
+        'journal': journal,
+        'changed_files': set(),
+    }
+    
     # Process each base URL
     successful = 0
     failed = 0
     
-    for i, base_url in enumerate(base_urls, 1):
-        print(f"\n🔄 Processing {i}/{len(base_urls)}")
-        
-        if process_base_url(base_url, workspace_dir):
-            successful += 1
-        else:
-            failed += 1
+    if args.workers > 1:
+        print(f"\nProcessing with {args.workers} workers...")
+        successful, failed = process_in_parallel(base_urls, workspace_dir, args.workers, **options)
+    else:
+        for i, base_url in enumerate(base_urls, 1):
+            print(f"\n🔄 Processing {i}/{len(base_urls)}")
+            
+            if process_base_url(base_url, workspace_dir, **options):
+                successful += 1
+            else:
+                failed += 1
+    
+    journal.close()
+    # Fold the rewritten source files back into the catalog
+    catalog.build(workspace_dir / 'database' / 'sources')
+    catalog.close()
+    get_tracer().print_summary()
+    get_tracer().close()
     
     # Summary
     print(f"\n{'='*60}")
@@ -236,6 +425,14 @@ def main():
     print(f"❌ Failed: {failed}")
     print(f"📊 Total: {len(base_urls)}")
     
+    changed_files = sorted(options['changed_files'])
+    if changed_files:
+        print(f"\n📝 {len(changed_files)} source files changed:")
+        for json_file in changed_files:
+            print(f"  {json_file}")
+    else:
+        print("\n📝 No source files changed; reseeding is not needed")
+    
     if failed == 0:
         print("\n🎉 All base URLs processed successfully!")
     else:
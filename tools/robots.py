@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Cached robots.txt handling for the feed tools.
+
+Each origin's robots.txt is fetched once per run through the shared HTTP
+client and answers "may we crawl this URL?", "how long should we wait
+between requests?" and "which sitemaps does the site advertise?".
+
+Usage:
+    from robots import RobotsCache
+
+    robots = RobotsCache(http)
+    if robots.can_fetch(url):
+        ...
+"""
+
+import threading
+import urllib.error
+import urllib.parse
+import urllib.robotparser
+
+# Token matched against User-agent lines; sites without a specific rule fall back to '*'
+ROBOTS_USER_AGENT = "BalanceNews"
+ROBOTS_TIMEOUT = 5
+
+
+class RobotsCache:
+    """Fetches and caches robots.txt rules per origin."""
+
+    def __init__(self, http, user_agent=ROBOTS_USER_AGENT, timeout=ROBOTS_TIMEOUT):
+        self.http = http
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._rules = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def origin(url):
+        parts = urllib.parse.urlsplit(url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+    def rules(self, url):
+        """Return the parsed RobotFileParser for the origin of `url`."""
+        origin = self.origin(url)
+        with self._lock:
+            if origin in self._rules:
+                return self._rules[origin]
+            origin_lock = self._locks.setdefault(origin, threading.Lock())
+
+        # Only one thread downloads a given robots.txt; the others wait for it
+        with origin_lock:
+            with self._lock:
+                if origin in self._rules:
+                    return self._rules[origin]
+            rules = self._fetch(origin)
+            with self._lock:
+                self._rules[origin] = rules
+            return rules
+
+    def _fetch(self, origin):
+        rules = urllib.robotparser.RobotFileParser(origin + "/robots.txt")
+        try:
+            with self.http.get(origin + "/robots.txt", timeout=self.timeout) as response:
+                rules.parse(response.text().splitlines())
+        except urllib.error.HTTPError as e:
+            # Same convention as RobotFileParser.read(): 401/403 forbid everything
+            if e.code in (401, 403):
+                rules.disallow_all = True
+            else:
+                rules.allow_all = True
+        except Exception:
+            rules.allow_all = True
+        return rules
+
+    def can_fetch(self, url):
+        return self.rules(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """The Crawl-delay (seconds) requested for our user agent, or 0."""
+        try:
+            delay = self.rules(url).crawl_delay(self.user_agent)
+        except (TypeError, ValueError):
+            delay = None
+        return float(delay) if delay else 0.0
+
+    def sitemaps(self, url):
+        """Sitemap URLs listed in the robots.txt of `url`'s origin."""
+        return list(self.rules(url).site_maps() or [])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Append-only run journal for orchestrate_feeds.py.
+
+Every finished stage of every base URL (feed discovery, JSON update) is
+appended to a JSON-lines file and flushed to disk immediately, together with
+the discovered feed list. An interrupted run can then be resumed: completed
+URLs are skipped, and URLs whose discovery finished reuse the recorded feeds.
+
+Journal lines look like:
+    {"ts": 1760780000.0, "url": "https://apnews.com", "stage": "extract", "status": "done", "feeds": [...]}
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_JOURNAL_DIR = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'orchestrator'
+
+STAGES = ('extract', 'update')
+
+
+def default_journal_path(base_urls_path):
+    """Journal file used for a given base URLs file."""
+    return DEFAULT_JOURNAL_DIR / f"{Path(base_urls_path).stem}.journal.jsonl"
+
+
+class RunJournal:
+    """Thread-safe JSONL journal of per-URL stage completion."""
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._state = {}
+
+        if resume:
+            self._load()
+        elif self.path.exists():
+            self.path.unlink()
+
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Replay the journal; later records win over earlier ones."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a truncated last line behind
+                    continue
+                self._apply(record)
+
+    def _apply(self, record):
+        url = record.get('url')
+        stage = record.get('stage')
+        if not url or stage not in STAGES:
+            return
+        stages = self._state.setdefault(url, {})
+        if record.get('status') == 'done':
+            stages[stage] = record
+        else:
+            stages.pop(stage, None)
+
+    def record(self, url, stage, status='done', **data):
+        """Append a stage result for `url` and flush it to disk."""
+        record = {'ts': time.time(), 'url': url, 'stage': stage, 'status': status, **data}
+        with self._lock:
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(record)
+
+    def completed(self, url, stage):
+        """The 'done' record of `stage` for `url`, or None."""
+        with self._lock:
+            return self._state.get(url, {}).get(stage)
+
+    def is_complete(self, url):
+        return self.completed(url, STAGES[-1]) is not None
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Per-host politeness scheduler for the feed tools.
+
+Every request made through an HttpClient with a scheduler first takes a slot
+from it. A slot is granted when:
+- fewer than `max_in_flight` requests are running overall,
+- fewer than `per_host` requests are running against the same host,
+- the host's token bucket (`rate` requests per second, bursts of `burst`)
+  has a token, slowed down further by the host's robots.txt Crawl-delay,
+- the host is not backing off after a 429/503 (honouring Retry-After).
+
+Waiting hosts are served round-robin, so one publisher with hundreds of
+candidate feeds can't starve the others. Once `deadline` (a time.monotonic()
+value) has passed, requests still waiting raise SlotTimeout instead.
+
+Usage:
+    from scheduler import HostScheduler
+
+    scheduler = HostScheduler(rate=5, per_host=4, max_in_flight=32)
+    http = HttpClient(scheduler=scheduler)
+"""
+
+import email.utils
+import threading
+import time
+import urllib.parse
+from collections import deque
+
+# Requests per second allowed against a single host
+DEFAULT_RATE = 5.0
+# Requests that may start back to back before the rate applies
+DEFAULT_BURST = 5
+# Maximum number of simultaneous requests against a single host
+DEFAULT_PER_HOST = 4
+# Maximum number of simultaneous requests overall
+DEFAULT_MAX_IN_FLIGHT = 32
+# Back-off in seconds after a 429/503 without a usable Retry-After
+DEFAULT_BACKOFF = 5.0
+# Never wait longer than this on a single Retry-After
+MAX_BACKOFF = 120.0
+
+
+class SlotTimeout(Exception):
+    """No slot became free before the scheduler's deadline."""
+
+
+def host_key(url):
+    """The politeness key of `url`: its lowercased host name."""
+    return (urllib.parse.urlsplit(url).hostname or "").lower()
+
+
+def parse_retry_after(value, default=DEFAULT_BACKOFF):
+    """Seconds to wait according to a Retry-After header (delta or HTTP date)."""
+    if not value:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when is None:
+        return default
+    return max(0.0, when.timestamp() - time.time())
+
+
+class _Ticket:
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+
+class _HostState:
+    """Token bucket, back-off and waiters of a single host."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.waiting = deque()
+        self.crawl_delay = None
+
+    def apply_crawl_delay(self, delay):
+        """Slow the bucket down to one request every `delay` seconds."""
+        self.crawl_delay = delay
+        if delay > 0:
+            self.rate = min(self.rate, 1.0 / delay) if self.rate else 1.0 / delay
+            self.capacity = 1
+            self.tokens = min(self.tokens, 1.0)
+
+    def delay(self, now):
+        """Seconds until the next request may start (0 if it may start now)."""
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = self.blocked_until - now
+        if self.rate and self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return max(0.0, wait)
+
+
+class HostScheduler:
+    """Thread-safe per-host token buckets with a global in-flight cap.
+
+    `crawl_delay` may be set to a callable returning the Crawl-delay for a
+    URL (e.g. RobotsCache.crawl_delay); it is looked up once per host before
+    the host's first request other than robots.txt itself.
+    """
+
+    def __init__(
+        self,
+        rate=DEFAULT_RATE,
+        burst=DEFAULT_BURST,
+        per_host=DEFAULT_PER_HOST,
+        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+        crawl_delay=None,
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.per_host = max(1, per_host)
+        self.max_in_flight = max(1, max_in_flight)
+        self.crawl_delay = crawl_delay
+        # time.monotonic() after which waiting requests give up
+        self.deadline = None
+        self.in_flight = 0
+        self._hosts = {}
+        # Hosts with waiters, in round-robin order
+        self._turns = deque()
+        self._cond = threading.Condition()
+
+    def _host(self, key):
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = _HostState(self.rate, self.burst)
+        return host
+
+    def _lookup_crawl_delay(self, key, url):
+        if self.crawl_delay is None or urllib.parse.urlsplit(url).path == "/robots.txt":
+            return
+        with self._cond:
+            if self._host(key).crawl_delay is not None:
+                return
+        # Looked up outside the lock: it may fetch robots.txt through this scheduler
+        try:
+            delay = float(self.crawl_delay(url) or 0.0)
+        except Exception:
+            delay = 0.0
+        with self._cond:
+            host = self._host(key)
+            if host.crawl_delay is None:
+                host.apply_crawl_delay(delay)
+
+    def _dispatch(self):
+        """Grant slots round-robin; returns how long until a host becomes ready."""
+        now = time.monotonic()
+        wait = None
+        granted = False
+        progress = True
+        while progress and self._turns and self.in_flight < self.max_in_flight:
+            progress = False
+            for _ in range(len(self._turns)):
+                if self.in_flight >= self.max_in_flight:
+                    break
+                key = self._turns.popleft()
+                host = self._hosts[key]
+                if host.in_flight < self.per_host:
+                    delay = host.delay(now)
+                    if delay <= 0:
+                        if host.rate:
+                            host.tokens -= 1
+                        host.in_flight += 1
+                        self.in_flight += 1
+                        host.waiting.popleft().granted = True
+                        granted = progress = True
+                    else:
+                        wait = delay if wait is None else min(wait, delay)
+                if host.waiting:
+                    self._turns.append(key)
+        if granted:
+            self._cond.notify_all()
+        return wait
+
+    def acquire(self, url):
+        """Block until a request to `url` may start; returns the slot to release."""
+        key = host_key(url)
+        self._lookup_crawl_delay(key, url)
+        ticket = _Ticket()
+        with self._cond:
+            host = self._host(key)
+            if not host.waiting:
+                self._turns.append(key)
+            host.waiting.append(ticket)
+            while True:
+                wait = self._dispatch()
+                if ticket.granted:
+                    return key
+                if self.deadline is not None:
+                    remaining = self.deadline - time.monotonic()
+                    if remaining <= 0:
+                        host.waiting.remove(ticket)
+                        if not host.waiting and key in self._turns:
+                            self._turns.remove(key)
+                        raise SlotTimeout(f"no slot for {key} before the deadline")
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def release(self, key):
+        """Give back a slot returned by acquire()."""
+        with self._cond:
+            self._hosts[key].in_flight -= 1
+            self.in_flight -= 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    def backoff(self, url, seconds=DEFAULT_BACKOFF):
+        """Hold off every request to `url`'s host for `seconds` (capped at MAX_BACKOFF)."""
+        seconds = min(max(0.0, seconds), MAX_BACKOFF)
+        with self._cond:
+            host = self._host(host_key(url))
+            host.blocked_until = max(host.blocked_until, time.monotonic() + seconds)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the SQLite article batch.
+
+An FTS5 table, article_search, indexes the title, summary and keywords of
+every article next to its source, bias label and category. The filter
+columns are indexed too, so a search like "tariffs" from lean-left sources
+in politics is one intersection of posting lists instead of a scan.
+Triggers on the articles table keep the index current: every insert, upsert
+or keyword rewrite updates it in the same transaction as the article row.
+Bias labels are not part of the articles, so they are kept per source in
+source_bias; relabelling a source reindexes its articles.
+
+Results are ranked with bm25 (title hits count most), but only among the
+RANK_POOL most recently ingested matches, which FTS5 reads straight from the
+end of its posting lists. A --hours window is applied before that cut, so
+the pool holds the newest matches published inside it even when older
+articles were backfilled later. The cost of a search therefore depends on
+the pool, not on how many years of news match it.
+
+The index refers to articles by rowid; rebuild it after a VACUUM of the file.
+
+Usage:
+    python tools/search_index.py "climate bill"
+    python tools/search_index.py "border" --bias left --bias lean-left --category politics --hours 72
+    python tools/search_index.py --rebuild
+
+    from search_index import search
+
+    for hit in search(conn, 'climate bill', biases=['center'], limit=10):
+        print(hit['title'], hit['url'])
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from source_catalog import DEFAULT_CATALOG_PATH, SourceCatalog
+from story_coverage import DEFAULT_BIAS
+from url_index import DEFAULT_SOURCES_DIR
+
+DEFAULT_ARTICLES_PATH = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'articles.sqlite'
+
+# Results returned by default
+DEFAULT_LIMIT = 20
+# Only this many of the newest matches are ranked; keeps search time flat as the archive grows
+RANK_POOL = 1000
+# bm25 weights of title, summary, keywords, source, bias, category, url
+BM25_WEIGHTS = (10.0, 4.0, 2.0, 0.0, 0.0, 0.0, 0.0)
+
+# Filter values are indexed as one token each: 'lean-left' -> 'leanleft'.
+# FILTER_TOKEN_SQL and filter_token() must agree.
+FILTER_TOKEN_SQL = "lower(replace(replace(replace(replace({}, '-', ''), '_', ''), '.', ''), ' ', ''))"
+FILTER_SEPARATORS = re.compile(r'[-_. ]')
+
+# Quoted phrases or single words of a search box query
+QUERY_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+
+_INDEXED_ROW = (
+    "{prefix}rowid, {prefix}title, {prefix}summary, {prefix}keywords, "
+    + FILTER_TOKEN_SQL.format('{prefix}source') + ", "
+    + FILTER_TOKEN_SQL.format(
+        "COALESCE((SELECT bias FROM source_bias WHERE source_bias.source = {prefix}source), '%s')" % DEFAULT_BIAS
+    ) + ", "
+    + FILTER_TOKEN_SQL.format('{prefix}category') + ", {prefix}url"
+)
+_INSERT = "INSERT INTO article_search (rowid, title, summary, keywords, source, bias, category, url)"
+
+SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS article_search USING fts5 (
+    title, summary, keywords, source, bias, category, url UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS source_bias (
+    source TEXT PRIMARY KEY,
+    bias TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS article_search_insert AFTER INSERT ON articles BEGIN
+    {_INSERT} VALUES ({_INDEXED_ROW.format(prefix='new.')});
+END;
+CREATE TRIGGER IF NOT EXISTS article_search_update AFTER UPDATE OF title, summary, keywords, source, category ON articles BEGIN
+    DELETE FROM article_search WHERE rowid = old.rowid;
+    {_INSERT} VALUES ({_INDEXED_ROW.format(prefix='new.')});
+END;
+CREATE TRIGGER IF NOT EXISTS article_search_delete AFTER DELETE ON articles BEGIN
+    DELETE FROM article_search WHERE rowid = old.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS source_bias_insert AFTER INSERT ON source_bias BEGIN
+    DELETE FROM article_search WHERE rowid IN (SELECT rowid FROM articles WHERE source = new.source);
+    {_INSERT} SELECT {_INDEXED_ROW.format(prefix='articles.')} FROM articles WHERE source = new.source;
+END;
+CREATE TRIGGER IF NOT EXISTS source_bias_update AFTER UPDATE OF bias ON source_bias BEGIN
+    DELETE FROM article_search WHERE rowid IN (SELECT rowid FROM articles WHERE source = new.source);
+    {_INSERT} SELECT {_INDEXED_ROW.format(prefix='articles.')} FROM articles WHERE source = new.source;
+END;
+"""
+
+
+def filter_token(value):
+    """The token a source slug, bias label or category is indexed as."""
+    return FILTER_SEPARATORS.sub('', value.lower())
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def match_expression(text, sources=(), biases=(), categories=()):
+    """FTS5 MATCH expression for a search box query and filter values, or None if there is nothing to match.
+
+    Every word (or "quoted phrase") must occur in the title, summary or
+    keywords; values of the same filter are alternatives. User input is
+    always quoted, so it cannot produce an FTS5 syntax error.
+    """
+    parts = []
+    terms = [
+        _phrase(phrase or word)
+        for phrase, word in QUERY_TERMS.findall(text or '')
+        if re.search(r'\w', phrase or word)
+    ]
+    if terms:
+        parts.append(f"{{title summary keywords}} : ({' '.join(terms)})")
+    for column, values in (('source', sources), ('bias', biases), ('category', categories)):
+        tokens = [_phrase(token) for token in map(filter_token, values or ()) if token]
+        if tokens:
+            parts.append(f"{column} : ({' OR '.join(tokens)})")
+    return ' AND '.join(parts) or None
+
+
+def sync_bias_labels(conn, bias_labels):
+    """Store {source slug: bias label}; articles of sources whose label changed are reindexed."""
+    conn.executemany(
+        "INSERT INTO source_bias (source, bias) VALUES (?, ?) "
+        "ON CONFLICT (source) DO UPDATE SET bias = excluded.bias WHERE bias IS NOT excluded.bias",
+        [(source, label or DEFAULT_BIAS) for source, label in bias_labels.items()],
+    )
+
+
+def rebuild_search_index(conn):
+    """Reindex every article and merge the index into as few segments as possible."""
+    conn.execute("DELETE FROM article_search")
+    conn.execute(f"{_INSERT} SELECT {_INDEXED_ROW.format(prefix='articles.')} FROM articles")
+    conn.execute("INSERT INTO article_search (article_search) VALUES ('optimize')")
+
+
+def ensure_search_index(conn, bias_labels=None):
+    """Create the index and its triggers in `conn` (which must have the articles table).
+
+    A newly created index is filled with the articles already there;
+    returns whether it was created.
+    """
+    created = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'article_search'").fetchone() is None
+    conn.executescript(SCHEMA)
+    with conn:
+        if bias_labels is not None:
+            sync_bias_labels(conn, bias_labels)
+        if created:
+            rebuild_search_index(conn)
+    return created
+
+
+def search(conn, text, sources=(), biases=(), categories=(), since=None, limit=DEFAULT_LIMIT, offset=0, order='rank'):
+    """Articles matching a search box query, best first.
+
+    `sources`, `biases` and `categories` restrict the results to any of the
+    given values; `since` (datetime) to articles published after it. The
+    `since` bound is applied before the RANK_POOL cut, so the pool is the
+    newest matches inside the window. With order='recent' the results are
+    sorted by publication time instead of relevance. Returns dicts with the
+    article's url, source, bias, category, title, summary, published_at and
+    bm25 score (lower is better).
+    """
+    expression = match_expression(text, sources, biases, categories)
+    if expression is None:
+        return []
+
+    pool_filter, pool_params = "", []
+    if since is not None:
+        # The rowid bound lets FTS5 stop at the window's first article; the IN
+        # drops older articles that were backfilled after it.
+        pool_filter = (" AND rowid >= (SELECT MIN(rowid) FROM articles WHERE published_at >= ?)"
+                       " AND +rowid IN (SELECT rowid FROM articles WHERE published_at >= ?)")
+        pool_params = [since.astimezone(timezone.utc).isoformat()] * 2
+    query = (
+        "SELECT a.url, a.source, COALESCE(b.bias, ?), a.category, a.title, a.summary, a.published_at, hits.score "
+        f"FROM (SELECT url, bm25(article_search, {', '.join(map(str, BM25_WEIGHTS))}) AS score FROM article_search "
+        f"WHERE article_search MATCH ?{pool_filter} ORDER BY rowid DESC LIMIT ?) hits "
+        "JOIN articles a ON a.url = hits.url LEFT JOIN source_bias b ON b.source = a.source"
+    )
+    params = [DEFAULT_BIAS, expression, *pool_params, max(RANK_POOL, offset + limit)]
+    query += " ORDER BY a.published_at DESC" if order == 'recent' else " ORDER BY hits.score, a.published_at DESC"
+    query += " LIMIT ? OFFSET ?"
+    params.extend((limit, offset))
+
+    columns = ('url', 'source', 'bias', 'category', 'title', 'summary', 'published_at', 'score')
+    return [dict(zip(columns, row)) for row in conn.execute(query, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search ingested articles, or rebuild the search index")
+    parser.add_argument("query", nargs="?", default='', help="Words or \"quoted phrases\" that must all occur")
+    parser.add_argument("--articles", default=str(DEFAULT_ARTICLES_PATH), help="SQLite article batch from ingest_feeds.py")
+    parser.add_argument("--source", action="append", default=[], help="Only this source slug (repeatable)")
+    parser.add_argument("--bias", action="append", default=[], help="Only this bias label (repeatable)")
+    parser.add_argument("--category", action="append", default=[], help="Only this category (repeatable)")
+    parser.add_argument("--hours", type=int, default=None, help="Only articles published within this many hours, applied before ranking")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Results to show (default: {DEFAULT_LIMIT})")
+    parser.add_argument("--recent", action="store_true", help="Newest first instead of best match first")
+    parser.add_argument("--rebuild", action="store_true", help="Reindex every article with the current bias labels")
+    parser.add_argument("--sources-dir", default=str(DEFAULT_SOURCES_DIR), help="Directory of source JSON files")
+    parser.add_argument("--catalog", default=str(DEFAULT_CATALOG_PATH), help="SQLite source catalog")
+    args = parser.parse_args()
+
+    if not Path(args.articles).exists():
+        print(f"No article batch at {args.articles}; run ingest_feeds.py --format sqlite first")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.articles)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if args.rebuild:
+        catalog = SourceCatalog(args.catalog)
+        catalog.build(args.sources_dir)
+        bias_labels = catalog.bias_labels()
+        catalog.close()
+
+        started = time.perf_counter()
+        if not ensure_search_index(conn, bias_labels):
+            with conn:
+                rebuild_search_index(conn)
+        count = conn.execute("SELECT COUNT(*) FROM article_search").fetchone()[0]
+        print(f"Indexed {count} articles in {time.perf_counter() - started:.1f}s")
+        if not args.query:
+            conn.close()
+            return
+    else:
+        ensure_search_index(conn)
+
+    since = datetime.now(timezone.utc) - timedelta(hours=args.hours) if args.hours else None
+    started = time.perf_counter()
+    hits = search(conn, args.query, args.source, args.bias, args.category, since=since, limit=args.limit,
+                  order='recent' if args.recent else 'rank')
+    elapsed = time.perf_counter() - started
+    conn.close()
+
+    for hit in hits:
+        print(f"{hit['published_at'][:16]}  {hit['source']:<18} {hit['bias']:<10} {hit['title']}")
+        print(f"{'':18}{hit['url']}")
+    print(f"\n{len(hits)} results in {elapsed * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Persistent index of the feed items that have already been ingested.
+
+Every item is identified by its article URL (link, or guid when there is no
+link) and a hash of its raw title and description. The pairs live in a
+SQLite table, scoped to the output they were written to, so that a run
+into another output still gets every article; a Bloom filter of them is kept in memory so that new and
+edited items, which the filter has never seen, are recognized without a
+database lookup. Only items the filter may have seen are confirmed against
+the table.
+
+Usage:
+    from seen_items import SeenItemIndex, content_hash
+
+    index = SeenItemIndex('storage/app/private/ingest_state.sqlite', writer.target)
+    digest = content_hash(item)
+    if not index.is_unchanged(url, digest):
+        ...
+        index.mark([(url, digest, feed_url)])
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# False positive rate of the Bloom filter; false positives only cost a database lookup
+BLOOM_ERROR_RATE = 0.01
+# Minimum number of entries the filter is sized for, on top of the stored ones
+BLOOM_HEADROOM = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_items (
+    target TEXT NOT NULL,
+    url TEXT NOT NULL,
+    content_hash BLOB NOT NULL,
+    feed_url TEXT,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (target, url)
+);
+CREATE INDEX IF NOT EXISTS seen_items_seen_at ON seen_items (seen_at);
+"""
+
+
+def content_hash(item):
+    """Hash of the parts of a raw feed item that end up in its article."""
+    digest = hashlib.blake2b(digest_size=16)
+    for field in ('title', 'description', 'author', 'published'):
+        digest.update((item.get(field) or '').encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.digest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over byte strings, using double hashing."""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _bloom_key(url, digest):
+    return url.encode('utf-8', 'surrogatepass') + b'\0' + digest
+
+
+class SeenItemIndex:
+    """Thread-safe SQLite table of the items ingested into `target`, fronted by a Bloom filter.
+
+    `target` names the output (see the writers' `target`); items stored in
+    one output are not seen by runs into another.
+    """
+
+    def __init__(self, path, target=''):
+        self.path = Path(path)
+        self.target = target
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(seen_items)")]
+        if columns and 'target' not in columns:
+            # Rows from before outputs were told apart; each output ingests its items again once
+            self._conn.execute("DROP TABLE seen_items")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+        count = self._conn.execute("SELECT COUNT(*) FROM seen_items WHERE target = ?", (target,)).fetchone()[0]
+        self._bloom = BloomFilter(count + max(count, BLOOM_HEADROOM))
+        for url, digest in self._conn.execute("SELECT url, content_hash FROM seen_items WHERE target = ?", (target,)):
+            self._bloom.add(_bloom_key(url, digest))
+
+    def is_unchanged(self, url, digest):
+        """True if `url` was stored before with the same content hash."""
+        if _bloom_key(url, digest) not in self._bloom:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM seen_items WHERE target = ? AND url = ?", (self.target, url)).fetchone()
+        return row is not None and row[0] == digest
+
+    def mark(self, entries):
+        """Record (url, content hash, feed url) entries once their articles are written."""
+        entries = list(entries)
+        if not entries:
+            return
+        seen_at = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO seen_items (target, url, content_hash, feed_url, seen_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (target, url) DO UPDATE SET content_hash = excluded.content_hash, "
+                "feed_url = excluded.feed_url, seen_at = excluded.seen_at",
+                [(self.target, url, digest, feed_url, seen_at) for url, digest, feed_url in entries],
+            )
+            self._conn.commit()
+            for url, digest, _ in entries:
+                self._bloom.add(_bloom_key(url, digest))
+
+    def prune(self, max_age):
+        """Forget items of any output not stored or changed for `max_age` seconds; returns how many."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM seen_items WHERE seen_at < ?", (time.time() - max_age,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Streaming sitemap reader for feed discovery.
+
+Reads sitemap indexes, regular sitemaps and news sitemaps with an incremental
+XML parser, clearing every element once its <loc> has been seen, so even
+multi-megabyte indexes never sit in memory. Child sitemaps are fetched
+concurrently within a sitemap count and byte budget.
+
+Usage:
+    from sitemaps import read_sitemaps
+
+    urls = read_sitemaps(http, ["https://apnews.com/sitemap.xml"], keep=lambda loc: "rss" in loc)
+"""
+
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Maximum number of sitemap files read for one site
+DEFAULT_MAX_SITEMAPS = 20
+# Maximum number of (decompressed) sitemap bytes read for one site
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+# Maximum number of URLs kept from all sitemaps
+DEFAULT_MAX_URLS = 500
+DEFAULT_CONCURRENCY = 4
+SITEMAP_TIMEOUT = 10
+CHUNK_SIZE = 64 * 1024
+
+# Child sitemaps whose name suggests they list sections or feeds are read first
+PREFERRED_SITEMAP_HINTS = ("rss", "feed", "section", "categor", "topic", "hub", "news")
+
+
+class SitemapBudget:
+    """Thread-safe counters shared by every sitemap read for one site."""
+
+    def __init__(self, max_sitemaps=DEFAULT_MAX_SITEMAPS, max_bytes=DEFAULT_MAX_BYTES):
+        self.sitemaps_left = max_sitemaps
+        self.bytes_left = max_bytes
+        self._lock = threading.Lock()
+
+    def take_sitemap(self):
+        """Reserve one sitemap fetch; False once the budget is spent."""
+        with self._lock:
+            if self.sitemaps_left <= 0 or self.bytes_left <= 0:
+                return False
+            self.sitemaps_left -= 1
+            return True
+
+    def consume(self, size):
+        """Account for `size` bytes read; False once the byte budget is spent."""
+        with self._lock:
+            self.bytes_left -= size
+            return self.bytes_left > 0
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_sitemap_entries(chunks, budget=None):
+    """Yield ('sitemap' | 'url', loc) pairs from an iterable of byte chunks.
+
+    Gzipped sitemaps are detected from their magic bytes and decompressed on
+    the fly. Parsing stops quietly at the first XML error or once the byte
+    budget is exhausted.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    decompressor = None
+    root = None
+    first = True
+
+    for chunk in chunks:
+        if first:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        if budget is not None and not budget.consume(len(chunk)):
+            return
+
+        try:
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = element
+                    continue
+                name = _local_name(element.tag)
+                if name not in ("sitemap", "url"):
+                    continue
+                for child in element:
+                    if _local_name(child.tag) == "loc" and child.text:
+                        yield name, child.text.strip()
+                        break
+                # Entries are direct children of the root; drop them once read
+                element.clear()
+                if root is not None:
+                    root.clear()
+        except ET.ParseError:
+            return
+
+
+def read_sitemaps(
+    http,
+    sitemap_urls,
+    keep,
+    max_sitemaps=DEFAULT_MAX_SITEMAPS,
+    max_bytes=DEFAULT_MAX_BYTES,
+    max_urls=DEFAULT_MAX_URLS,
+    concurrency=DEFAULT_CONCURRENCY,
+):
+    """Collect page URLs accepted by `keep(loc)` from the given sitemaps.
+
+    Sitemap indexes are followed breadth-first, each level's child sitemaps
+    being fetched concurrently. Only the URLs kept by the predicate are held
+    in memory, up to `max_urls` of them.
+    """
+    budget = SitemapBudget(max_sitemaps, max_bytes)
+    visited = set()
+    kept = []
+    kept_set = set()
+
+    def read_one(sitemap_url):
+        children = []
+        urls = []
+        if not budget.take_sitemap():
+            return children, urls
+        try:
+            with http.get(sitemap_url, timeout=SITEMAP_TIMEOUT) as response:
+                for name, loc in iter_sitemap_entries(response.iter_chunks(CHUNK_SIZE), budget):
+                    if name == "sitemap":
+                        children.append(loc)
+                    elif keep(loc):
+                        urls.append(loc)
+                        if len(urls) >= max_urls:
+                            break
+        except Exception:
+            pass
+        return children, urls
+
+    level = [url for url in dict.fromkeys(sitemap_urls)]
+    while level and len(kept) < max_urls:
+        visited.update(level)
+        workers = max(1, min(concurrency, len(level)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read_one, level))
+
+        next_level = []
+        for children, urls in results:
+            for url in urls:
+                if url not in kept_set and len(kept) < max_urls:
+                    kept_set.add(url)
+                    kept.append(url)
+            next_level.extend(child for child in children if child not in visited)
+
+        next_level = list(dict.fromkeys(next_level))
+        # sort() is stable: preferred children first, the rest in index order
+        next_level.sort(key=lambda url: not any(hint in url.lower() for hint in PREFERRED_SITEMAP_HINTS))
+        level = next_level
+
+    return kept
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Compiled SQLite catalog of database/sources/*.json.
+
+Sources, feeds and categories are loaded into indexed tables, with a unique
+index on each feed's canonical URL, so "is this feed known?" and "which feeds
+cover this category?" are single index lookups however many sources there
+are. Every JSON file's SHA-256 is stored; rebuilding only reloads the files
+whose content changed and drops the ones that were deleted.
+
+Usage:
+    python tools/source_catalog.py build [--force]
+    python tools/source_catalog.py lookup https://feeds.npr.org/1004/rss.xml
+    python tools/source_catalog.py category politics
+
+    from source_catalog import SourceCatalog
+
+    catalog = SourceCatalog()
+    catalog.build()
+    if catalog.is_known(url):
+        ...
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from url_index import DEFAULT_SOURCES_DIR, UrlIndex, canonicalize_url
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'source_catalog.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    built_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL REFERENCES files(name) ON DELETE CASCADE,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    url TEXT,
+    bias_label TEXT,
+    country_code TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS source_categories (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    PRIMARY KEY (source_id, category_id)
+);
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    is_active INTEGER NOT NULL DEFAULT 1,
+    position INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS feeds_canonical_url ON feeds (canonical_url);
+CREATE INDEX IF NOT EXISTS feeds_category ON feeds (category_id, is_active);
+CREATE INDEX IF NOT EXISTS feeds_source ON feeds (source_id, position);
+"""
+
+FEED_COLUMNS = 'f.name, f.url, c.name AS category, f.is_active, s.slug AS source, s.file'
+
+
+def file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class SourceCatalog:
+    """Thread-safe SQLite catalog of the sources, feeds and categories."""
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def build(self, sources_dir=DEFAULT_SOURCES_DIR, force=False):
+        """Bring the catalog up to date with the JSON files in `sources_dir`.
+
+        Only new files and files whose hash changed are (re)loaded, unless
+        `force` is set. Files that lost a feed to another file's identical
+        canonical URL are reloaded whenever anything else changes, so the
+        feed comes back once the other file drops it. Returns a summary:
+            {'added': [...], 'changed': [...], 'removed': [...],
+             'unchanged': n, 'errors': {file: message}, 'duplicates': [...]}
+        """
+        files = {path.name: path for path in sorted(Path(sources_dir).glob('*.json'))}
+        hashes = {}
+        errors = {}
+        for name, path in files.items():
+            try:
+                hashes[name] = file_sha256(path)
+            except OSError as e:
+                errors[name] = str(e)
+
+        summary = {'added': [], 'changed': [], 'removed': [], 'unchanged': 0, 'errors': errors, 'duplicates': []}
+        with self._lock, self._conn:
+            stored = {row['name']: row for row in self._conn.execute("SELECT name, sha256, duplicates FROM files")}
+
+            removed = [name for name in stored if name not in files]
+            reload = [
+                name for name in hashes
+                if force or name not in stored or stored[name]['sha256'] != hashes[name]
+            ]
+            if removed or reload:
+                # Files that gave way on a duplicate URL may be able to claim it now
+                reload.extend(
+                    name for name, row in stored.items()
+                    if row['duplicates'] and name in hashes and name not in reload
+                )
+
+            for name in removed + reload:
+                self._conn.execute("DELETE FROM files WHERE name = ?", (name,))
+
+            for name in reload:
+                # A broken file must not leave half of its rows behind
+                self._conn.execute("SAVEPOINT load_source")
+                try:
+                    with open(files[name], 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    duplicates = self._load_source(name, hashes[name], data)
+                except (OSError, ValueError, KeyError, TypeError, sqlite3.IntegrityError) as e:
+                    self._conn.execute("ROLLBACK TO load_source")
+                    self._conn.execute("RELEASE load_source")
+                    errors[name] = str(e)
+                    continue
+                self._conn.execute("RELEASE load_source")
+                summary['duplicates'].extend(duplicates)
+                if name not in stored:
+                    summary['added'].append(name)
+                elif stored[name]['sha256'] != hashes[name] or force:
+                    summary['changed'].append(name)
+
+            self._conn.execute(
+                "DELETE FROM categories WHERE id NOT IN (SELECT category_id FROM feeds) "
+                "AND id NOT IN (SELECT category_id FROM source_categories)"
+            )
+            summary['removed'] = removed
+            loaded = set(summary['added']) | set(summary['changed']) | set(errors)
+            summary['unchanged'] = sum(1 for name in hashes if name not in loaded)
+        return summary
+
+    def _category_id(self, name):
+        self._conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+        return self._conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+
+    def _load_source(self, file_name, sha256, data):
+        """Insert one source file; returns the feed URLs already owned by another source."""
+        self._conn.execute(
+            "INSERT INTO files (name, sha256, built_at) VALUES (?, ?, ?)",
+            (file_name, sha256, time.time()),
+        )
+        cursor = self._conn.execute(
+            "INSERT INTO sources (file, slug, name, url, bias_label, country_code, is_active) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                file_name,
+                data['slug'],
+                data['name'],
+                data.get('url'),
+                data.get('bias_label'),
+                data.get('country_code', 'US'),
+                int(bool(data.get('is_active', True))),
+            ),
+        )
+        source_id = cursor.lastrowid
+
+        for category in data.get('categories', []):
+            self._conn.execute(
+                "INSERT OR IGNORE INTO source_categories (source_id, category_id) VALUES (?, ?)",
+                (source_id, self._category_id(category)),
+            )
+
+        duplicates = []
+        for position, feed in enumerate(data.get('rss_feeds', [])):
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO feeds (source_id, name, url, canonical_url, category_id, is_active, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source_id,
+                    feed['name'],
+                    feed['url'],
+                    canonicalize_url(feed['url']),
+                    self._category_id(feed.get('category') or 'general'),
+                    int(bool(feed.get('is_active', True))),
+                    position,
+                ),
+            )
+            if cursor.rowcount == 0:
+                duplicates.append(feed['url'])
+
+        if duplicates:
+            self._conn.execute("UPDATE files SET duplicates = ? WHERE name = ?", (len(duplicates), file_name))
+        return duplicates
+
+    def feed(self, url):
+        """The catalog row of the feed equivalent to `url`, or None."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT {FEED_COLUMNS} FROM feeds f JOIN sources s ON s.id = f.source_id "
+                "JOIN categories c ON c.id = f.category_id WHERE f.canonical_url = ?",
+                (canonicalize_url(url),),
+            ).fetchone()
+
+    def is_known(self, url):
+        return self.feed(url) is not None
+
+    def feeds(self, active_only=True):
+        """Every feed row, grouped by source in file order.
+
+        With `active_only`, feeds and sources marked inactive are left out.
+        """
+        query = (
+            f"SELECT {FEED_COLUMNS} FROM feeds f JOIN sources s ON s.id = f.source_id "
+            "JOIN categories c ON c.id = f.category_id"
+        )
+        if active_only:
+            query += " WHERE f.is_active = 1 AND s.is_active = 1"
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY s.slug, f.position").fetchall()
+
+    def feeds_by_category(self, category, active_only=True):
+        """Feed rows of `category`, grouped by source in file order."""
+        query = (
+            f"SELECT {FEED_COLUMNS} FROM categories c JOIN feeds f ON f.category_id = c.id "
+            "JOIN sources s ON s.id = f.source_id WHERE c.name = ?"
+        )
+        if active_only:
+            query += " AND f.is_active = 1 AND s.is_active = 1"
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY s.slug, f.position", (category,)).fetchall()
+
+    def bias_labels(self):
+        """{source slug: bias label} for every source."""
+        with self._lock:
+            rows = self._conn.execute("SELECT slug, bias_label FROM sources").fetchall()
+        return {slug: bias_label for slug, bias_label in rows}
+
+    def categories(self):
+        """{category: number of feeds}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.name, COUNT(f.id) FROM categories c LEFT JOIN feeds f ON f.category_id = c.id "
+                "GROUP BY c.id ORDER BY c.name"
+            ).fetchall()
+        return {name: count for name, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class KnownFeeds:
+    """UrlIndex-compatible view of the catalog's feeds plus URLs added this run.
+
+    Used as `known_feeds` by the discovery tools: membership is an index
+    lookup in the catalog rather than a scan of every source file.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._added = UrlIndex()
+        self._lock = threading.Lock()
+
+    def add(self, url):
+        if self.catalog.is_known(url):
+            return False
+        with self._lock:
+            return self._added.add(url)
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        with self._lock:
+            if url in self._added:
+                return True
+        return self.catalog.is_known(url)
+
+
+def print_feeds(rows):
+    for row in rows:
+        state = '' if row['is_active'] else ' (inactive)'
+        print(f"{row['source']:<20} {row['category']:<12} {row['name']} - {row['url']}{state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the compiled catalog of database/sources")
+    parser.add_argument("--catalog", default=str(DEFAULT_CATALOG_PATH), help="SQLite catalog file")
+    parser.add_argument("--sources-dir", default=str(DEFAULT_SOURCES_DIR), help="Directory of source JSON files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Load new and changed source files into the catalog")
+    build_parser.add_argument("--force", action="store_true", help="Reload every file, changed or not")
+
+    lookup_parser = commands.add_parser("lookup", help="Check whether feed URLs are already known")
+    lookup_parser.add_argument("urls", nargs="+")
+
+    category_parser = commands.add_parser("category", help="List the feeds of a category")
+    category_parser.add_argument("category", nargs="?", help="Category name (omit to list categories)")
+    category_parser.add_argument("--all", action="store_true", help="Include inactive feeds")
+
+    args = parser.parse_args()
+    catalog = SourceCatalog(args.catalog)
+
+    # Queries always see the current files; an unchanged tree costs one hash per file
+    summary = catalog.build(args.sources_dir, force=getattr(args, 'force', False))
+
+    if args.command == 'build':
+        print(f"Catalog: {catalog.path}")
+        print(f"Added: {len(summary['added'])}, changed: {len(summary['changed'])}, "
+              f"removed: {len(summary['removed'])}, unchanged: {summary['unchanged']}")
+        for name in summary['added'] + summary['changed']:
+            print(f"  Loaded {name}")
+        for name in summary['removed']:
+            print(f"  Removed {name}")
+        for url in summary['duplicates']:
+            print(f"  Duplicate feed (kept the first source's entry): {url}")
+    elif args.command == 'lookup':
+        for url in args.urls:
+            row = catalog.feed(url)
+            if row is None:
+                print(f"Unknown: {url}")
+            else:
+                print(f"Known:   {url} -> {row['source']} / {row['name']} ({row['category']})")
+    elif args.command == 'category':
+        if args.category:
+            print_feeds(catalog.feeds_by_category(args.category, active_only=not args.all))
+        else:
+            for name, count in catalog.categories().items():
+                print(f"{name:<16} {count:>5}")
+
+    for name, message in summary['errors'].items():
+        print(f"Error in {name}: {message}", file=sys.stderr)
+    catalog.close()
+    if summary['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
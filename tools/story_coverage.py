@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Bias coverage of every story cluster, precomputed for the web app.
+
+For each cluster written by cluster_stories.py one story_coverage row holds
+what a story page shows: article counts by bias label and by side (left,
+center, right), the earliest source on each side, a representative
+headline and the list of sources. Rows are only rebuilt for clusters whose
+articles changed, so a run costs about as much as the news that came in.
+
+Usage:
+    python tools/story_coverage.py    # rewrite every row, e.g. after bias labels changed
+
+    from story_coverage import update_coverage
+
+    update_coverage(conn, changed_cluster_ids, catalog.bias_labels())
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from normalize import content_words
+from source_catalog import DEFAULT_CATALOG_PATH, SourceCatalog
+from url_index import DEFAULT_SOURCES_DIR
+
+DEFAULT_ARTICLES_PATH = Path(__file__).parent.parent / 'storage' / 'app' / 'private' / 'articles.sqlite'
+
+# Sides of the spectrum each bias label counts towards (NewsSource::getBiasColor())
+SIDES = {
+    'left': 'left',
+    'lean-left': 'left',
+    'center': 'center',
+    'lean-right': 'right',
+    'right': 'right',
+}
+# Label of sources without a known one, as NewsSource::getBiasDisplayLabel() shows them
+DEFAULT_BIAS = 'center'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS story_coverage (
+    cluster_id TEXT PRIMARY KEY,
+    headline TEXT NOT NULL,
+    headline_url TEXT NOT NULL,
+    articles INTEGER NOT NULL,
+    bias_counts TEXT NOT NULL,
+    left_count INTEGER NOT NULL,
+    center_count INTEGER NOT NULL,
+    right_count INTEGER NOT NULL,
+    earliest_left TEXT,
+    earliest_center TEXT,
+    earliest_right TEXT,
+    sources TEXT NOT NULL,
+    first_published_at TEXT NOT NULL,
+    last_published_at TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS story_coverage_last_published_at ON story_coverage (last_published_at);
+"""
+
+
+def representative(members, words):
+    """Index of the member whose words are most shared by the rest of the cluster."""
+    frequency = {}
+    for member_words in words:
+        for word in member_words:
+            frequency[word] = frequency.get(word, 0) + 1
+
+    def centrality(position):
+        member_words = words[position]
+        if not member_words:
+            return 0.0
+        return sum(frequency[word] - 1 for word in member_words) / len(member_words)
+
+    # Members are in publication order, so ties go to the earliest
+    return max(range(len(members)), key=centrality)
+
+
+def summarize(cluster, members, bias_labels, now=None):
+    """The story_coverage row of a cluster from its member rows (url, source, title, summary, published_at)."""
+    members = sorted(members, key=lambda member: member[4])
+    headline = members[representative(members, [content_words(f"{title} {summary}") for _, _, title, summary, _ in members])]
+
+    bias_counts = {}
+    side_counts = {'left': 0, 'center': 0, 'right': 0}
+    earliest = {}
+    sources = []
+    for _, source, _, _, published_at in members:
+        label = bias_labels.get(source) or DEFAULT_BIAS
+        side = SIDES.get(label, 'center')
+        bias_counts[label] = bias_counts.get(label, 0) + 1
+        side_counts[side] += 1
+        earliest.setdefault(side, {'source': source, 'published_at': published_at})
+        if source not in sources:
+            sources.append(source)
+
+    return (
+        cluster, headline[2], headline[0], len(members), json.dumps(bias_counts, sort_keys=True),
+        side_counts['left'], side_counts['center'], side_counts['right'],
+        *(json.dumps(earliest[side]) if side in earliest else None for side in ('left', 'center', 'right')),
+        json.dumps(sources), members[0][4], members[-1][4], now or time.time(),
+    )
+
+
+def update_coverage(conn, cluster_ids, bias_labels):
+    """Rebuild the story_coverage rows of `cluster_ids` and drop the ones of clusters that are gone.
+
+    Runs in the caller's transaction (the SCHEMA must exist); returns the
+    number of rows written.
+    """
+    cluster_ids = list(cluster_ids)
+    members = {cluster: [] for cluster in cluster_ids}
+    now = time.time()
+    # Chunked to stay below SQLite's limit on bound parameters
+    for start in range(0, len(cluster_ids), 500):
+        chunk = cluster_ids[start:start + 500]
+        rows = conn.execute(
+            "SELECT ac.cluster_id, a.url, a.source, a.title, a.summary, a.published_at "
+            "FROM article_clusters ac JOIN articles a ON a.url = ac.url "
+            f"WHERE ac.cluster_id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        for cluster, *member in rows:
+            members[cluster].append(member)
+
+    gone = [(cluster,) for cluster, rows in members.items() if not rows]
+    summaries = [summarize(cluster, rows, bias_labels, now) for cluster, rows in members.items() if rows]
+    conn.executemany("DELETE FROM story_coverage WHERE cluster_id = ?", gone)
+    conn.executemany(
+        "INSERT OR REPLACE INTO story_coverage (cluster_id, headline, headline_url, articles, bias_counts, "
+        "left_count, center_count, right_count, earliest_left, earliest_center, earliest_right, sources, "
+        "first_published_at, last_published_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        summaries,
+    )
+    return len(summaries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the bias coverage rows of every story cluster")
+    parser.add_argument("--articles", default=str(DEFAULT_ARTICLES_PATH), help="SQLite article batch with story clusters")
+    parser.add_argument("--sources-dir", default=str(DEFAULT_SOURCES_DIR), help="Directory of source JSON files")
+    parser.add_argument("--catalog", default=str(DEFAULT_CATALOG_PATH), help="SQLite source catalog")
+    args = parser.parse_args()
+
+    if not Path(args.articles).exists():
+        print(f"No article batch at {args.articles}; run ingest_feeds.py --format sqlite first")
+        sys.exit(1)
+
+    catalog = SourceCatalog(args.catalog)
+    catalog.build(args.sources_dir)
+    bias_labels = catalog.bias_labels()
+    catalog.close()
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(args.articles)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    with conn:
+        conn.execute("DELETE FROM story_coverage")
+        clusters = [cluster for cluster, in conn.execute("SELECT id FROM story_clusters")]
+        written = update_coverage(conn, clusters, bias_labels)
+    conn.close()
+    print(f"Wrote coverage for {written} stories in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
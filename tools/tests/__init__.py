@@ -0,0 +1,6 @@
+"""
+Unit tests for the Python tools. The tools import each other as top-level
+modules, so run them with tools/ as the top-level directory:
+
+    python -m unittest discover -s tools/tests -t tools
+"""
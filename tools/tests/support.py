@@ -0,0 +1,148 @@
+"""Helpers shared by the tool tests: sample feeds and a local HTTP server for them."""
+
+import contextlib
+import http.server
+import io
+import json
+import sys
+import threading
+import time
+from unittest import mock
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Example</title>
+<item>
+  <title>Senate passes &lt;b&gt;budget&lt;/b&gt; bill</title>
+  <link>https://example.com/news/budget</link>
+  <guid>budget-1</guid>
+  <description><![CDATA[<p>The <em>Senate</em> passed the budget late on Friday.</p>]]></description>
+  <author>Jane Doe</author>
+  <pubDate>Fri, 10 Oct 2025 22:15:00 GMT</pubDate>
+</item>
+<item>
+  <title>Storm heads north</title>
+  <link>https://example.com/news/storm</link>
+  <description>Forecasters expect heavy rain.</description>
+  <pubDate>Fri, 10 Oct 2025 18:00:00 +0000</pubDate>
+</item>
+</channel></rss>
+"""
+
+RDF = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/"
+         xmlns:dc="http://purl.org/dc/elements/1.1/">
+<channel rdf:about="https://example.org/"><title>Example</title></channel>
+<item rdf:about="https://example.org/a">
+  <title>RDF story</title>
+  <link>https://example.org/a</link>
+  <description>From an RSS 1.0 feed.</description>
+  <dc:creator>John Roe</dc:creator>
+  <dc:date>2025-10-10T12:30:00Z</dc:date>
+</item>
+</rdf:RDF>
+"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Example</title>
+<entry>
+  <title type="html">Atom &amp;amp; more</title>
+  <link rel="alternate" href="https://example.net/atom-1"/>
+  <id>tag:example.net,2025:1</id>
+  <summary>An Atom entry.</summary>
+  <author><name>Ann Smith</name></author>
+  <updated>2025-10-11T08:00:00Z</updated>
+  <published>2025-10-11T07:00:00+02:00</published>
+</entry>
+</feed>
+"""
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 makes the kernel drop concurrent connects, which then retry after a second
+    request_queue_size = 128
+
+
+class FeedServer:
+    """Threaded HTTP server on localhost serving `routes` ({path: bytes or callable(handler)})."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                route = server.routes.get(self.path)
+                if route is None:
+                    self.send_error(404)
+                elif callable(route):
+                    route(self)
+                else:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/rss+xml')
+                    self.send_header('Content-Length', str(len(route)))
+                    self.end_headers()
+                    self.wfile.write(route)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = _Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self._server.server_port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def trickle(interval=0.2, chunks=100):
+    """A route that sends the start of a feed, then one small chunk every `interval` seconds."""
+    def route(handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/rss+xml')
+        handler.end_headers()
+        try:
+            handler.wfile.write(b'<?xml version="1.0"?><rss version="2.0"><channel>')
+            for _ in range(chunks):
+                time.sleep(interval)
+                handler.wfile.write(b'<!-- still here -->')
+                handler.wfile.flush()
+        except OSError:
+            pass
+    return route
+
+
+def write_source(sources_dir, slug, feed_urls, bias_label='center', category='politics'):
+    """Write a database/sources style JSON file for `slug` with the given feeds."""
+    data = {
+        'name': slug.title(),
+        'slug': slug,
+        'url': f'https://{slug}.example.com',
+        'bias_label': bias_label,
+        'country_code': 'US',
+        'categories': [category],
+        'is_active': True,
+        'rss_feeds': [
+            {'name': f'Feed {number}', 'url': url, 'category': category}
+            for number, url in enumerate(feed_urls)
+        ],
+    }
+    with open(f'{sources_dir}/{slug}.json', 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def run_main(main, *args):
+    """Run a tool's main() with `args` as its command line; returns what it printed."""
+    output = io.StringIO()
+    with mock.patch.object(sys, 'argv', ['tool', *map(str, args)]), contextlib.redirect_stdout(output):
+        main()
+    return output.getvalue()
@@ -0,0 +1,71 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from check_feeds import NOT_CHECKED, FeedHealthStore, check_all
+from tests.support import RSS, FeedServer, trickle
+
+
+class CheckAllTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FeedHealthStore(Path(self.tmp.name) / 'health.sqlite')
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_records_feed_details(self):
+        with FeedServer({'/feed.xml': RSS}) as server:
+            check, = check_all([('example', server.url('/feed.xml'))], self.store, timeout=5)
+        self.assertTrue(check.ok)
+        self.assertEqual((check.status, check.items, check.size), (200, 2, len(RSS)))
+        self.assertEqual(check.last_item_at, '2025-10-10T22:15:00+00:00')
+        self.assertEqual(self.store.lookup(check.url).items, 2)
+
+    def test_trickling_feed_stops_at_the_run_deadline(self):
+        # Every chunk arrives well within the socket timeout, so only the deadline ends it
+        with FeedServer({'/slow.xml': trickle(interval=0.1)}) as server:
+            started = time.monotonic()
+            check, = check_all([('slow', server.url('/slow.xml'))], self.store, timeout=5, deadline=1.0)
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 2.0)
+        self.assertFalse(check.ok)
+        self.assertEqual(check.error, 'timed out (run deadline)')
+        self.assertEqual(check.failures, 1)
+
+    def test_feeds_without_a_slot_before_the_deadline_are_not_checked(self):
+        routes = {'/slow.xml': trickle(interval=0.1)}
+        routes.update({f'/feed{number}.xml': RSS for number in range(5)})
+        with FeedServer(routes) as server:
+            feeds = [('example', server.url(path)) for path in routes]
+            started = time.monotonic()
+            checks = check_all(feeds, self.store, timeout=5, concurrency=1, deadline=0.5)
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(checks[0].error, 'timed out (run deadline)')
+        self.assertEqual([check.error for check in checks[1:]], [NOT_CHECKED] * 5)
+        # Their previous results are kept, not overwritten
+        self.assertIsNone(self.store.lookup(checks[1].url))
+
+    def test_busy_hosts_get_more_slots(self):
+        # 20 feeds on one host that each take 0.5s finish in one wave, not three
+        def slow(handler):
+            time.sleep(0.5)
+            handler.send_response(200)
+            handler.send_header('Content-Length', str(len(RSS)))
+            handler.end_headers()
+            handler.wfile.write(RSS)
+
+        routes = {f'/feed{number}.xml': slow for number in range(20)}
+        with FeedServer(routes) as server:
+            started = time.monotonic()
+            checks = check_all([('example', server.url(path)) for path in routes], self.store, timeout=5, rate=1000)
+            elapsed = time.monotonic() - started
+        self.assertTrue(all(check.ok for check in checks))
+        self.assertLess(elapsed, 1.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import sqlite3
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from cluster_stories import SCHEMA, assign_cluster_ids, cluster_articles, cluster_id, load_articles, store_clusters
+from ingest_feeds import ARTICLES_SCHEMA
+from story_coverage import SCHEMA as COVERAGE_SCHEMA
+
+START = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+STORY = "Senate passes sweeping budget bill after marathon overnight session in Washington"
+OTHER = "Storm brings heavy rain and flooding to coastal towns across the northeast"
+
+
+def article(url, title, hours, source='npr'):
+    return {'url': url, 'source': source, 'title': title, 'summary': '', 'published_at': START + timedelta(hours=hours)}
+
+
+class ClusterArticlesTest(unittest.TestCase):
+    def test_groups_similar_articles_in_publication_order(self):
+        articles = [
+            article('https://b/1', STORY + " vote", 2, 'fox'),
+            article('https://a/1', STORY, 1),
+            article('https://c/1', OTHER, 1),
+            article('https://d/1', STORY + " tally", 3, 'nytimes'),
+        ]
+        clusters = sorted(cluster_articles(articles), key=len)
+        self.assertEqual(clusters, [[2], [1, 0, 3]])
+
+    def test_window_keeps_distant_articles_apart(self):
+        articles = [article('https://a/1', STORY, 0), article('https://b/1', STORY, 100)]
+        self.assertEqual(len(cluster_articles(articles, window=timedelta(hours=36))), 2)
+
+
+class AssignClusterIdsTest(unittest.TestCase):
+    def test_new_cluster_takes_the_id_of_its_earliest_article(self):
+        articles = [article('https://a/1', STORY, 0), article('https://b/1', STORY, 1)]
+        self.assertEqual(assign_cluster_ids(articles, [[0, 1]], {}), [(cluster_id(articles[0]), [0, 1])])
+
+    def test_split_story_keeps_its_id_on_the_larger_part(self):
+        articles = [article(f'https://x/{number}', STORY, number) for number in range(5)]
+        previous = {f'https://x/{number}': 'old' for number in range(5)}
+        assigned = assign_cluster_ids(articles, [[0, 1], [2, 3, 4]], previous)
+        self.assertEqual(assigned[1], ('old', [2, 3, 4]))
+        self.assertEqual(assigned[0], (cluster_id(articles[0]), [0, 1]))
+
+    def test_new_ids_avoid_ids_in_use(self):
+        articles = [article('https://a/1', STORY, 0), article('https://b/1', STORY, 1)]
+        taken = {cluster_id(articles[0])}
+        (identifier, _), = assign_cluster_ids(articles, [[0, 1]], {}, taken.__contains__)
+        self.assertEqual(identifier, cluster_id(articles[1]))
+
+
+class StoreClustersTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        for schema in (ARTICLES_SCHEMA, SCHEMA, COVERAGE_SCHEMA):
+            self.conn.executescript(schema)
+
+    def add(self, *articles):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO articles (url, source, feed_url, category, title, summary, author, published_at, keywords, "
+                "fetched_at) VALUES (?, ?, 'f', 'politics', ?, ?, 'a', ?, '[]', 0)",
+                [(a['url'], a['source'], a['title'], a['summary'], a['published_at'].isoformat()) for a in articles],
+            )
+
+    def run_clustering(self, since):
+        articles = load_articles(self.conn, since)
+        return store_clusters(self.conn, articles, cluster_articles(articles), since, {'npr': 'lean-left', 'fox': 'right'})
+
+    def test_story_longer_than_the_window_keeps_its_id(self):
+        first = article('https://a/1', STORY, 0)
+        self.add(first, article('https://b/1', STORY + " vote", 10, 'fox'), article('https://c/1', STORY + " tally", 20))
+        self.run_clustering(START)
+        identifier = cluster_id(first)
+
+        # The first article falls out of the window while the story grows
+        self.add(article('https://d/1', STORY + " again", 40, 'fox'))
+        self.run_clustering(START + timedelta(hours=5))
+
+        ids = dict(self.conn.execute("SELECT url, cluster_id FROM article_clusters"))
+        self.assertEqual(set(ids.values()), {identifier})
+        self.assertEqual(len(ids), 4)
+        row = self.conn.execute(
+            "SELECT title, size, sources, first_published_at FROM story_clusters WHERE id = ?", (identifier,)
+        ).fetchone()
+        self.assertEqual(row, (STORY, 4, 2, first['published_at'].isoformat()))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM story_clusters").fetchone()[0], 1)
+        self.assertEqual(
+            self.conn.execute("SELECT articles FROM story_coverage WHERE cluster_id = ?", (identifier,)).fetchone()[0], 4
+        )
+
+    def test_clusters_left_with_one_article_are_dissolved(self):
+        self.add(article('https://a/1', STORY, 0), article('https://b/1', STORY, 10))
+        self.run_clustering(START)
+        with self.conn:
+            self.conn.execute("UPDATE articles SET title = ? WHERE url = 'https://b/1'", (OTHER,))
+        self.run_clustering(START + timedelta(hours=5))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM article_clusters").fetchone()[0], 0)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM story_clusters").fetchone()[0], 0)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM story_coverage").fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from discovery_cache import FEED_TTL, NEGATIVE_TTL, DiscoveryCache
+
+
+class DiscoveryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'cache.sqlite'
+        self.cache = DiscoveryCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_entries_survive_reopening(self):
+        self.cache.store('https://a/feed', 'feed', 'application/rss+xml', etag='"v1"', body=b'<rss/>' * 100)
+        self.cache.close()
+        self.cache = DiscoveryCache(self.path)
+        entry = self.cache.lookup('https://a/feed')
+        self.assertEqual((entry.kind, entry.content_type, entry.body), ('feed', 'application/rss+xml', b'<rss/>' * 100))
+        self.assertIsNone(self.cache.lookup('https://a/other'))
+
+    def test_freshness_depends_on_the_verdict(self):
+        self.cache.store('https://a/feed', 'feed')
+        self.cache.store('https://a/page', 'html')
+        feed, page = self.cache.lookup('https://a/feed'), self.cache.lookup('https://a/page')
+        later = time.time() + NEGATIVE_TTL + 1
+        self.assertTrue(feed.is_fresh(now=later))
+        self.assertFalse(page.is_fresh(now=later))
+        self.assertFalse(feed.is_fresh(now=time.time() + FEED_TTL + 1))
+
+    def test_revalidation(self):
+        self.cache.store('https://a/feed', 'feed', etag='"v1"', last_modified='Fri, 10 Oct 2025 22:15:00 GMT')
+        entry = self.cache.lookup('https://a/feed')
+        self.assertEqual(entry.conditional_headers(),
+                         {'If-None-Match': '"v1"', 'If-Modified-Since': 'Fri, 10 Oct 2025 22:15:00 GMT'})
+
+        short = DiscoveryCache(self.path, feed_ttl=0)
+        self.assertFalse(short.is_fresh(entry))
+        short.close()
+        self.cache.touch('https://a/feed')
+        self.assertGreater(self.cache.lookup('https://a/feed').checked_at, entry.checked_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
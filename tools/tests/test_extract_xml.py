@@ -0,0 +1,103 @@
+import importlib
+import io
+import unittest
+from unittest import mock
+
+# The script's name has a hyphen, so it can't be imported with an import statement
+extract_xml = importlib.import_module('extract-xml')
+
+HEAD = (
+    b'<html><head><title>News</title>'
+    b'<link rel="alternate" type="application/rss+xml" title="Top" href="/rss/top.xml">'
+    b'</head><body>'
+)
+ANCHORS = b'<a href="/rss/world.xml">World</a><a href="/about">About</a>'
+FILLER = b'<p>' + b'x' * 1000 + b'</p>'
+
+
+def html_page(head_links=True):
+    head = HEAD if head_links else b'<html><head><title>News</title></head><body>'
+    parser = extract_xml.FeedLinkParser('https://example.com/')
+    extract_xml.stream_into_parser(io.BytesIO(head + ANCHORS + FILLER * 10 + b'</body></html>'), parser)
+    return extract_xml.FetchResult('https://example.com/', 'html', 'text/html', parser=parser, scanned_anchors=True)
+
+
+class StreamIntoParserTest(unittest.TestCase):
+    def test_stops_after_head_once_feeds_are_advertised(self):
+        body = HEAD + ANCHORS + FILLER * 1000
+        parser = extract_xml.FeedLinkParser('https://example.com/')
+        consumed = extract_xml.stream_into_parser(io.BytesIO(body), parser, scan_anchors=False)
+        self.assertEqual(parser.xml_links, [('Top', 'https://example.com/rss/top.xml')])
+        self.assertLess(len(consumed), len(body) // 10)
+
+    def test_reads_on_when_anchors_are_scanned(self):
+        body = HEAD + ANCHORS + FILLER * 100
+        parser = extract_xml.FeedLinkParser('https://example.com/')
+        consumed = extract_xml.stream_into_parser(io.BytesIO(body), parser, scan_anchors=True)
+        self.assertEqual(len(consumed), len(body))
+        self.assertIn('/rss/world.xml', parser.links)
+
+    def test_byte_cap(self):
+        body = b'<html><body>' + FILLER * 1000
+        parser = extract_xml.FeedLinkParser('https://example.com/')
+        consumed = extract_xml.stream_into_parser(io.BytesIO(body), parser, max_bytes=50_000)
+        self.assertEqual(len(consumed), 50_000)
+
+
+class ExtractXmlLinksTest(unittest.TestCase):
+    def extract(self, page, **options):
+        with mock.patch.object(extract_xml, 'fetch_url', return_value=page), \
+                mock.patch.object(extract_xml, 'verify_feeds', side_effect=lambda feeds, **_: feeds):
+            return extract_xml.extract_xml_links('https://example.com/', **options)
+
+    def test_head_feeds_only_by_default(self):
+        self.assertEqual(self.extract(html_page()), [('Top', 'https://example.com/rss/top.xml')])
+
+    def test_scan_anchors_on_request(self):
+        self.assertEqual(
+            self.extract(html_page(), scan_anchors=True),
+            [('Top', 'https://example.com/rss/top.xml'), ('Potential Feed', 'https://example.com/rss/world.xml')],
+        )
+
+    def test_falls_back_to_anchors_without_head_feeds(self):
+        self.assertEqual(
+            self.extract(html_page(head_links=False)),
+            [('Potential Feed', 'https://example.com/rss/world.xml')],
+        )
+
+
+
+class FetchCacheTest(unittest.TestCase):
+    def setUp(self):
+        extract_xml._fetch_cache.clear()
+        self.addCleanup(extract_xml._fetch_cache.clear)
+        self.network = mock.patch.object(extract_xml, '_fetch_from_network').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_failures_are_retried_after_their_ttl(self):
+        url = 'https://example.com/feed.xml'
+        self.network.side_effect = [
+            extract_xml.FetchResult(url, 'error', error='timed out'),
+            extract_xml.FetchResult(url, 'feed', 'application/rss+xml'),
+        ]
+        self.assertEqual(extract_xml.fetch_url(url).kind, 'error')
+        self.assertEqual(extract_xml.fetch_url(url).kind, 'error')
+        self.assertEqual(self.network.call_count, 1)
+
+        later = extract_xml.time.monotonic() + extract_xml.ERROR_CACHE_TTL + 1
+        with mock.patch.object(extract_xml.time, 'monotonic', return_value=later):
+            self.assertEqual(extract_xml.fetch_url(url).kind, 'feed')
+            self.assertEqual(extract_xml.fetch_url(url).kind, 'feed')
+        self.assertEqual(self.network.call_count, 2)
+
+    def test_least_recently_used_results_are_dropped(self):
+        self.network.side_effect = lambda url, *args: extract_xml.FetchResult(url, 'feed')
+        with mock.patch.object(extract_xml, 'FETCH_CACHE_SIZE', 2):
+            for url in ('https://a/feed', 'https://b/feed', 'https://a/feed', 'https://c/feed'):
+                extract_xml.fetch_url(url)
+        self.assertEqual(list(extract_xml._fetch_cache), ['https://a/feed', 'https://c/feed'])
+        self.assertEqual(self.network.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from xml.etree.ElementTree import ParseError
+
+from feed_parser import FeedParser, NotAFeedError, iter_feed_items, parse_feed_date
+from tests.support import ATOM, RDF, RSS
+
+
+def one_byte_at_a_time(data):
+    return (data[index:index + 1] for index in range(len(data)))
+
+
+class FeedFormatsTest(unittest.TestCase):
+    def test_rss_2(self):
+        first, second = iter_feed_items([RSS])
+        self.assertEqual(first, {
+            'title': 'Senate passes <b>budget</b> bill',
+            'link': 'https://example.com/news/budget',
+            'guid': 'budget-1',
+            'description': '<p>The <em>Senate</em> passed the budget late on Friday.</p>',
+            'published': 'Fri, 10 Oct 2025 22:15:00 GMT',
+            'author': 'Jane Doe',
+        })
+        self.assertEqual((second['guid'], second['author']), ('', ''))
+
+    def test_rss_1_with_dublin_core(self):
+        item, = iter_feed_items([RDF])
+        self.assertEqual(item, {
+            'title': 'RDF story',
+            'link': 'https://example.org/a',
+            'guid': '',
+            'description': 'From an RSS 1.0 feed.',
+            'published': '2025-10-10T12:30:00Z',
+            'author': 'John Roe',
+        })
+
+    def test_atom(self):
+        item, = iter_feed_items([ATOM])
+        self.assertEqual(item, {
+            'title': 'Atom &amp; more',
+            'link': 'https://example.net/atom-1',
+            'guid': 'tag:example.net,2025:1',
+            'description': 'An Atom entry.',
+            'published': '2025-10-11T07:00:00+02:00',
+            'author': 'Ann Smith',
+        })
+
+    def test_formats_are_detected_from_the_root(self):
+        for data, expected in ((RSS, 'rss'), (RDF, 'rdf'), (ATOM, 'atom')):
+            parser = FeedParser()
+            parser.feed(data)
+            self.assertEqual(parser.format, expected)
+
+
+class StreamingTest(unittest.TestCase):
+    def test_chunk_boundaries_do_not_matter(self):
+        for data in (RSS, RDF, ATOM):
+            self.assertEqual(list(iter_feed_items(one_byte_at_a_time(data))), list(iter_feed_items([data])))
+
+    def test_items_are_handed_out_as_they_complete(self):
+        parser = FeedParser()
+        end_of_first = RSS.index(b'</item>') + len(b'</item>')
+        items = parser.feed(RSS[:end_of_first])
+        self.assertEqual([item['guid'] for item in items], ['budget-1'])
+        self.assertEqual(len(parser.feed(RSS[end_of_first:])) + len(parser.close()), 1)
+
+    def test_other_documents_are_rejected_at_the_root(self):
+        with self.assertRaises(NotAFeedError):
+            FeedParser().feed(b'<html><head><title>Not a feed')
+
+    def test_malformed_xml(self):
+        with self.assertRaises(ParseError):
+            list(iter_feed_items([b'<rss><channel><item></channel>']))
+
+
+class ParseFeedDateTest(unittest.TestCase):
+    def test_rfc_822_and_iso_8601(self):
+        self.assertEqual(parse_feed_date('Fri, 10 Oct 2025 22:15:00 GMT'), datetime(2025, 10, 10, 22, 15, tzinfo=timezone.utc))
+        self.assertEqual(parse_feed_date(' 2025-10-10T12:30:00Z '), datetime(2025, 10, 10, 12, 30, tzinfo=timezone.utc))
+        self.assertEqual(parse_feed_date('2025-10-11T07:00:00+02:00').utcoffset(), timedelta(hours=2))
+
+    def test_naive_dates_are_utc(self):
+        self.assertEqual(parse_feed_date('2025-10-10T12:30:00').tzinfo, timezone.utc)
+
+    def test_unparseable(self):
+        self.assertIsNone(parse_feed_date('yesterday'))
+        self.assertIsNone(parse_feed_date(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import gzip
+import time
+import unittest
+import urllib.error
+import zlib
+
+from http_client import HttpClient
+from scheduler import HostScheduler
+from tests.support import RSS, FeedServer
+
+
+def encoded(body, encoding):
+    def route(handler):
+        handler.send_response(200)
+        handler.send_header('Content-Encoding', encoding)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+    return route
+
+
+def status(code, **headers):
+    def route(handler):
+        handler.send_response(code)
+        for name, value in headers.items():
+            handler.send_header(name.replace('_', '-'), value)
+        handler.send_header('Content-Length', '0')
+        handler.end_headers()
+    return route
+
+
+class HttpClientTest(unittest.TestCase):
+    def setUp(self):
+        self.http = HttpClient(timeout=5)
+
+    def tearDown(self):
+        self.http.close()
+
+    def test_bodies_are_decoded(self):
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        routes = {
+            '/gzip': encoded(gzip.compress(RSS), 'gzip'),
+            '/deflate': encoded(zlib.compress(RSS), 'deflate'),
+            '/raw-deflate': encoded(raw_deflate.compress(RSS) + raw_deflate.flush(), 'deflate'),
+            '/plain': RSS,
+        }
+        with FeedServer(routes) as server:
+            for path in routes:
+                with self.http.get(server.url(path)) as response:
+                    self.assertEqual(response.read(), RSS, path)
+
+    def test_partial_reads_and_chunks(self):
+        with FeedServer({'/gzip': encoded(gzip.compress(RSS), 'gzip')}) as server:
+            with self.http.get(server.url('/gzip')) as response:
+                self.assertEqual(response.read(10), RSS[:10])
+                chunks = list(response.iter_chunks(100))
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(b''.join(chunks), RSS[10:])
+
+    def test_redirects_are_followed(self):
+        routes = {}
+        with FeedServer(routes) as server:
+            routes.update({
+                '/old': status(301, Location='/moved'),
+                '/moved': status(303, Location=server.url('/feed.xml')),
+                '/feed.xml': RSS,
+                '/loop': status(302, Location='/loop'),
+            })
+            with self.http.get(server.url('/old')) as response:
+                self.assertEqual(response.read(), RSS)
+            with self.assertRaises(urllib.error.URLError):
+                self.http.get(server.url('/loop'))
+
+    def test_error_statuses_raise(self):
+        with FeedServer({}) as server:
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                self.http.get(server.url('/missing'))
+        self.assertEqual(raised.exception.code, 404)
+        with self.assertRaises(urllib.error.URLError):
+            self.http.get('ftp://example.com/feed')
+
+    def test_rate_limited_hosts_are_backed_off(self):
+        scheduler = HostScheduler(rate=0)
+        http = HttpClient(timeout=5, scheduler=scheduler)
+        try:
+            with FeedServer({'/feed.xml': status(429, Retry_After='30')}) as server:
+                with self.assertRaises(urllib.error.HTTPError):
+                    http.get(server.url('/feed.xml'))
+        finally:
+            http.close()
+        self.assertAlmostEqual(scheduler._hosts['127.0.0.1'].blocked_until - time.monotonic(), 30, delta=2)
+        self.assertEqual(scheduler.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,283 @@
+import email.utils
+import json
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from http_client import HttpClient
+from ingest_feeds import (
+    ORDER_CONFIDENCE, ORDER_MARGIN, RECHECK_EVERY, AppArticleWriter, FeedOrderStore, JsonlArticleWriter, OrderCheck,
+    SqliteArticleWriter, ingest_feed, main,
+)
+from instrumentation import Tracer, set_tracer
+from tests.support import RSS, FeedServer, run_main, write_source
+
+CUTOFF = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+# The columns of the web app's tables that the ingest tool uses
+APP_SCHEMA = """
+CREATE TABLE news_sources (id INTEGER PRIMARY KEY, slug TEXT NOT NULL UNIQUE);
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY, news_source_id INTEGER NOT NULL REFERENCES news_sources (id), title TEXT NOT NULL,
+    summary TEXT, url TEXT NOT NULL UNIQUE, author TEXT, published_at TEXT NOT NULL, keywords TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1, created_at TEXT, updated_at TEXT
+);
+"""
+
+
+class IngestFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.http = HttpClient(timeout=5)
+
+    def tearDown(self):
+        self.http.close()
+        self.tmp.cleanup()
+
+    def test_articles(self):
+        with FeedServer({'/feed.xml': RSS}) as server:
+            feed = {'source': 'example', 'url': server.url('/feed.xml'), 'category': 'politics'}
+            result = ingest_feed(self.http, feed, CUTOFF)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.items, 2)
+        article = result.articles[0]
+        self.assertEqual(article['url'], 'https://example.com/news/budget')
+        self.assertEqual(article['title'], 'Senate passes budget bill')
+        self.assertEqual(article['published_at'], '2025-10-10T22:15:00+00:00')
+        self.assertEqual((article['source'], article['category']), ('example', 'politics'))
+
+    def test_trace_subject_is_the_feed_url(self):
+        trace_path = Path(self.tmp.name) / 'trace.jsonl'
+        tracer = Tracer(str(trace_path))
+        set_tracer(tracer)
+        try:
+            with FeedServer({'/feed.xml': RSS}) as server:
+                feed = {'source': 'example', 'url': server.url('/feed.xml'), 'category': 'politics'}
+                ingest_feed(self.http, feed, CUTOFF)
+        finally:
+            set_tracer(None)
+            tracer.close()
+        stages = [json.loads(line) for line in trace_path.read_text().splitlines()]
+        stage, = [record for record in stages if record.get('stage') == 'ingest_feed']
+        self.assertEqual(stage['subject'], feed['url'])
+
+
+def hourly_feed(hours):
+    """An RSS feed with one item per entry of `hours`, published that many hours before CUTOFF."""
+    items = ''.join(
+        f"<item><title>Story {hours_back}</title><link>https://example.com/{hours_back}</link>"
+        f"<pubDate>{email.utils.format_datetime(CUTOFF - timedelta(hours=hours_back))}</pubDate></item>"
+        for hours_back in hours
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+class OrderCheckTest(unittest.TestCase):
+    def check(self, hours):
+        order = OrderCheck(CUTOFF)
+        for hours_back in hours:
+            order.add(None if hours_back is None else CUTOFF - timedelta(hours=hours_back))
+        return order
+
+    def test_newest_first_feeds_are_ordered(self):
+        order = self.check([-2, -1, 1, 3])
+        self.assertTrue(order.ordered)
+        self.assertFalse(order.past_cutoff)
+        self.assertTrue(self.check([-2, 1, 3, ORDER_MARGIN.total_seconds() / 3600 + 1]).past_cutoff)
+
+    def test_small_reorderings_are_tolerated(self):
+        self.assertTrue(self.check([0, 2, 1, 5]).ordered)
+        self.assertFalse(self.check([0, 20, 1]).ordered)
+
+    def test_too_few_or_undated_items(self):
+        self.assertIsNone(self.check([0, 1]).ordered)
+        order = self.check([0, None, 1, 2, 100])
+        self.assertFalse(order.ordered)
+        self.assertFalse(order.past_cutoff)
+
+
+class FeedOrderStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = FeedOrderStore(Path(self.tmp.name) / 'state.sqlite')
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_trust_takes_ordered_full_scans_and_is_rechecked(self):
+        url = 'https://example.com/feed.xml'
+        for _ in range(ORDER_CONFIDENCE - 1):
+            self.store.record(url, True)
+        self.store.record(url, None)
+        self.assertFalse(self.store.can_stop_early(url))
+        self.store.record(url, True)
+        self.assertTrue(self.store.can_stop_early(url))
+
+        for _ in range(RECHECK_EVERY):
+            self.store.record(url, True, stopped_early=True)
+        self.assertFalse(self.store.can_stop_early(url))
+        self.store.record(url, True)
+        self.assertTrue(self.store.can_stop_early(url))
+
+        self.store.record(url, False)
+        self.assertFalse(self.store.can_stop_early(url))
+
+
+class EarlyStopTest(unittest.TestCase):
+    def setUp(self):
+        self.http = HttpClient(timeout=5)
+
+    def tearDown(self):
+        self.http.close()
+
+    def test_ordered_feeds_stop_past_the_cutoff(self):
+        hours = [-3, -2, -1, 1, 2, 4, 8, 12, 24, 48]
+        with FeedServer({'/feed.xml': hourly_feed(hours)}) as server:
+            feed = {'source': 'example', 'url': server.url('/feed.xml'), 'category': 'politics'}
+            full = ingest_feed(self.http, feed, CUTOFF)
+            stopped = ingest_feed(self.http, feed, CUTOFF, early_stop='read')
+        self.assertEqual((full.items, full.stopped_early, full.ordered), (10, False, True))
+        self.assertTrue(stopped.stopped_early)
+        self.assertLess(stopped.items, full.items)
+        self.assertEqual([a['url'] for a in stopped.articles], [a['url'] for a in full.articles])
+
+    def test_unordered_feeds_are_read_to_the_end(self):
+        with FeedServer({'/feed.xml': hourly_feed([-1, 2, -5, 48, -2])}) as server:
+            feed = {'source': 'example', 'url': server.url('/feed.xml'), 'category': 'politics'}
+            result = ingest_feed(self.http, feed, CUTOFF, early_stop='read')
+        self.assertFalse(result.stopped_early)
+        self.assertFalse(result.ordered)
+        self.assertEqual(len(result.articles), 3)
+
+
+def article(url, title='Senate passes budget bill', source='example'):
+    return {
+        'url': url, 'source': source, 'feed_url': 'https://example.com/feed.xml', 'category': 'politics',
+        'title': title, 'summary': 'The Senate passed the budget.', 'author': 'Jane Doe', 'guid': None,
+        'published_at': '2025-10-10T22:15:00+00:00', 'keywords': ['senate', 'budget'],
+    }
+
+
+class WriterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def count(self, path, table='articles'):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_sqlite_batches_count_each_article(self):
+        writer = SqliteArticleWriter(self.dir / 'articles.sqlite', batch_size=3)
+        stored = []
+        writer.write([article(f'https://example.com/{n}') for n in range(5)], on_written=stored.append)
+        writer.write([article('https://example.com/0', title='Senate passes amended budget')])
+        writer.close()
+        self.assertEqual(writer.written, 6)
+        self.assertEqual(stored, [{f'https://example.com/{n}' for n in range(5)}])
+        self.assertEqual(self.count(self.dir / 'articles.sqlite'), 5)
+        self.assertEqual(self.count(self.dir / 'articles.sqlite', 'article_search'), 5)
+
+    def test_app_writer_reports_only_stored_articles(self):
+        path = self.dir / 'app.sqlite'
+        conn = sqlite3.connect(path)
+        conn.executescript(APP_SCHEMA + "INSERT INTO news_sources (slug) VALUES ('example');")
+        conn.close()
+        writer = AppArticleWriter(path)
+        stored = []
+        writer.write([article('https://example.com/1'), article('https://unknown.com/1', source='unknown')],
+                     on_written=stored.append)
+        writer.close()
+        self.assertEqual((writer.written, writer.skipped), (1, 1))
+        self.assertEqual(stored, [{'https://example.com/1'}])
+        self.assertEqual(self.count(path), 1)
+
+    def test_jsonl_writes_each_url_once(self):
+        writer = JsonlArticleWriter(self.dir / 'articles.jsonl')
+        stored = []
+        writer.write([article('https://example.com/1'), article('https://example.com/2')], on_written=stored.append)
+        writer.write([article('https://example.com/1')])
+        writer.close()
+        self.assertEqual(writer.written, 2)
+        self.assertEqual(stored, [{'https://example.com/1', 'https://example.com/2'}])
+        self.assertEqual(len((self.dir / 'articles.jsonl').read_text().splitlines()), 2)
+
+
+class IngestRunTest(unittest.TestCase):
+    """Whole runs of the command line tool against a local feed."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / 'sources').mkdir()
+        self.server = FeedServer({'/feed.xml': RSS}).__enter__()
+        write_source(self.dir / 'sources', 'example', [self.server.url('/feed.xml')])
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def ingest(self, *args):
+        return run_main(
+            main, '--sources-dir', self.dir / 'sources', '--catalog', self.dir / 'catalog.sqlite',
+            '--state', self.dir / 'state.sqlite', '--hours', 100_000, *args,
+        )
+
+    def lines(self, name):
+        return (self.dir / name).read_text().splitlines()
+
+    def test_jsonl_runs_replace_the_file_with_every_article(self):
+        self.ingest('-o', self.dir / 'articles.jsonl')
+        self.ingest('-o', self.dir / 'articles.jsonl')
+        self.assertEqual(len(self.lines('articles.jsonl')), 2)
+
+    def test_appending_jsonl_runs_only_add_new_articles(self):
+        self.ingest('--append', '-o', self.dir / 'articles.jsonl')
+        output = self.ingest('--append', '-o', self.dir / 'articles.jsonl')
+        self.assertIn('2 unchanged skipped', output)
+        self.assertEqual(len(self.lines('articles.jsonl')), 2)
+
+    def test_sqlite_runs_count_articles_not_index_writes(self):
+        output = self.ingest('--format', 'sqlite', '-o', self.dir / 'articles.sqlite')
+        self.assertIn('Wrote 2 articles', output)
+        conn = sqlite3.connect(self.dir / 'articles.sqlite')
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM article_search").fetchone()[0], 2)
+        finally:
+            conn.close()
+
+    def test_switching_outputs_writes_every_article_again(self):
+        self.ingest('--format', 'sqlite', '-o', self.dir / 'articles.sqlite')
+        output = self.ingest('--format', 'sqlite', '-o', self.dir / 'other.sqlite')
+        self.assertIn('Wrote 2 articles', output)
+        self.ingest('--append', '-o', self.dir / 'articles.jsonl')
+        self.assertEqual(len(self.lines('articles.jsonl')), 2)
+        self.assertIn('2 unchanged skipped', self.ingest('--format', 'sqlite', '-o', self.dir / 'articles.sqlite'))
+
+    def test_articles_of_unknown_sources_are_ingested_once_seeded(self):
+        conn = sqlite3.connect(self.dir / 'app.sqlite')
+        try:
+            conn.executescript(APP_SCHEMA)
+            self.ingest('--format', 'database', '-o', self.dir / 'app.sqlite')
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0], 0)
+
+            with conn:
+                conn.execute("INSERT INTO news_sources (slug) VALUES ('example')")
+            output = self.ingest('--format', 'database', '-o', self.dir / 'app.sqlite')
+            self.assertIn('Wrote 2 articles', output)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0], 2)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from instrumentation import NullTracer, Tracer, get_tracer, percentile, set_tracer, traced
+
+
+class PercentileTest(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual([percentile(values, pct) for pct in (0, 20, 50, 95, 100)], [1, 1, 3, 5, 5])
+        self.assertIsNone(percentile([], 50))
+
+
+class TracerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'trace.jsonl'
+        self.tracer = Tracer(str(self.path))
+
+    def tearDown(self):
+        self.tracer.close()
+        self.tmp.cleanup()
+
+    def records(self):
+        self.tracer.close()
+        return [json.loads(line) for line in self.path.read_text().splitlines()]
+
+    def test_requests_are_summarized_per_host(self):
+        for total in (0.1, 0.2, 0.3, 0.4):
+            self.tracer.request('https://Example.com/feed', status=200, total=total, ttfb=total / 2, wire_bytes=100)
+        self.tracer.request('https://example.com/missing', status=404, total=0.05)
+        self.tracer.request('https://other.org/feed', error='timed out')
+
+        hosts = self.tracer.summary()['hosts']
+        self.assertEqual(set(hosts), {'example.com', 'other.org'})
+        self.assertEqual((hosts['example.com']['requests'], hosts['example.com']['errors']), (5, 1))
+        self.assertEqual((hosts['example.com']['bytes'], hosts['example.com']['p50']), (400, 0.2))
+        self.assertEqual((hosts['other.org']['errors'], hosts['other.org']['p50']), (1, None))
+        self.assertEqual([record['host'] for record in self.records()], ['example.com'] * 5 + ['other.org'])
+
+    def test_stages_record_wall_time_and_errors(self):
+        with self.tracer.stage('parse', subject='a'):
+            pass
+        with self.assertRaises(ValueError):
+            with self.tracer.stage('parse', subject='b'):
+                raise ValueError('bad feed')
+
+        self.assertEqual(self.tracer.summary()['stages']['parse']['count'], 2)
+        self.tracer.print_summary(file=io.StringIO())
+        first, second, summary = self.records()
+        self.assertEqual((first['stage'], first['subject'], 'error' in first), ('parse', 'a', False))
+        self.assertEqual(second['error'], "ValueError('bad feed')")
+        self.assertEqual(summary['type'], 'summary')
+
+
+class TracedTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'trace.jsonl'
+        self.tracer = Tracer(str(self.path))
+        set_tracer(self.tracer)
+        self.addCleanup(set_tracer, None)
+        self.addCleanup(self.tracer.close)
+
+    def test_stages_are_tagged_with_the_subject(self):
+        @traced('fetch')
+        def fetch(url, timeout=10):
+            return url
+
+        @traced('ingest', subject=lambda feed, cutoff: feed['url'])
+        def ingest(feed, cutoff):
+            return cutoff
+
+        self.assertEqual(fetch('https://a/feed'), 'https://a/feed')
+        self.assertEqual(ingest({'url': 'https://b/feed'}, 3), 3)
+        self.tracer.close()
+        records = [json.loads(line) for line in self.path.read_text().splitlines()]
+        self.assertEqual([(record['stage'], record['subject']) for record in records],
+                         [('fetch', 'https://a/feed'), ('ingest', 'https://b/feed')])
+
+    def test_tracing_is_off_by_default(self):
+        set_tracer(None)
+        self.assertIsInstance(get_tracer(), NullTracer)
+        self.assertFalse(get_tracer().enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import math
+import random
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import keywords
+from ingest_feeds import ARTICLES_SCHEMA
+from keywords import Batch, KeywordExtractor, main, tokenize
+from tests.support import run_main
+
+
+def article(url, title, summary=''):
+    return {'url': url, 'title': title, 'summary': summary}
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_long_words_without_stop_words(self):
+        self.assertEqual(tokenize("The Senate's budget: 2025 vote, well-known, would have been"),
+                         ["senate's", 'budget', 'vote', 'well-known'])
+
+
+class BatchTest(unittest.TestCase):
+    def test_words_match_tokenize(self):
+        texts = [
+            "The Senate's well-known 'budget' -- rock-'n'-roll --vote-- O'Neill's 2025_plans",
+            "Café society in ZÜRICH: it’s a pre- and post-war “boom”",
+            "",
+        ]
+        batch = Batch([{'title': title, 'summary': summary} for title, summary in zip(texts, reversed(texts))])
+        for index, (title, summary) in enumerate(zip(texts, reversed(texts))):
+            self.assertEqual([batch.vocabulary[term] for term in batch.document(index)], tokenize(title) + tokenize(summary))
+            self.assertEqual(batch.title_lengths[index], len(tokenize(title)))
+        self.assertEqual(len(set(batch.vocabulary)), len(batch.vocabulary))
+
+
+@unittest.skipIf(keywords.np is None, "NumPy is not installed")
+class NumpyScorerTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        words = ['senate', 'budget', 'storm', 'wildfire', 'election', 'court', 'ruling', 'market', 'rally', 'vote']
+        self.batch = Batch([
+            {'title': ' '.join(rng.choices(words, k=rng.randint(0, 4))),
+             'summary': ' '.join(rng.choices(words, k=rng.randint(0, 30)))}
+            for _ in range(300)
+        ])
+        # Few distinct values, so many scores tie
+        self.idf = [rng.choice([1.0, 2.0, math.log(3)]) for _ in self.batch.vocabulary]
+
+    def test_matches_the_python_scorer(self):
+        for top in (1, 3, 10):
+            self.assertEqual(keywords._top_terms_numpy(self.batch, self.idf, top),
+                             keywords._top_terms_python(self.batch, self.idf, top))
+
+    def test_matrix_slices(self):
+        expected = keywords._top_terms_python(self.batch, self.idf, 5)
+        with mock.patch('keywords.MATRIX_CELLS', 40):
+            self.assertEqual(keywords._top_terms_numpy(self.batch, self.idf, 5), expected)
+        self.assertEqual(list(keywords._row_slices(keywords.np.array([3, 3, 50, 3, 0]), 10)),
+                         [(0, 2, 3), (2, 3, 50), (3, 5, 3)])
+
+    def test_empty_batches(self):
+        batch = Batch([{'title': 'the', 'summary': None}])
+        self.assertEqual(keywords._top_terms_numpy(batch, [], 10), [[]])
+
+
+class KeywordExtractorTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.extractor = KeywordExtractor(self.conn)
+
+    def frequencies(self):
+        docs = self.conn.execute("SELECT SUM(docs) FROM keyword_docs").fetchone()[0]
+        return docs, dict(self.conn.execute("SELECT term, SUM(df) FROM keyword_df GROUP BY term"))
+
+    def test_rare_words_rank_first(self):
+        self.extractor.extract([article(f'https://x/{n}', "Senate budget news") for n in range(5)])
+        keywords, = self.extractor.extract([article('https://x/new', "Senate wildfire news")])
+        self.assertEqual(keywords[0], 'wildfire')
+
+    def test_title_words_outweigh_summary_words(self):
+        keywords, = self.extractor.extract([article('https://x/1', "Flooding", "Rainfall continues")])
+        self.assertEqual(keywords, ['flooding', 'rainfall', 'continues'])
+
+    def test_edited_articles_count_once(self):
+        self.extractor.extract([article('https://x/1', "Senate budget")])
+        self.extractor.extract([article('https://x/1', "Senate budget vote"), article('https://x/1', "Senate budget")])
+        docs, frequencies = self.frequencies()
+        self.assertEqual(docs, 1)
+        self.assertEqual(frequencies, {'senate': 1, 'budget': 1})
+
+
+class KeywordRunTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'articles.sqlite'
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(ARTICLES_SCHEMA)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def add(self, url, title, fetched_at):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO articles (url, source, feed_url, category, title, summary, author, published_at, keywords, "
+                "fetched_at) VALUES (?, 'npr', 'f', 'politics', ?, '', 'a', '2025-10-10T00:00:00+00:00', '[]', ?) "
+                "ON CONFLICT (url) DO UPDATE SET title = excluded.title, fetched_at = excluded.fetched_at",
+                (url, title, fetched_at),
+            )
+
+    def score(self, *args):
+        return run_main(main, '--articles', self.path, *args)
+
+    def test_runs_score_only_articles_fetched_since(self):
+        self.add('https://x/1', "Senate budget", 100.0)
+        self.add('https://x/2', "Storm warning", 101.0)
+        self.assertIn('Scored 2 articles', self.score())
+        self.assertIn('Scored 0 articles', self.score())
+
+        # An edit is fetched again: scored again, but still counted once
+        self.add('https://x/1', "Senate budget vote", 102.0)
+        self.assertIn('Scored 1 articles', self.score())
+        self.assertIn('Scored 2 articles', self.score('--all'))
+        self.assertEqual(self.conn.execute("SELECT SUM(docs) FROM keyword_docs").fetchone()[0], 2)
+        self.assertEqual(self.conn.execute("SELECT value FROM keyword_state").fetchone()[0], 102.0)
+        keywords = self.conn.execute("SELECT keywords FROM articles WHERE url = 'https://x/1'").fetchone()[0]
+        self.assertIn('vote', keywords)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from normalize import clean_description, clean_title, content_words, extract_keywords, str_limit, str_word_count
+
+
+class CleanTitleTest(unittest.TestCase):
+    """Expected values are what NewsAggregatorService::cleanTitle() returns."""
+
+    def test_tags_entities_and_whitespace(self):
+        self.assertEqual(clean_title("  <b>Senate</b>\n passes\tthe &quot;big&quot; bill &hellip; "),
+                         'Senate passes the "big" bill …')
+
+    def test_html5_and_numeric_entities(self):
+        self.assertEqual(clean_title("Rock &apos;n&#39; roll &#x2014; &rarr; live"), "Rock 'n' roll — → live")
+
+    def test_entities_need_a_semicolon(self):
+        self.assertEqual(clean_title("AT&amp;T &amp more"), "AT&T &amp more")
+
+    def test_non_breaking_spaces_are_kept(self):
+        # PCRE's \s without /u does not match U+00A0
+        self.assertEqual(clean_title("Senate&nbsp;passes"), "Senate passes")
+
+    def test_strip_tags_edge_cases(self):
+        self.assertEqual(clean_title("a < b and <!-- note --> c"), "a < b and c")
+        self.assertEqual(clean_title("Hello <b unclosed"), "Hello")
+        self.assertEqual(clean_title(None), "")
+
+
+class CleanDescriptionTest(unittest.TestCase):
+    """Expected values are what NewsAggregatorService::cleanDescription() returns."""
+
+    def test_short_descriptions_are_kept(self):
+        self.assertEqual(clean_description("<p>The <em>Senate</em> passed it.</p>"), "The Senate passed it.")
+
+    def test_long_descriptions_are_cut_at_300_columns(self):
+        self.assertEqual(clean_description('a' * 300), 'a' * 300)
+        self.assertEqual(clean_description('a' * 301), 'a' * 300 + '...')
+
+    def test_cut_is_right_trimmed(self):
+        self.assertEqual(clean_description('abcd ' * 61), ('abcd ' * 60).rstrip() + '...')
+
+    def test_wide_characters_count_twice(self):
+        self.assertEqual(str_limit('世' * 150), '世' * 150)
+        self.assertEqual(str_limit('世' * 151), '世' * 150 + '...')
+        self.assertEqual(str_limit('a' + '世' * 150), 'a' + '世' * 149 + '...')
+
+
+class ExtractKeywordsTest(unittest.TestCase):
+    """Expected values are what NewsAggregatorService::extractKeywords() returns."""
+
+    def test_first_distinct_long_words_without_stop_words(self):
+        self.assertEqual(
+            extract_keywords("The Senate passes the Senate budget; budget-writers cheer 2025 results, would they?"),
+            ['senate', 'passes', 'budget', 'budget-writers', 'cheer', 'results', 'they'],
+        )
+
+    def test_only_ascii_letters_make_words(self):
+        self.assertEqual(extract_keywords("Café society in ZÜRICH"), ['society', 'rich'])
+
+    def test_at_most_ten(self):
+        self.assertEqual(extract_keywords(' '.join(f"long{letter}" for letter in 'abcdefghijkl')),
+                         [f"long{letter}" for letter in 'abcdefghij'])
+
+    def test_str_word_count_ends(self):
+        self.assertEqual(str_word_count("-leading and 'quoted' trailing-"), ['leading', 'and', "'quoted'", 'trailing'])
+        self.assertEqual(str_word_count("'tis"), ['tis'])
+
+
+class ContentWordsTest(unittest.TestCase):
+    def test_no_stop_words_numbers_or_short_words(self):
+        self.assertEqual(content_words("The Senate passed 2025 budget on a vote"), {'senate', 'passed', 'budget', 'vote'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from http_client import HttpClient
+from robots import RobotsCache
+from tests.support import FeedServer
+
+ROBOTS = b"""User-agent: *
+Disallow: /private/
+Crawl-delay: 2
+
+User-agent: BalanceNews
+Disallow: /drafts/
+Crawl-delay: 1
+
+Sitemap: https://example.com/sitemap.xml
+Sitemap: https://example.com/news-sitemap.xml
+"""
+
+
+def forbidden(handler):
+    handler.send_error(403)
+
+
+class RobotsCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.http = HttpClient(timeout=5)
+
+    def tearDown(self):
+        self.http.close()
+
+    def test_rules_for_our_user_agent(self):
+        with FeedServer({'/robots.txt': ROBOTS}) as server:
+            robots = RobotsCache(self.http)
+            self.assertFalse(robots.can_fetch(server.url('/drafts/story')))
+            self.assertTrue(robots.can_fetch(server.url('/private/feed.xml')))
+            self.assertEqual(robots.crawl_delay(server.url('/')), 1.0)
+            self.assertEqual(robots.sitemaps(server.url('/')),
+                             ['https://example.com/sitemap.xml', 'https://example.com/news-sitemap.xml'])
+        self.assertEqual(server.requests, ['/robots.txt'])
+
+    def test_missing_robots_allows_everything(self):
+        with FeedServer({}) as server:
+            robots = RobotsCache(self.http)
+            self.assertTrue(robots.can_fetch(server.url('/anything')))
+            self.assertEqual(robots.crawl_delay(server.url('/')), 0.0)
+            self.assertEqual(robots.sitemaps(server.url('/')), [])
+
+    def test_forbidden_robots_disallows_everything(self):
+        with FeedServer({'/robots.txt': forbidden}) as server:
+            self.assertFalse(RobotsCache(self.http).can_fetch(server.url('/feed.xml')))
+
+    def test_origins_are_case_insensitive(self):
+        self.assertEqual(RobotsCache.origin('HTTPS://Example.COM/a?b'), 'https://example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
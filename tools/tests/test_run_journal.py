@@ -0,0 +1,52 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from run_journal import RunJournal
+
+
+class RunJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'run.journal.jsonl'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resume_replays_finished_stages(self):
+        journal = RunJournal(self.path)
+        journal.record('https://a', 'extract', feeds=['https://a/feed'])
+        journal.record('https://a', 'update', added=['https://a/feed'])
+        journal.record('https://b', 'extract', feeds=[])
+        journal.record('https://b', 'update', status='failed', error='disk full')
+        journal.close()
+        # An interrupted write leaves a truncated last line
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"url": "https://c", "sta')
+
+        journal = RunJournal(self.path, resume=True)
+        self.assertTrue(journal.is_complete('https://a'))
+        self.assertFalse(journal.is_complete('https://b'))
+        self.assertEqual(journal.completed('https://b', 'extract')['feeds'], [])
+        self.assertIsNone(journal.completed('https://c', 'extract'))
+        journal.close()
+
+    def test_later_failures_undo_a_stage(self):
+        journal = RunJournal(self.path)
+        journal.record('https://a', 'extract', feeds=['https://a/feed'])
+        journal.record('https://a', 'extract', status='failed', error='timed out')
+        self.assertIsNone(journal.completed('https://a', 'extract'))
+        journal.close()
+
+    def test_fresh_runs_start_over(self):
+        journal = RunJournal(self.path)
+        journal.record('https://a', 'update')
+        journal.close()
+        journal = RunJournal(self.path)
+        self.assertFalse(journal.is_complete('https://a'))
+        journal.close()
+        self.assertEqual(self.path.read_text(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
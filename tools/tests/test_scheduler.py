@@ -0,0 +1,126 @@
+import email.utils
+import threading
+import time
+import unittest
+
+from scheduler import DEFAULT_BACKOFF, HostScheduler, SlotTimeout, host_key, parse_retry_after
+
+
+def acquire_in_turn(scheduler, urls, granted):
+    """Queue one thread per URL, in order; each records its URL and releases its slot once granted."""
+    def run(url):
+        slot = scheduler.acquire(url)
+        granted.append(url)
+        scheduler.release(slot)
+
+    threads = []
+    for url in urls:
+        threads.append(threading.Thread(target=run, args=(url,)))
+        threads[-1].start()
+        time.sleep(0.02)
+    return threads
+
+
+class HostSchedulerTest(unittest.TestCase):
+    def timed(self, scheduler, urls):
+        started = time.monotonic()
+        for url in urls:
+            scheduler.release(scheduler.acquire(url))
+        return time.monotonic() - started
+
+    def test_per_host_and_overall_caps(self):
+        scheduler = HostScheduler(rate=0, per_host=2, max_in_flight=3)
+        slots = [scheduler.acquire(url) for url in ('https://a.com/1', 'https://a.com/2', 'https://b.com/1')]
+        granted = []
+        threads = acquire_in_turn(scheduler, ['https://a.com/3', 'https://c.com/1'], granted)
+        self.assertEqual(granted, [])
+
+        # A free slot overall goes to the other host, not the one at its cap
+        scheduler.release(slots.pop())
+        time.sleep(0.05)
+        self.assertEqual(granted, ['https://c.com/1'])
+        scheduler.release(slots.pop())
+        for thread in threads:
+            thread.join(1)
+        self.assertEqual(granted, ['https://c.com/1', 'https://a.com/3'])
+
+    def test_waiting_hosts_take_turns(self):
+        scheduler = HostScheduler(rate=0, per_host=1, max_in_flight=1)
+        slot = scheduler.acquire('https://a.com/0')
+        granted = []
+        urls = ['https://a.com/1', 'https://a.com/2', 'https://a.com/3', 'https://b.com/1']
+        threads = acquire_in_turn(scheduler, urls, granted)
+        scheduler.release(slot)
+        for thread in threads:
+            thread.join(1)
+        self.assertEqual(granted, ['https://a.com/1', 'https://b.com/1', 'https://a.com/2', 'https://a.com/3'])
+        self.assertEqual(scheduler.in_flight, 0)
+
+    def test_rate_applies_after_the_burst(self):
+        scheduler = HostScheduler(rate=20, burst=2, per_host=10)
+        self.assertLess(self.timed(scheduler, ['https://a.com/1', 'https://a.com/2']), 0.04)
+        self.assertGreater(self.timed(scheduler, ['https://a.com/3', 'https://a.com/4']), 0.08)
+        # Other hosts have their own bucket
+        self.assertLess(self.timed(scheduler, ['https://b.com/1', 'https://b.com/2']), 0.04)
+
+    def test_backoff_holds_the_host(self):
+        scheduler = HostScheduler(rate=0)
+        scheduler.backoff('https://a.com/feed', 0.15)
+        self.assertGreater(self.timed(scheduler, ['https://a.com/other']), 0.12)
+        self.assertLess(self.timed(scheduler, ['https://b.com/feed']), 0.04)
+
+    def test_crawl_delay_is_looked_up_once_per_host(self):
+        lookups = []
+        scheduler = HostScheduler(rate=0, crawl_delay=lambda url: lookups.append(url) or 0.1)
+        elapsed = self.timed(scheduler, ['https://a.com/robots.txt', 'https://a.com/1', 'https://a.com/2', 'https://a.com/3'])
+        self.assertEqual(lookups, ['https://a.com/1'])
+        self.assertGreater(elapsed, 0.18)
+
+
+class HelpersTest(unittest.TestCase):
+    def test_host_key(self):
+        self.assertEqual(host_key('https://Feeds.Example.com:8443/rss'), 'feeds.example.com')
+        self.assertEqual(host_key('not a url'), '')
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after(' 7 '), 7.0)
+        self.assertEqual(parse_retry_after(None), DEFAULT_BACKOFF)
+        self.assertEqual(parse_retry_after('soon'), DEFAULT_BACKOFF)
+        self.assertEqual(parse_retry_after(email.utils.formatdate(time.time() - 60, usegmt=True)), 0.0)
+        self.assertAlmostEqual(parse_retry_after(email.utils.formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+
+
+class DeadlineTest(unittest.TestCase):
+    def test_waiting_request_gives_up_at_the_deadline(self):
+        scheduler = HostScheduler(rate=0, per_host=1)
+        slot = scheduler.acquire('https://example.com/a')
+        scheduler.deadline = time.monotonic() + 0.2
+        started = time.monotonic()
+        with self.assertRaises(SlotTimeout):
+            scheduler.acquire('https://example.com/b')
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        # The abandoned request left nothing behind; the host still works
+        scheduler.release(slot)
+        scheduler.deadline = None
+        scheduler.release(scheduler.acquire('https://example.com/c'))
+        self.assertEqual(scheduler.in_flight, 0)
+
+    def test_other_waiters_are_unaffected(self):
+        scheduler = HostScheduler(rate=0, per_host=1)
+        slot = scheduler.acquire('https://example.com/a')
+        granted = []
+        waiter = threading.Thread(target=lambda: granted.append(scheduler.acquire('https://example.com/b')))
+        waiter.start()
+        time.sleep(0.05)
+        scheduler.deadline = time.monotonic() + 0.1
+        with self.assertRaises(SlotTimeout):
+            scheduler.acquire('https://example.com/c')
+        scheduler.deadline = None
+        scheduler.release(slot)
+        waiter.join(1)
+        self.assertEqual(granted, ['example.com'])
+
+
+if __name__ == '__main__':
+    unittest.main()
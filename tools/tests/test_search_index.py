@@ -0,0 +1,89 @@
+import sqlite3
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from ingest_feeds import ARTICLES_SCHEMA
+import search_index
+from search_index import ensure_search_index, filter_token, match_expression, search, sync_bias_labels
+
+
+class MatchExpressionTest(unittest.TestCase):
+    def test_words_phrases_and_filters(self):
+        self.assertEqual(
+            match_expression('climate "border wall"', biases=['lean-left', 'left'], categories=['politics']),
+            '{title summary keywords} : ("climate" "border wall") AND bias : ("leanleft" OR "left") '
+            'AND category : ("politics")',
+        )
+
+    def test_user_input_is_always_quoted(self):
+        self.assertEqual(match_expression('NEAR(a b) OR "x'), '{title summary keywords} : ("NEAR(a" "b)" "OR" """x")')
+        self.assertEqual(match_expression('say "" hi'), '{title summary keywords} : ("say" "hi")')
+
+    def test_nothing_to_match(self):
+        self.assertIsNone(match_expression('  - ... '))
+        self.assertEqual(match_expression('', sources=['fox']), 'source : ("fox")')
+
+    def test_filter_tokens(self):
+        self.assertEqual(filter_token('Lean-Left'), 'leanleft')
+        self.assertEqual(filter_token('new_york.times com'), 'newyorktimescom')
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.executescript(ARTICLES_SCHEMA)
+        self.add('https://npr/1', 'npr', 'Senate passes climate bill', 'A long debate.', 1)
+        self.add('https://fox/1', 'fox', 'Border talks stall', 'The climate in Congress is tense.', 2)
+        self.add('https://fox/2', 'fox', 'Markets rally', 'Stocks rose.', 3, category='business')
+        ensure_search_index(self.conn, {'npr': 'lean-left', 'fox': 'right'})
+
+    def add(self, url, source, title, summary, day, category='politics'):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO articles (url, source, feed_url, category, title, summary, author, published_at, keywords, "
+                "fetched_at) VALUES (?, ?, 'f', ?, ?, ?, 'a', ?, '[]', 0)",
+                (url, source, category, title, summary, datetime(2025, 10, day, tzinfo=timezone.utc).isoformat()),
+            )
+
+    def urls(self, *args, **kwargs):
+        return [hit['url'] for hit in search(self.conn, *args, **kwargs)]
+
+    def test_title_hits_rank_first(self):
+        self.assertEqual(self.urls('climate'), ['https://npr/1', 'https://fox/1'])
+        self.assertEqual(self.urls('climate', order='recent'), ['https://fox/1', 'https://npr/1'])
+
+    def test_odd_input_is_not_an_error(self):
+        self.assertEqual(self.urls('climate AND NEAR("bill *'), [])
+        self.assertEqual(self.urls('"'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.urls('climate', biases=['right']), ['https://fox/1'])
+        self.assertEqual(self.urls('', sources=['fox'], categories=['business']), ['https://fox/2'])
+        self.assertEqual(self.urls('climate', since=datetime(2025, 10, 2, tzinfo=timezone.utc)), ['https://fox/1'])
+
+    def test_since_applies_before_the_rank_pool(self):
+        # Backfilled old articles get the newest rowids; they must not fill the pool
+        for number in range(3):
+            self.add(f'https://npr/old-{number}', 'npr', 'Climate archive', '', 1)
+        with mock.patch.object(search_index, 'RANK_POOL', 2):
+            self.assertEqual(self.urls('climate', since=datetime(2025, 10, 2, tzinfo=timezone.utc), limit=2),
+                             ['https://fox/1'])
+
+    def test_triggers_keep_the_index_current(self):
+        self.add('https://npr/2', 'npr', 'Climate summit opens', '', 4)
+        with self.conn:
+            self.conn.execute("UPDATE articles SET title = 'Senate passes spending bill' WHERE url = 'https://npr/1'")
+            self.conn.execute("DELETE FROM articles WHERE url = 'https://fox/1'")
+        self.assertEqual(self.urls('climate'), ['https://npr/2'])
+
+    def test_relabelled_sources_are_reindexed(self):
+        with self.conn:
+            sync_bias_labels(self.conn, {'fox': 'lean-right'})
+        self.assertEqual(self.urls('', biases=['lean-right']), ['https://fox/2', 'https://fox/1'])
+        self.assertEqual(self.urls('', biases=['right']), [])
+        self.assertEqual(search(self.conn, 'markets')[0]['bias'], 'lean-right')
+
+
+if __name__ == '__main__':
+    unittest.main()
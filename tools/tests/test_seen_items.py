@@ -0,0 +1,100 @@
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from seen_items import BloomFilter, SeenItemIndex, content_hash
+
+ITEM = {'title': 'Senate passes budget', 'description': 'Late on Friday.', 'author': 'Jane Doe', 'published': 'Fri'}
+
+
+class ContentHashTest(unittest.TestCase):
+    def test_changes_with_the_article_fields_only(self):
+        digest = content_hash(ITEM)
+        self.assertEqual(content_hash({**ITEM, 'link': 'https://example.com/other', 'guid': 'x'}), digest)
+        self.assertNotEqual(content_hash({**ITEM, 'title': 'Senate passes amended budget'}), digest)
+
+    def test_fields_do_not_run_together(self):
+        self.assertNotEqual(content_hash({'title': 'ab', 'description': 'c'}), content_hash({'title': 'a', 'description': 'bc'}))
+
+    def test_missing_and_empty_fields_match(self):
+        self.assertEqual(content_hash({'title': 'a'}), content_hash({'title': 'a', 'description': None, 'author': ''}))
+
+
+class BloomFilterTest(unittest.TestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000)
+        for number in range(1000):
+            bloom.add(b'in-%d' % number)
+        self.assertTrue(all(b'in-%d' % number in bloom for number in range(1000)))
+        false_positives = sum(b'out-%d' % number in bloom for number in range(10_000))
+        self.assertLess(false_positives, 300)
+
+
+class SeenItemIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'state.sqlite'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged_until_edited_and_across_runs(self):
+        digest = content_hash(ITEM)
+        index = SeenItemIndex(self.path)
+        self.assertFalse(index.is_unchanged('https://example.com/a', digest))
+        index.mark([('https://example.com/a', digest, 'https://example.com/feed')])
+        self.assertTrue(index.is_unchanged('https://example.com/a', digest))
+        index.close()
+
+        index = SeenItemIndex(self.path)
+        self.assertTrue(index.is_unchanged('https://example.com/a', digest))
+        self.assertFalse(index.is_unchanged('https://example.com/a', content_hash({**ITEM, 'title': 'Edited'})))
+        self.assertFalse(index.is_unchanged('https://example.com/b', digest))
+        index.close()
+
+    def test_edits_replace_the_stored_hash(self):
+        index = SeenItemIndex(self.path)
+        old, new = content_hash(ITEM), content_hash({**ITEM, 'title': 'Edited'})
+        index.mark([('https://example.com/a', old, None)])
+        index.mark([('https://example.com/a', new, None)])
+        # Still in the Bloom filter, but the table has the new hash
+        self.assertFalse(index.is_unchanged('https://example.com/a', old))
+        self.assertTrue(index.is_unchanged('https://example.com/a', new))
+        index.close()
+
+    def test_targets_are_kept_apart(self):
+        digest = content_hash(ITEM)
+        index = SeenItemIndex(self.path, 'sqlite:/a.sqlite')
+        index.mark([('https://example.com/a', digest, None)])
+        index.close()
+        index = SeenItemIndex(self.path, 'jsonl:/a.jsonl')
+        self.assertFalse(index.is_unchanged('https://example.com/a', digest))
+        index.close()
+
+    def test_tables_without_targets_are_replaced(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE seen_items (url TEXT PRIMARY KEY, content_hash BLOB NOT NULL, feed_url TEXT, "
+                     "seen_at REAL NOT NULL)")
+        conn.execute("INSERT INTO seen_items VALUES ('https://example.com/a', ?, NULL, 0)", (content_hash(ITEM),))
+        conn.commit()
+        conn.close()
+        index = SeenItemIndex(self.path, 'sqlite:/a.sqlite')
+        self.assertFalse(index.is_unchanged('https://example.com/a', content_hash(ITEM)))
+        index.close()
+
+    def test_prune_forgets_old_items(self):
+        index = SeenItemIndex(self.path)
+        with mock.patch('time.time', return_value=time.time() - 3600):
+            index.mark([('https://example.com/old', b'1' * 16, None)])
+        index.mark([('https://example.com/new', b'2' * 16, None)])
+        self.assertEqual(index.prune(60), 1)
+        self.assertFalse(index.is_unchanged('https://example.com/old', b'1' * 16))
+        self.assertTrue(index.is_unchanged('https://example.com/new', b'2' * 16))
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
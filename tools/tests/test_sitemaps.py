@@ -0,0 +1,70 @@
+import gzip
+import unittest
+
+from http_client import HttpClient
+from sitemaps import SitemapBudget, iter_sitemap_entries, read_sitemaps
+from tests.support import FeedServer
+
+
+def urlset(*locs):
+    entries = ''.join(f'<url><loc> {loc} </loc><lastmod>2025-10-10</lastmod></url>' for loc in locs)
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'.encode()
+
+
+def index(*locs):
+    entries = ''.join(f'<sitemap><loc>{loc}</loc></sitemap>' for loc in locs)
+    return f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'.encode()
+
+
+def chunked(data, size=16):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class IterSitemapEntriesTest(unittest.TestCase):
+    def test_urls_and_child_sitemaps(self):
+        self.assertEqual(list(iter_sitemap_entries(chunked(urlset('https://a/1', 'https://a/2')))),
+                         [('url', 'https://a/1'), ('url', 'https://a/2')])
+        self.assertEqual(list(iter_sitemap_entries([index('https://a/s1.xml')])), [('sitemap', 'https://a/s1.xml')])
+
+    def test_gzipped_sitemaps(self):
+        data = gzip.compress(urlset('https://a/1'))
+        self.assertEqual(list(iter_sitemap_entries(chunked(data, 7))), [('url', 'https://a/1')])
+
+    def test_stops_quietly_on_errors_and_spent_budgets(self):
+        broken = urlset('https://a/1', 'https://a/2')[:-20] + b'</oops>'
+        self.assertEqual(list(iter_sitemap_entries(chunked(broken))), [('url', 'https://a/1')])
+        budget = SitemapBudget(max_bytes=100)
+        self.assertLess(len(list(iter_sitemap_entries(chunked(urlset(*range(50)), 50), budget))), 5)
+
+
+class ReadSitemapsTest(unittest.TestCase):
+    def setUp(self):
+        self.http = HttpClient(timeout=5)
+
+    def tearDown(self):
+        self.http.close()
+
+    def test_follows_indexes_preferring_feed_sitemaps(self):
+        routes = {}
+        with FeedServer(routes) as server:
+            routes.update({
+                '/sitemap.xml': index(server.url('/articles.xml'), server.url('/sections.xml')),
+                '/articles.xml': urlset('https://a/2025/story', 'https://a/rss/world'),
+                '/sections.xml': urlset('https://a/rss/politics', 'https://a/politics'),
+            })
+            keep = lambda loc: '/rss/' in loc
+            self.assertEqual(read_sitemaps(self.http, [server.url('/sitemap.xml')], keep),
+                             ['https://a/rss/politics', 'https://a/rss/world'])
+            # With room for one child sitemap, the one whose name suggests sections is read
+            self.assertEqual(read_sitemaps(self.http, [server.url('/sitemap.xml')], keep, max_sitemaps=2),
+                             ['https://a/rss/politics'])
+            self.assertEqual(read_sitemaps(self.http, [server.url('/sitemap.xml')], keep, max_urls=1),
+                             ['https://a/rss/politics'])
+
+    def test_missing_sitemaps_are_skipped(self):
+        with FeedServer({}) as server:
+            self.assertEqual(read_sitemaps(self.http, [server.url('/sitemap.xml')], keep=lambda loc: True), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from source_catalog import KnownFeeds, SourceCatalog
+from tests.support import write_source
+
+
+class SourceCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sources = Path(self.tmp.name) / 'sources'
+        self.sources.mkdir()
+        write_source(self.sources, 'npr', ['https://feeds.npr.org/1001/rss.xml'], 'lean-left', 'politics')
+        write_source(self.sources, 'fox', ['https://moxie.foxnews.com/politics.xml', 'https://moxie.foxnews.com/us.xml'],
+                     'right', 'politics')
+        self.catalog = SourceCatalog(Path(self.tmp.name) / 'catalog.sqlite')
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmp.cleanup()
+
+    def test_lookups(self):
+        self.catalog.build(self.sources)
+        row = self.catalog.feed('http://FEEDS.npr.org/1001/rss.xml/?utm_source=x')
+        self.assertEqual((row['source'], row['category'], row['file']), ('npr', 'politics', 'npr.json'))
+        self.assertFalse(self.catalog.is_known('https://feeds.npr.org/1002/rss.xml'))
+        self.assertEqual([row['url'] for row in self.catalog.feeds_by_category('politics')], [
+            'https://moxie.foxnews.com/politics.xml', 'https://moxie.foxnews.com/us.xml', 'https://feeds.npr.org/1001/rss.xml',
+        ])
+        self.assertEqual(self.catalog.bias_labels(), {'npr': 'lean-left', 'fox': 'right'})
+        self.assertEqual(self.catalog.categories(), {'politics': 3})
+
+    def test_rebuilds_only_reload_changed_files(self):
+        self.assertEqual(sorted(self.catalog.build(self.sources)['added']), ['fox.json', 'npr.json'])
+        self.assertEqual(self.catalog.build(self.sources)['unchanged'], 2)
+
+        write_source(self.sources, 'npr', ['https://feeds.npr.org/1002/rss.xml'], 'lean-left', 'politics')
+        (self.sources / 'fox.json').unlink()
+        summary = self.catalog.build(self.sources)
+        self.assertEqual((summary['changed'], summary['removed'], summary['unchanged']), (['npr.json'], ['fox.json'], 0))
+        self.assertEqual([row['url'] for row in self.catalog.feeds()], ['https://feeds.npr.org/1002/rss.xml'])
+
+    def test_broken_files_leave_nothing_behind(self):
+        (self.sources / 'broken.json').write_text('{"slug": "broken", "name": "Broken", "rss_feeds": [{"url": 1}]')
+        summary = self.catalog.build(self.sources)
+        self.assertEqual(list(summary['errors']), ['broken.json'])
+        self.assertNotIn('broken', self.catalog.bias_labels())
+
+    def test_duplicate_feeds_return_when_their_owner_drops_them(self):
+        write_source(self.sources, 'copy', ['https://feeds.npr.org/1001/rss.xml'])
+        summary = self.catalog.build(self.sources)
+        self.assertEqual(summary['duplicates'], ['https://feeds.npr.org/1001/rss.xml'])
+        self.assertEqual(self.catalog.feed('https://feeds.npr.org/1001/rss.xml')['source'], 'copy')
+
+        (self.sources / 'copy.json').unlink()
+        self.catalog.build(self.sources)
+        self.assertEqual(self.catalog.feed('https://feeds.npr.org/1001/rss.xml')['source'], 'npr')
+
+    def test_known_feeds(self):
+        self.catalog.build(self.sources)
+        known = KnownFeeds(self.catalog)
+        self.assertIn('https://feeds.npr.org/1001/rss.xml', known)
+        self.assertFalse(known.add('http://feeds.npr.org/1001/rss.xml'))
+        self.assertTrue(known.add('https://example.com/feed'))
+        self.assertFalse(known.add('https://example.com/feed/'))
+        self.assertIn('https://example.com/feed', known)
+
+
+if __name__ == '__main__':
+    unittest.main()
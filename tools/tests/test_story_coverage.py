@@ -0,0 +1,68 @@
+import json
+import sqlite3
+import unittest
+
+from cluster_stories import SCHEMA as CLUSTERS_SCHEMA
+from ingest_feeds import ARTICLES_SCHEMA
+from story_coverage import SCHEMA, representative, summarize, update_coverage
+
+BIAS_LABELS = {'npr': 'lean-left', 'cnn': 'left', 'fox': 'right', 'reuters': 'center'}
+
+# (url, source, title, summary, published_at), not in publication order
+MEMBERS = [
+    ('https://fox/1', 'fox', 'Senate passes budget bill', 'Vote ends marathon session', '2025-10-10T03:00:00+00:00'),
+    ('https://npr/1', 'npr', 'Senate passes budget', 'Marathon session ends in vote', '2025-10-10T01:00:00+00:00'),
+    ('https://cnn/1', 'cnn', 'Budget: what it means for you', '', '2025-10-10T02:00:00+00:00'),
+    ('https://npr/2', 'npr', 'Senate budget vote explained', 'The session and the vote', '2025-10-10T04:00:00+00:00'),
+]
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_counts_sides_and_earliest_sources(self):
+        row = summarize('story', MEMBERS, BIAS_LABELS, now=1.0)
+        (cluster, headline, headline_url, articles, bias_counts, left, center, right,
+         earliest_left, earliest_center, earliest_right, sources, first, last, updated_at) = row
+        self.assertEqual((cluster, articles, left, center, right), ('story', 4, 3, 0, 1))
+        self.assertEqual(json.loads(bias_counts), {'lean-left': 2, 'left': 1, 'right': 1})
+        self.assertEqual(json.loads(earliest_left), {'source': 'npr', 'published_at': '2025-10-10T01:00:00+00:00'})
+        self.assertIsNone(earliest_center)
+        self.assertEqual(json.loads(earliest_right)['source'], 'fox')
+        self.assertEqual(json.loads(sources), ['npr', 'cnn', 'fox'])
+        self.assertEqual((first, last, updated_at), ('2025-10-10T01:00:00+00:00', '2025-10-10T04:00:00+00:00', 1.0))
+        self.assertEqual((headline, headline_url), ('Senate budget vote explained', 'https://npr/2'))
+
+    def test_unknown_sources_count_as_center(self):
+        row = summarize('story', [('https://x/1', 'unknown', 'Title', '', '2025-10-10T01:00:00+00:00')], {})
+        self.assertEqual(json.loads(row[4]), {'center': 1})
+        self.assertEqual(row[5:8], (0, 1, 0))
+
+    def test_representative_ties_go_to_the_earliest(self):
+        self.assertEqual(representative([0, 1], [frozenset({'a'}), frozenset({'b'})]), 0)
+        self.assertEqual(representative([0, 1, 2], [frozenset({'x'}), frozenset({'a', 'b'}), frozenset({'a', 'b'})]), 1)
+
+
+class UpdateCoverageTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        for schema in (ARTICLES_SCHEMA, CLUSTERS_SCHEMA, SCHEMA):
+            self.conn.executescript(schema)
+        self.conn.executemany(
+            "INSERT INTO articles (url, source, feed_url, category, title, summary, author, published_at, keywords, "
+            "fetched_at) VALUES (?, ?, 'f', 'politics', ?, ?, 'a', ?, '[]', 0)",
+            MEMBERS,
+        )
+        self.conn.executemany(
+            "INSERT INTO article_clusters (url, cluster_id) VALUES (?, 'story')", [(member[0],) for member in MEMBERS]
+        )
+
+    def test_rows_are_written_and_dropped_with_their_clusters(self):
+        self.assertEqual(update_coverage(self.conn, ['story'], BIAS_LABELS), 1)
+        self.assertEqual(self.conn.execute("SELECT articles FROM story_coverage").fetchall(), [(4,)])
+
+        self.conn.execute("DELETE FROM article_clusters")
+        self.assertEqual(update_coverage(self.conn, ['story'], BIAS_LABELS), 0)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM story_coverage").fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from update_rss_feeds import (
+    CATEGORY_MAPPING, CategoryIndex, determine_category_from_identifiers, extract_feed_name_and_category,
+    update_json_file, write_json_atomic,
+)
+
+
+def linear_match(mapping, clean_id):
+    """The scan over the whole mapping that CategoryIndex replaces."""
+    best_match, best_score = 'general', 0
+    for key, category in mapping.items():
+        if key == clean_id:
+            return category, 0, True
+        score = len(key) if key in clean_id else len(clean_id) * 0.5 if clean_id in key else 0
+        if score > best_score:
+            best_match, best_score = category, score
+    return best_match, best_score, False
+
+
+class CategoryIndexTest(unittest.TestCase):
+    def test_matches_the_linear_scan(self):
+        index = CategoryIndex(CATEGORY_MAPPING)
+        keys = list(CATEGORY_MAPPING)
+        rng = random.Random(7)
+        identifiers = ['', 'x', 'healthheadlines', 'worldnews', 'usnews', 'nytech', 'climatechangeworld', 'sportsbiz']
+        for _ in range(2000):
+            key = rng.choice(keys)
+            start = rng.randrange(len(key))
+            identifiers.append(key[start:rng.randrange(start + 1, len(key) + 1)])
+            identifiers.append(rng.choice(keys) + rng.choice(['', '-', 'x']) + rng.choice(keys))
+        for identifier in identifiers:
+            self.assertEqual(index.match(identifier), linear_match(CATEGORY_MAPPING, identifier), identifier)
+
+    def test_ties_go_to_the_earlier_key(self):
+        index = CategoryIndex({'sport': 'sports', 'world': 'world', 'politic': 'politics'})
+        self.assertEqual(index.match('worldsport'), ('sports', 5, False))
+        self.assertEqual(index.match('politicsworld'), ('politics', 7, False))
+        self.assertEqual(index.match('orl'), ('world', 1.5, False))
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_feed_urls(self):
+        self.assertEqual(determine_category_from_identifiers(['news', 'Technology']), 'technology')
+        self.assertEqual(determine_category_from_identifiers(['subscribe', 'en']), 'general')
+        self.assertEqual(extract_feed_name_and_category('https://rss.nytimes.com/services/xml/rss/nyt/Politics.xml')[1],
+                         'politics')
+
+
+class UpdateJsonFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'example.json'
+        # update_json_file() reports every feed it merges
+        quiet = contextlib.redirect_stdout(io.StringIO())
+        quiet.__enter__()
+        self.addCleanup(quiet.__exit__, None, None, None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def feed(self, url, category='politics', name='Politics'):
+        return {'name': name, 'url': url, 'category': category}
+
+    def test_unchanged_files_are_left_alone(self):
+        self.assertTrue(update_json_file(self.path, [self.feed('https://example.com/politics.xml')], 'example')['changed'])
+        before = os.stat(self.path)
+        diff = update_json_file(self.path, [self.feed('https://example.com/politics.xml')], 'example')
+        self.assertFalse(diff['changed'])
+        self.assertEqual([feed['url'] for feed in diff['skipped']], ['https://example.com/politics.xml'])
+        self.assertEqual((os.stat(self.path).st_ino, os.stat(self.path).st_mtime_ns), (before.st_ino, before.st_mtime_ns))
+
+    def test_feeds_and_categories_are_only_added(self):
+        update_json_file(self.path, [{'name': '', 'url': 'https://example.com/a.xml', 'category': 'politics'}], 'example')
+        diff = update_json_file(self.path, [
+            self.feed('https://example.com/a.xml', name='A'),
+            self.feed('https://example.com/b.xml', category='sports'),
+            self.feed('https://example.com/c.xml', category='business'),
+        ], 'example')
+        self.assertEqual([f['url'] for f in diff['added']], ['https://example.com/b.xml', 'https://example.com/c.xml'])
+        self.assertEqual([f['url'] for f in diff['skipped']], ['https://example.com/a.xml'])
+        self.assertEqual(diff['categories_added'], ['business', 'sports'])
+        data = json.loads(self.path.read_text())
+        self.assertEqual(data['categories'], ['politics', 'business', 'sports'])
+        self.assertEqual(data['rss_feeds'][0]['name'], '')
+
+    def test_hand_edited_files_are_left_alone(self):
+        data = {
+            'slug': 'example',
+            'categories': ['world', 'politics', 'unused'],
+            'rss_feeds': [
+                {'url': 'https://example.com/world.xml', 'category': 'world'},
+                {'name': 'Politics', 'url': 'https://example.com/politics.xml', 'category': 'politics'},
+            ],
+        }
+        self.path.write_text(json.dumps(data))
+        before = self.path.read_text()
+        diff = update_json_file(self.path, [self.feed('https://example.com/world.xml', category='world', name='World'),
+                                            self.feed('https://example.com/politics.xml')], 'example')
+        self.assertFalse(diff['changed'])
+        self.assertEqual(self.path.read_text(), before)
+
+    def test_invalid_json_is_not_overwritten(self):
+        self.path.write_text('{"slug": ')
+        self.assertFalse(update_json_file(self.path, [self.feed('https://example.com/a.xml')], 'example'))
+        self.assertEqual(self.path.read_text(), '{"slug": ')
+
+    def test_atomic_writes_keep_the_mode_and_leave_no_temp_files(self):
+        self.path.write_text('{}')
+        os.chmod(self.path, 0o600)
+        write_json_atomic(self.path, {'slug': 'example'})
+        self.assertEqual(json.loads(self.path.read_text()), {'slug': 'example'})
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+        with self.assertRaises(TypeError):
+            write_json_atomic(self.path, {'slug': object()})
+        self.assertEqual(json.loads(self.path.read_text()), {'slug': 'example'})
+        self.assertEqual([path.name for path in Path(self.tmp.name).iterdir() if not path.name.endswith('.lock')],
+                         ['example.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from url_index import UrlIndex, canonicalize_url
+
+
+class CanonicalizeUrlTest(unittest.TestCase):
+    def test_equivalent_urls_share_a_key(self):
+        key = canonicalize_url('https://rss.nytimes.com/services/xml/rss/nyt/World.xml')
+        for url in (
+            'http://rss.nytimes.com/services/xml/rss/nyt/World.xml',
+            'https://RSS.NYTimes.com:443/services/xml/rss/nyt/World.xml/',
+            'http://rss.nytimes.com:80/services/xml/rss/nyt/World.xml#top',
+            '  https://rss.nytimes.com/services/xml/rss/nyt/World.xml?utm_source=x&fbclid=y  ',
+        ):
+            self.assertEqual(canonicalize_url(url), key, url)
+
+    def test_query_is_sorted_without_tracking_parameters(self):
+        self.assertEqual(
+            canonicalize_url('https://example.com/feed?b=2&UTM_Medium=rss&a=1&ref_src=tw&empty='),
+            'https://example.com/feed?a=1&b=2&empty=',
+        )
+
+    def test_what_still_tells_urls_apart(self):
+        self.assertEqual(canonicalize_url('https://example.com:8080/feed'), 'https://example.com:8080/feed')
+        self.assertNotEqual(canonicalize_url('https://example.com/Feed'), canonicalize_url('https://example.com/feed'))
+        self.assertNotEqual(canonicalize_url('https://example.com/feed?id=1'), canonicalize_url('https://example.com/feed?id=2'))
+        self.assertEqual(canonicalize_url('ftp://example.com/feed'), 'ftp://example.com/feed')
+
+    def test_root_and_bad_ports(self):
+        self.assertEqual(canonicalize_url('https://example.com'), 'https://example.com/')
+        self.assertEqual(canonicalize_url('https://example.com///'), 'https://example.com/')
+        self.assertEqual(canonicalize_url('https://example.com:99999/feed'), 'https://example.com/feed')
+
+
+class UrlIndexTest(unittest.TestCase):
+    def test_keeps_the_first_spelling(self):
+        index = UrlIndex(['http://example.com/feed/'])
+        self.assertFalse(index.add('https://EXAMPLE.com/feed?utm_campaign=x'))
+        self.assertTrue(index.add('https://example.com/other'))
+        self.assertIn('https://example.com/feed', index)
+        self.assertEqual(index.get('https://example.com/feed'), 'http://example.com/feed/')
+        self.assertEqual(list(index), ['http://example.com/feed/', 'https://example.com/other'])
+
+
+if __name__ == '__main__':
+    unittest.main()
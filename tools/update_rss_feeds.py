@@ -1,19 +1,38 @@
 #!/usr/bin/env python3
 """
 Script to update RSS feeds in source JSON files from text files.
-Usage: python update_rss_feeds.py <txt_file> [source_slug]
+Usage: python update_rss_feeds.py <txt_file> [source_slug] [--force] [--diff-output FILE]
 
 Examples:
   python update_rss_feeds.py nyt.txt
   python update_rss_feeds.py nyt.txt nyt
 """
 
+import copy
+import functools
 import json
-import sys
+import os
 import re
+import stat
+import sys
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
 from urllib.parse import urlparse
 from pathlib import Path
 
+from instrumentation import traced
+
+try:
+    import fcntl
+except ImportError:  # Windows: only writers within this process are serialized
+    fcntl = None
+
+# One lock per source file for writers in this process
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
 def extract_feed_name_and_category(url):
     """Extract a human-readable name and category from RSS URL."""
     
@@ -64,189 +83,292 @@ def extract_feed_identifiers(url):
     
     return identifiers
 
-def determine_category_from_identifiers(identifiers):
-    """Determine category based on extracted identifiers."""
-    
-    # Comprehensive category mapping with priority ordering
-    # More specific categories first, then more general ones
-    category_mapping = {
-        # Health/Medical
-        'health': 'health', 'medical': 'health', 'medicine': 'health',
-        'healthcare': 'health', 'wellness': 'health', 'fitness': 'health',
-        'well': 'health', 'mental-health': 'health', 'psychology': 'health',
-        'healthheadlines': 'health',
-        
-        # Science/Environment
-        'science': 'science', 'scientific': 'science', 'research': 'science',
-        'space': 'science', 'astronomy': 'science', 'nasa': 'science',
-        'climate': 'science', 'climate-change': 'science', 'environment': 'science',
-        'environmental': 'science', 'nature': 'science', 'conservation': 'science',
-        
-        # Education
-        'education': 'education', 'educational': 'education', 'school': 'education',
-        'schools': 'education', 'university': 'education', 'college': 'education',
-        'learning': 'education', 'students': 'education', 'academic': 'education',
-        'culture-and-education': 'education',
-        
-        # Business/Economy/Finance
-        'business': 'business', 'economy': 'business', 'economic': 'business',
-        'finance': 'business', 'financial': 'business', 'markets': 'business',
-        'market': 'business', 'stocks': 'business', 'trading': 'business',
-        'dealbook': 'business', 'deals': 'business', 'mergers': 'business',
-        'smallbusiness': 'business', 'small-business': 'business', 'startup': 'business',
-        'yourmoney': 'business', 'your-money': 'business', 'personal-finance': 'business',
-        'investing': 'business', 'investment': 'business', 'banking': 'business',
-        'crypto': 'business', 'cryptocurrency': 'business', 'bitcoin': 'business',
-        'energyenvironment': 'business', 'energy-environment': 'business', 'energy': 'business',
-        'mediaandadvertising': 'business', 'media-and-advertising': 'business',
-        'advertising': 'business', 'marketing': 'business',
-        'jobs': 'business', 'employment': 'business', 'careers': 'business',
-        'realestate': 'business', 'real-estate': 'business', 'housing': 'business',
-        'money': 'business', 'moneyheadlines': 'business', 'businessheadlines': 'business',
-        'economic-development': 'business', 'development': 'business',
-        
-        # World/International
-        'world': 'world', 'international': 'world', 'global': 'world',
-        'africa': 'world', 'americas': 'world', 'asiapacific': 'world', 'asia-pacific': 'world',
-        'asia': 'world', 'europe': 'world', 'middleeast': 'world', 'middle-east': 'world',
-        'foreign': 'world', 'overseas': 'world', 'regions': 'world', 'region': 'world',
-        'migrants': 'world', 'refugees': 'world', 'migrants-and-refugees': 'world',
-        'humanitarian': 'world', 'humanitarian-aid': 'world',
-
-        'women': 'social', 'gender': 'social', 'equality': 'social', 'social-justice': 'social',
-        'human-rights': 'social', 'rights': 'social', 'civil-rights': 'social',
-        'discrimination': 'social', 'diversity': 'social', 'inclusion': 'social',
-        'lgbtq': 'social', 'minorities': 'social', 'racism': 'social', 'social-issues': 'social',
-
-        # Politics/Government
-        'politics': 'politics', 'political': 'politics', 'government': 'politics',
-        'upshot': 'politics', 'election': 'politics', 'elections': 'politics',
-        'campaign': 'politics', 'policy': 'politics', 'congress': 'politics',
-        'senate': 'politics', 'house': 'politics', 'whitehouse': 'politics',
-        'supreme-court': 'politics', 'justice': 'politics', 'legal': 'politics',
-        'law': 'politics', 'law-and-crime-prevention': 'politics',
-        'un-affairs': 'politics', 'peace-and-security': 'politics', 'security': 'politics',
-        'sdgs': 'politics', 'sustainable-development': 'politics',
-        
-        # Technology
-        'technology': 'technology', 'tech': 'technology', 'digital': 'technology',
-        'personaltech': 'technology', 'personal-tech': 'technology', 'gadgets': 'technology',
-        'software': 'technology', 'hardware': 'technology', 'internet': 'technology',
-        'ai': 'technology', 'artificial-intelligence': 'technology', 'machine-learning': 'technology',
-        'cybersecurity': 'technology', 'security': 'technology', 'privacy': 'technology',
-        'mobile': 'technology', 'apps': 'technology', 'social-media': 'technology',
-        
-        # Sports
-        'sports': 'sports', 'sport': 'sports', 'athletics': 'sports',
-        'baseball': 'sports', 'basketball': 'sports', 'football': 'sports',
-        'soccer': 'sports', 'tennis': 'sports', 'golf': 'sports', 'hockey': 'sports',
-        'collegebasketball': 'sports', 'college-basketball': 'sports',
-        'collegefootball': 'sports', 'college-football': 'sports',
-        'probasketball': 'sports', 'pro-basketball': 'sports', 'nba': 'sports',
-        'profootball': 'sports', 'pro-football': 'sports', 'nfl': 'sports',
-        'olympics': 'sports', 'olympic': 'sports', 'worldcup': 'sports',
-        'motorsports': 'sports', 'racing': 'sports',
-        
-        # Science/Health
-        'science': 'science', 'scientific': 'science', 'research': 'science',
-        'health': 'health', 'medical': 'health', 'medicine': 'health',
-        'healthcare': 'health', 'wellness': 'health', 'fitness': 'health',
-        'climate': 'science', 'climate-change': 'science', 'environment': 'science',
-        'environmental': 'science', 'nature': 'science', 'conservation': 'science',
-        'space': 'science', 'astronomy': 'science', 'nasa': 'science',
-        'well': 'health', 'mental-health': 'health', 'psychology': 'health',
+# Comprehensive category mapping with priority ordering
+# More specific categories first, then more general ones
+CATEGORY_MAPPING = {
+    # Health/Medical
+    'health': 'health', 'medical': 'health', 'medicine': 'health',
+    'healthcare': 'health', 'wellness': 'health', 'fitness': 'health',
+    'well': 'health', 'mental-health': 'health', 'psychology': 'health',
+    'healthheadlines': 'health',
+    
+    # Science/Environment
+    'science': 'science', 'scientific': 'science', 'research': 'science',
+    'space': 'science', 'astronomy': 'science', 'nasa': 'science',
+    'climate': 'science', 'climate-change': 'science', 'environment': 'science',
+    'environmental': 'science', 'nature': 'science', 'conservation': 'science',
+    
+    # Education
+    'education': 'education', 'educational': 'education', 'school': 'education',
+    'schools': 'education', 'university': 'education', 'college': 'education',
+    'learning': 'education', 'students': 'education', 'academic': 'education',
+    'culture-and-education': 'education',
+    
+    # Business/Economy/Finance
+    'business': 'business', 'economy': 'business', 'economic': 'business',
+    'finance': 'business', 'financial': 'business', 'markets': 'business',
+    'market': 'business', 'stocks': 'business', 'trading': 'business',
+    'dealbook': 'business', 'deals': 'business', 'mergers': 'business',
+    'smallbusiness': 'business', 'small-business': 'business', 'startup': 'business',
+    'yourmoney': 'business', 'your-money': 'business', 'personal-finance': 'business',
+    'investing': 'business', 'investment': 'business', 'banking': 'business',
+    'crypto': 'business', 'cryptocurrency': 'business', 'bitcoin': 'business',
+    'energyenvironment': 'business', 'energy-environment': 'business', 'energy': 'business',
+    'mediaandadvertising': 'business', 'media-and-advertising': 'business',
+    'advertising': 'business', 'marketing': 'business',
+    'jobs': 'business', 'employment': 'business', 'careers': 'business',
+    'realestate': 'business', 'real-estate': 'business', 'housing': 'business',
+    'money': 'business', 'moneyheadlines': 'business', 'businessheadlines': 'business',
+    'economic-development': 'business', 'development': 'business',
+    
+    # World/International
+    'world': 'world', 'international': 'world', 'global': 'world',
+    'africa': 'world', 'americas': 'world', 'asiapacific': 'world', 'asia-pacific': 'world',
+    'asia': 'world', 'europe': 'world', 'middleeast': 'world', 'middle-east': 'world',
+    'foreign': 'world', 'overseas': 'world', 'regions': 'world', 'region': 'world',
+    'migrants': 'world', 'refugees': 'world', 'migrants-and-refugees': 'world',
+    'humanitarian': 'world', 'humanitarian-aid': 'world',
+
+    'women': 'social', 'gender': 'social', 'equality': 'social', 'social-justice': 'social',
+    'human-rights': 'social', 'rights': 'social', 'civil-rights': 'social',
+    'discrimination': 'social', 'diversity': 'social', 'inclusion': 'social',
+    'lgbtq': 'social', 'minorities': 'social', 'racism': 'social', 'social-issues': 'social',
+
+    # Politics/Government
+    'politics': 'politics', 'political': 'politics', 'government': 'politics',
+    'upshot': 'politics', 'election': 'politics', 'elections': 'politics',
+    'campaign': 'politics', 'policy': 'politics', 'congress': 'politics',
+    'senate': 'politics', 'house': 'politics', 'whitehouse': 'politics',
+    'supreme-court': 'politics', 'justice': 'politics', 'legal': 'politics',
+    'law': 'politics', 'law-and-crime-prevention': 'politics',
+    'un-affairs': 'politics', 'peace-and-security': 'politics', 'security': 'politics',
+    'sdgs': 'politics', 'sustainable-development': 'politics',
+    
+    # Technology
+    'technology': 'technology', 'tech': 'technology', 'digital': 'technology',
+    'personaltech': 'technology', 'personal-tech': 'technology', 'gadgets': 'technology',
+    'software': 'technology', 'hardware': 'technology', 'internet': 'technology',
+    'ai': 'technology', 'artificial-intelligence': 'technology', 'machine-learning': 'technology',
+    'cybersecurity': 'technology', 'security': 'technology', 'privacy': 'technology',
+    'mobile': 'technology', 'apps': 'technology', 'social-media': 'technology',
+    
+    # Sports
+    'sports': 'sports', 'sport': 'sports', 'athletics': 'sports',
+    'baseball': 'sports', 'basketball': 'sports', 'football': 'sports',
+    'soccer': 'sports', 'tennis': 'sports', 'golf': 'sports', 'hockey': 'sports',
+    'collegebasketball': 'sports', 'college-basketball': 'sports',
+    'collegefootball': 'sports', 'college-football': 'sports',
+    'probasketball': 'sports', 'pro-basketball': 'sports', 'nba': 'sports',
+    'profootball': 'sports', 'pro-football': 'sports', 'nfl': 'sports',
+    'olympics': 'sports', 'olympic': 'sports', 'worldcup': 'sports',
+    'motorsports': 'sports', 'racing': 'sports',
+    
+    # Science/Health
+    'science': 'science', 'scientific': 'science', 'research': 'science',
+    'health': 'health', 'medical': 'health', 'medicine': 'health',
+    'healthcare': 'health', 'wellness': 'health', 'fitness': 'health',
+    'climate': 'science', 'climate-change': 'science', 'environment': 'science',
+    'environmental': 'science', 'nature': 'science', 'conservation': 'science',
+    'space': 'science', 'astronomy': 'science', 'nasa': 'science',
+    'well': 'health', 'mental-health': 'health', 'psychology': 'health',
+    
+    # Arts/Entertainment/Culture
+    'arts': 'arts', 'art': 'arts', 'culture': 'arts', 'cultural': 'arts',
+    'artanddesign': 'arts', 'art-and-design': 'arts', 'design': 'arts',
+    'books': 'arts', 'literature': 'arts', 'reading': 'arts', 'review': 'arts',
+    'dance': 'arts', 'dancing': 'arts', 'ballet': 'arts',
+    'movies': 'arts', 'film': 'arts', 'cinema': 'arts', 'hollywood': 'arts',
+    'music': 'arts', 'concerts': 'arts', 'albums': 'arts',
+    'television': 'arts', 'tv': 'arts', 'streaming': 'arts',
+    'theater': 'arts', 'theatre': 'arts', 'broadway': 'arts',
+    'entertainment': 'arts', 'celebrity': 'arts', 'celebrities': 'arts',
+    'gaming': 'arts', 'games': 'arts', 'video-games': 'arts',
+    'lens': 'arts', 'photography': 'arts', 'photos': 'arts',
+    
+    # Lifestyle
+    'lifestyle': 'lifestyle', 'living': 'lifestyle', 'life': 'lifestyle',
+    'fashionandstyle': 'lifestyle', 'fashion-and-style': 'lifestyle', 'fashion': 'lifestyle',
+    'style': 'lifestyle', 'beauty': 'lifestyle', 'luxury': 'lifestyle',
+    'diningandwine': 'lifestyle', 'dining-and-wine': 'lifestyle', 'food': 'lifestyle',
+    'dining': 'lifestyle', 'wine': 'lifestyle', 'restaurants': 'lifestyle',
+    'cooking': 'lifestyle', 'recipes': 'lifestyle',
+    'weddings': 'lifestyle', 'wedding': 'lifestyle', 'marriage': 'lifestyle',
+    'tmagazine': 'lifestyle', 'magazine': 'lifestyle',
+    'travel': 'lifestyle', 'tourism': 'lifestyle', 'vacation': 'lifestyle',
+    'automobiles': 'lifestyle', 'cars': 'lifestyle', 'automotive': 'lifestyle',
+    'home': 'lifestyle', 'garden': 'lifestyle', 'gardening': 'lifestyle',
+    'parenting': 'lifestyle', 'family': 'lifestyle', 'relationships': 'lifestyle',
+    
+    # Education
+    'education': 'education', 'educational': 'education', 'school': 'education',
+    'schools': 'education', 'university': 'education', 'college': 'education',
+    'learning': 'education', 'students': 'education', 'academic': 'education',
+    'culture-and-education': 'education',
+    
+    # Opinion/Editorial
+    'opinion': 'opinion', 'opinions': 'opinion', 'editorial': 'opinion',
+    'editorials': 'opinion', 'commentary': 'opinion', 'analysis': 'opinion',
+    'sunday-review': 'opinion', 'op-ed': 'opinion', 'column': 'opinion',
+    'columnist': 'opinion', 'blog': 'opinion', 'blogs': 'opinion',
+    
+    # National/Regional
+    'us': 'national', 'usa': 'national', 'national': 'national',
+    'domestic': 'national', 'america': 'national', 'american': 'national',
+    'nyregion': 'regional', 'ny-region': 'regional', 'regional': 'regional',
+    'local': 'regional', 'metro': 'regional', 'city': 'regional',
+    
+    # General/News
+    'homepage': 'general', 'home': 'general', 'top': 'general', 'main': 'general',
+    'news': 'general', 'latest': 'general', 'breaking': 'general',
+    'recent': 'general', 'all': 'general', 'headlines': 'general',
+    'mostemailed': 'general', 'most-emailed': 'general',
+    'mostshared': 'general', 'most-shared': 'general',
+    'mostviewed': 'general', 'most-viewed': 'general',
+    'popular': 'general', 'trending': 'general',
+    'obituaries': 'general', 'obits': 'general',
+    'weather': 'general', 'traffic': 'general',
+}
+
+# Identifiers that say nothing about a feed's category
+SKIP_IDENTIFIERS = {'subscribe', 'en', 'news', 'topic', 'region', 'www', 'com', 'org'}
+
+IDENTIFIER_CLEANUP_PATTERN = re.compile(r'[^a-z0-9\-]')
+
+
+class CategoryIndex:
+    """A category mapping compiled for substring matching in both directions.
+
+    Keys contained in an identifier are found in a single pass over the
+    identifier with an Aho-Corasick automaton; identifiers contained in a key
+    are looked up in a table of every key substring. Ties are broken by the
+    key's position in the mapping, as in a linear scan over it.
+    """
+    
+    def __init__(self, mapping):
+        self.categories = list(mapping.values())
+        self.exact = dict(mapping)
+        keys = list(mapping)
         
-        # Arts/Entertainment/Culture
-        'arts': 'arts', 'art': 'arts', 'culture': 'arts', 'cultural': 'arts',
-        'artanddesign': 'arts', 'art-and-design': 'arts', 'design': 'arts',
-        'books': 'arts', 'literature': 'arts', 'reading': 'arts', 'review': 'arts',
-        'dance': 'arts', 'dancing': 'arts', 'ballet': 'arts',
-        'movies': 'arts', 'film': 'arts', 'cinema': 'arts', 'hollywood': 'arts',
-        'music': 'arts', 'concerts': 'arts', 'albums': 'arts',
-        'television': 'arts', 'tv': 'arts', 'streaming': 'arts',
-        'theater': 'arts', 'theatre': 'arts', 'broadway': 'arts',
-        'entertainment': 'arts', 'celebrity': 'arts', 'celebrities': 'arts',
-        'gaming': 'arts', 'games': 'arts', 'video-games': 'arts',
-        'lens': 'arts', 'photography': 'arts', 'photos': 'arts',
+        # Trie of the keys; each node keeps the best (length, -position) key
+        # ending there or at any of its suffixes reachable through fail links
+        self._goto = [{}]
+        self._best = [None]
+        for position, key in enumerate(keys):
+            node = 0
+            for char in key:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._best.append(None)
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._best[node] = (len(key), -position)
         
-        # Lifestyle
-        'lifestyle': 'lifestyle', 'living': 'lifestyle', 'life': 'lifestyle',
-        'fashionandstyle': 'lifestyle', 'fashion-and-style': 'lifestyle', 'fashion': 'lifestyle',
-        'style': 'lifestyle', 'beauty': 'lifestyle', 'luxury': 'lifestyle',
-        'diningandwine': 'lifestyle', 'dining-and-wine': 'lifestyle', 'food': 'lifestyle',
-        'dining': 'lifestyle', 'wine': 'lifestyle', 'restaurants': 'lifestyle',
-        'cooking': 'lifestyle', 'recipes': 'lifestyle',
-        'weddings': 'lifestyle', 'wedding': 'lifestyle', 'marriage': 'lifestyle',
-        'tmagazine': 'lifestyle', 'magazine': 'lifestyle',
-        'travel': 'lifestyle', 'tourism': 'lifestyle', 'vacation': 'lifestyle',
-        'automobiles': 'lifestyle', 'cars': 'lifestyle', 'automotive': 'lifestyle',
-        'home': 'lifestyle', 'garden': 'lifestyle', 'gardening': 'lifestyle',
-        'parenting': 'lifestyle', 'family': 'lifestyle', 'relationships': 'lifestyle',
+        # Fail links, breadth first; the root's children fall back to the root
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (self._best[child] is None or inherited > self._best[child]):
+                    self._best[child] = inherited
+                queue.append(child)
         
-        # Education
-        'education': 'education', 'educational': 'education', 'school': 'education',
-        'schools': 'education', 'university': 'education', 'college': 'education',
-        'learning': 'education', 'students': 'education', 'academic': 'education',
-        'culture-and-education': 'education',
+        # Substring -> position of the first key containing it
+        self._containing = {}
+        for position, key in enumerate(keys):
+            for start in range(len(key)):
+                for end in range(start + 1, len(key) + 1):
+                    self._containing.setdefault(key[start:end], position)
+    
+    def best_key_in(self, text):
+        """(length, -position) of the best key occurring in `text`, or None."""
+        best = None
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            if self._best[node] is not None and (best is None or self._best[node] > best):
+                best = self._best[node]
+        return best
+    
+    def match(self, clean_id):
+        """Return (category, score, exact) for a cleaned identifier.
         
-        # Opinion/Editorial
-        'opinion': 'opinion', 'opinions': 'opinion', 'editorial': 'opinion',
-        'editorials': 'opinion', 'commentary': 'opinion', 'analysis': 'opinion',
-        'sunday-review': 'opinion', 'op-ed': 'opinion', 'column': 'opinion',
-        'columnist': 'opinion', 'blog': 'opinion', 'blogs': 'opinion',
+        An exact key match wins outright. Otherwise keys contained in the
+        identifier score their length and keys containing the identifier score
+        half the identifier's length; the category of the best scoring key is
+        returned, with a score of 0 if nothing matched.
+        """
+        if clean_id in self.exact:
+            return self.exact[clean_id], 0, True
         
-        # National/Regional
-        'us': 'national', 'usa': 'national', 'national': 'national',
-        'domestic': 'national', 'america': 'national', 'american': 'national',
-        'nyregion': 'regional', 'ny-region': 'regional', 'regional': 'regional',
-        'local': 'regional', 'metro': 'regional', 'city': 'regional',
+        candidates = []
+        forward = self.best_key_in(clean_id)
+        if forward is not None:
+            candidates.append(forward)
+        if clean_id and clean_id in self._containing:
+            candidates.append((len(clean_id) * 0.5, -self._containing[clean_id]))
+        if not candidates:
+            return 'general', 0, False
         
-        # General/News
-        'homepage': 'general', 'home': 'general', 'top': 'general', 'main': 'general',
-        'news': 'general', 'latest': 'general', 'breaking': 'general',
-        'recent': 'general', 'all': 'general', 'headlines': 'general',
-        'mostemailed': 'general', 'most-emailed': 'general',
-        'mostshared': 'general', 'most-shared': 'general',
-        'mostviewed': 'general', 'most-viewed': 'general',
-        'popular': 'general', 'trending': 'general',
-        'obituaries': 'general', 'obits': 'general',
-        'weather': 'general', 'traffic': 'general',
-    }
+        score, negative_position = max(candidates)
+        return self.categories[-negative_position], score, False
+
+
+# Compiled once; classifying a URL no longer rebuilds or scans the mapping
+CATEGORY_INDEX = CategoryIndex(CATEGORY_MAPPING)
+
+
+def clean_identifier(identifier):
+    return IDENTIFIER_CLEANUP_PATTERN.sub('', identifier.lower().strip())
+
+
+@functools.lru_cache(maxsize=None)
+def classify_identifier(clean_id):
+    """Memoized CATEGORY_INDEX.match() for a cleaned identifier."""
+    return CATEGORY_INDEX.match(clean_id)
+
+
+def determine_category_from_identifiers(identifiers):
+    """Determine category based on extracted identifiers."""
     
     # Find the best matching category by checking each identifier
     best_match = 'general'
     best_score = 0
     
     for identifier in identifiers:
-        # Clean identifier
-        clean_id = identifier.lower().strip()
-        clean_id = re.sub(r'[^a-z0-9\-]', '', clean_id)
+        clean_id = clean_identifier(identifier)
         
         # Skip common non-content identifiers
-        if clean_id in ['subscribe', 'en', 'news', 'topic', 'region', 'www', 'com', 'org']:
+        if clean_id in SKIP_IDENTIFIERS:
             continue
         
-        # Check for exact matches first (highest priority)
-        if clean_id in category_mapping:
-            return category_mapping[clean_id]
+        category, score, exact = classify_identifier(clean_id)
+        if exact:
+            return category
         
-        # Check for partial matches and score them
-        for key, category in category_mapping.items():
-            if key == clean_id:  # Exact match - highest priority
-                return category
-            elif key in clean_id:  # Key is contained in identifier
-                score = len(key)  # Longer matches are more specific
-                if score > best_score:
-                    best_match = category
-                    best_score = score
-            elif clean_id in key:  # Identifier is contained in key (less preferred)
-                score = len(clean_id) * 0.5  # Lower score for reverse matches
-                if score > best_score:
-                    best_match = category
-                    best_score = score
+        # Longer matches are more specific; earlier identifiers win ties
+        if score > best_score:
+            best_match = category
+            best_score = score
     
     return best_match
 
+
+def classify_many(urls):
+    """Determine the categories of many feed URLs, in order.
+    
+    Identifiers shared between URLs (sections repeated across publishers,
+    common path segments) are only matched once.
+    """
+    return [determine_category_from_identifiers(extract_feed_identifiers(url)) for url in urls]
+
 def generate_feed_name(url, identifiers):
     """Generate a human-readable name for the RSS feed."""
     
@@ -434,55 +556,159 @@ def load_rss_urls_from_file(filepath):
     
     return urls
 
-def update_json_file(json_filepath, rss_feeds, source_slug):
-    """Update the JSON file with new RSS feeds."""
+@contextmanager
+def locked_source_file(json_filepath):
+    """Hold an exclusive lock on a source file, across threads and processes.
+
+    The lock is taken on a hidden sibling file, since the JSON file itself
+    is swapped out by every write.
+    """
+    json_filepath = Path(json_filepath)
+    with _path_locks_lock:
+        path_lock = _path_locks.setdefault(str(json_filepath.resolve()), threading.Lock())
+    with path_lock:
+        if fcntl is None:
+            yield
+            return
+        json_filepath.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_filepath.with_name(f'.{json_filepath.name}.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def write_json_atomic(json_filepath, data):
+    """Write `data` to a temp file next to `json_filepath` and swap it in.
+
+    Readers (and a crash half way through) only ever see the old or the new
+    file, never a truncated one.
+    """
+    json_filepath = Path(json_filepath)
+    mode = stat.S_IMODE(json_filepath.stat().st_mode) if json_filepath.exists() else 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=json_filepath.parent, prefix=f'.{json_filepath.name}.', suffix='.tmp')
     try:
-        # Try to load existing JSON
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, json_filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+@traced('update_json_file')
+def update_json_file(json_filepath, rss_feeds, source_slug):
+    """Update the JSON file with new RSS feeds.
+
+    The merge only adds: stored feeds are left as they are, and the
+    categories of new feeds are appended to the stored ones, whose order is
+    kept. The file is only rewritten (atomically, under a file lock) when
+    something was added. Returns a diff on success:
+        {'added': [...], 'skipped': [...], 'categories_added': [...],
+         'changed': bool, 'total': n}
+    Returns False if the existing file could not be read.
+    """
+    json_filepath = Path(json_filepath)
+    with locked_source_file(json_filepath):
         try:
-            with open(json_filepath, 'r') as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            # Create a new JSON structure if file doesn't exist
-            print(f"JSON file not found. Creating new file: {json_filepath}")
-            
-            # Create directory if it doesn't exist
-            json_filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Generate basic metadata based on source slug
-            data = create_default_source_structure(source_slug)
+            # Try to load existing JSON
+            try:
+                with open(json_filepath, 'r') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                # Create a new JSON structure if file doesn't exist
+                print(f"JSON file not found. Creating new file: {json_filepath}")
+                
+                # Create directory if it doesn't exist
+                json_filepath.parent.mkdir(parents=True, exist_ok=True)
+                
+                # Generate basic metadata based on source slug
+                data = create_default_source_structure(source_slug)
+                original = None
+            else:
+                original = copy.deepcopy(data)
+        except json.JSONDecodeError:
+            print(f"Error: Invalid JSON in {json_filepath}")
+            return False
         
         # Append new RSS feeds to existing ones (avoid duplicates)
         existing_feeds = data.get('rss_feeds', [])
         existing_urls = {feed['url'] for feed in existing_feeds}
         
         # Add only new feeds that don't already exist
-        new_feeds_added = 0
+        added = []
+        skipped = []
         for feed in rss_feeds:
             if feed['url'] not in existing_urls:
                 existing_feeds.append(feed)
-                new_feeds_added += 1
+                existing_urls.add(feed['url'])
+                added.append(feed)
                 print(f"  Added: {feed['name']} - {feed['url']}")
             else:
+                skipped.append(feed)
                 print(f"  Skipped (duplicate): {feed['name']} - {feed['url']}")
         
         data['rss_feeds'] = existing_feeds
         
-        # Dynamically update categories based on all RSS feeds
-        categories = set()
-        for feed in data['rss_feeds']:
-            categories.add(feed['category'])
-        data['categories'] = sorted(list(categories))
+        # Add the categories of the new feeds after the stored ones
+        categories = data.get('categories', [])
+        categories_added = sorted({feed['category'] for feed in added} - set(categories))
+        data['categories'] = categories + categories_added
         
-        # Write back to file
-        with open(json_filepath, 'w') as f:
-            json.dump(data, f, indent=4)
+        diff = {
+            'added': added,
+            'skipped': skipped,
+            'categories_added': categories_added,
+            'changed': data != original,
+            'total': len(data['rss_feeds']),
+        }
         
-        print(f"Updated {json_filepath} with {new_feeds_added} new RSS feeds (total: {len(data['rss_feeds'])})")
-        return True
+        if not diff['changed']:
+            print(f"No changes; {json_filepath} left untouched (total: {diff['total']})")
+            return diff
         
-    except json.JSONDecodeError:
-        print(f"Error: Invalid JSON in {json_filepath}")
-        return False
+        # Write back to file
+        write_json_atomic(json_filepath, data)
+    
+    print(f"Updated {json_filepath} with {len(added)} new RSS feeds (total: {diff['total']})")
+    return diff
+
+def build_rss_feeds(urls):
+    """Convert RSS URLs to feed objects with a generated name and category."""
+    rss_feeds = []
+    for url in urls:
+        name, category = extract_feed_name_and_category(url)
+        rss_feeds.append({
+            "name": name,
+            "url": url,
+            "category": category
+        })
+    return rss_feeds
+
+def source_json_path(source_slug, workspace_dir=None):
+    """Path of database/sources/<source_slug>.json in the workspace."""
+    workspace_dir = Path(workspace_dir) if workspace_dir else Path(__file__).parent.parent
+    return workspace_dir / 'database' / 'sources' / f'{source_slug}.json'
+
+def update_source(urls, source_slug, workspace_dir=None):
+    """Add RSS URLs to a source's JSON file without any prompt.
+
+    Library entry point used by orchestrate_feeds.py. Returns a dict with
+    the target file, the feed objects built from `urls`, and the
+    update_json_file() summary (or False on failure) under 'result'.
+    """
+    json_filepath = source_json_path(source_slug, workspace_dir)
+    rss_feeds = build_rss_feeds(urls)
+    result = update_json_file(json_filepath, rss_feeds, source_slug)
+    return {
+        'source_slug': source_slug,
+        'json_file': str(json_filepath),
+        'feeds': rss_feeds,
+        'result': result,
+    }
 
 def main():
     import argparse
@@ -491,6 +717,7 @@ def main():
     parser.add_argument("txt_file", help="Text file containing RSS URLs")
     parser.add_argument("source_slug", nargs="?", help="Source slug for JSON filename (default: derived from txt_file)")
     parser.add_argument("--force", "-f", action="store_true", help="Skip confirmation prompt")
+    parser.add_argument("--diff-output", help="Write the added feeds diff as JSON to this file")
     
     args = parser.parse_args()
     
@@ -509,7 +736,7 @@ def main():
     
     # Construct full paths
     txt_filepath = workspace_dir / txt_file
-    json_filepath = workspace_dir / 'database' / 'sources' / f'{source_slug}.json'
+    json_filepath = source_json_path(source_slug, workspace_dir)
     
     print(f"Processing {txt_filepath}")
     print(f"Target JSON: {json_filepath}")
@@ -523,14 +750,7 @@ def main():
     print(f"Found {len(urls)} RSS URLs")
     
     # Convert URLs to RSS feed objects
-    rss_feeds = []
-    for url in urls:
-        name, category = extract_feed_name_and_category(url)
-        rss_feeds.append({
-            "name": name,
-            "url": url,
-            "category": category
-        })
+    rss_feeds = build_rss_feeds(urls)
     
     # Display what will be added
     print("\nRSS feeds to be added:")
@@ -546,8 +766,11 @@ def main():
     
     # Update JSON file
     success = update_json_file(json_filepath, rss_feeds, source_slug)
+    if success and args.diff_output:
+        with open(args.diff_output, 'w') as f:
+            json.dump({'json_file': str(json_filepath), **success}, f, indent=4)
     if success:
-        print("Update completed successfully!")
+        print("Update completed successfully!" if success['changed'] else "Nothing to update.")
     else:
         print("Update failed!")
         sys.exit(1)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+URL canonicalization and de-duplication index for the feed tools.
+
+Two URLs that only differ by scheme, host case, default port, trailing slash,
+fragment, query parameter order or tracking parameters map to the same
+canonical form, so they are only probed and stored once.
+
+Usage:
+    from url_index import UrlIndex, canonicalize_url
+
+    seen = UrlIndex()
+    if seen.add("http://rss.nytimes.com/services/xml/rss/nyt/World.xml/"):
+        ...
+
+Known feeds are looked up through source_catalog.KnownFeeds.
+"""
+
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_SOURCES_DIR = Path(__file__).parent.parent / 'database' / 'sources'
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    'cmpid', 'ref_src', 'smid', 'smtyp', 'ocid',
+}
+TRACKING_PREFIXES = ('utm_', 'ns_', 'pk_')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url):
+    """Return the canonical form of `url` used as a de-duplication key."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    # http and https almost always serve the same feed
+    if scheme in DEFAULT_PORTS:
+        scheme = 'https'
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(key)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class UrlIndex:
+    """A set of URLs keyed by their canonical form."""
+
+    def __init__(self, urls=()):
+        self._index = {}
+        for url in urls:
+            self.add(url)
+
+    def add(self, url):
+        """Add `url`; returns False if an equivalent URL was already present."""
+        key = canonicalize_url(url)
+        if key in self._index:
+            return False
+        self._index[key] = url
+        return True
+
+    def get(self, url):
+        """Return the first URL stored under the same canonical form, if any."""
+        return self._index.get(canonicalize_url(url))
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        return canonicalize_url(url) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        return iter(self._index.values())
+